@@ -0,0 +1,71 @@
+"""
+Throughput and memory of subscribe_for_duration(aggregate=True) versus collecting messages.
+
+Feeds N Odometry / JointState / LaserScan messages through StreamAggregator and, for
+comparison, through the default mode, which keeps every message and serializes the list
+into the tool result. Peak memory is measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.bench_aggregation [--messages 1000 10000 100000]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.bench_compression import joint_state, laser_scan, odometry
+from utils.aggregation import StreamAggregator
+from utils.cbor import to_jsonable
+
+MESSAGES = {
+    "Odometry": odometry,
+    "JointState x12": lambda: joint_state(12),
+    "LaserScan 720": lambda: laser_scan(720),
+}
+
+
+def _collect(msg: dict, count: int) -> int:
+    messages = [to_jsonable(msg) for _ in range(count)]
+    return len(json.dumps(messages))
+
+
+def _aggregate(msg: dict, count: int) -> int:
+    aggregator = StreamAggregator()
+    for _ in range(count):
+        aggregator.add(msg)
+    return len(json.dumps(aggregator.result()))
+
+
+def _measure(fn, msg: dict, count: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result_bytes = fn(msg, count)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count / elapsed, peak / 1e6, result_bytes / 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(
+        f"{'message':>15} {'count':>7} {'mode':>9} {'msgs/s':>9} {'peak MB':>8} {'result KB':>10}"
+    )
+    for name, make in MESSAGES.items():
+        # Decoded as CBOR would deliver it: numeric arrays as numpy arrays
+        msg = make()
+        for count in args.messages:
+            for mode, fn in (("collect", _collect), ("aggregate", _aggregate)):
+                rate, peak_mb, result_kb = _measure(fn, msg, count)
+                print(
+                    f"{name:>15} {count:>7} {mode:>9} {rate:>9.0f} {peak_mb:>8.1f} "
+                    f"{result_kb:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
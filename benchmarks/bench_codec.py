@@ -0,0 +1,70 @@
+"""
+JSON encode/decode time per codec backend on representative ROS messages.
+
+Builds rosbridge publish frames for LaserScan, JointState and Odometry (see
+bench_compression) and times utils.codec's loads() and dumps() with every installed
+backend. "frame ms" is the reader thread's whole parse of one text frame as received
+(UTF-8 bytes): before, websocket-client decoded it to str and json.loads parsed that;
+now decode_text() hands the bytes to the codec. "LaserScan 720 inf" has out-of-range
+beams as Infinity, which the fast backends reject and json.loads then parses again.
+
+Usage:
+    python -m benchmarks.bench_codec [--repeat 2000]
+"""
+
+import argparse
+import json
+
+from benchmarks.bench_compression import _time_ms, joint_state, json_frame, laser_scan, odometry
+from utils import codec
+from utils.websocket_manager import decode_text
+
+MESSAGES = {
+    "Odometry": odometry,
+    "JointState x12": lambda: joint_state(12),
+    "LaserScan 720": lambda: laser_scan(720),
+    "LaserScan 1440": lambda: laser_scan(1440),
+    "LaserScan 720 inf": lambda: laser_scan_out_of_range(720),
+}
+
+
+def laser_scan_out_of_range(points: int) -> dict:
+    """A scan with every tenth beam out of range: rosbridge sends those as Infinity."""
+    msg = laser_scan(points)
+    msg["ranges"][::10] = float("inf")
+    return msg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"backends: {', '.join(codec.AVAILABLE)} (default {codec.BACKEND})")
+    print(
+        f"{'message':>17} {'backend':>8} {'bytes':>8} {'loads ms':>9} {'dumps ms':>9} "
+        f"{'frame ms':>9} {'vs json':>8}"
+    )
+    default = codec.BACKEND
+    for name, make in MESSAGES.items():
+        publish = {"op": "publish", "topic": "/bench", "msg": make()}
+        frame = json_frame(publish).encode()
+        outgoing = json.loads(frame)  # what a publish tool hands to send(): plain lists
+        baseline = _time_ms(lambda: json.loads(frame.decode("utf-8")), args.repeat)
+        print(
+            f"{name:>17} {'before':>8} {len(frame):>8} {'':>9} {'':>9} {baseline:>9.4f} {1:>8.2f}"
+        )
+        for backend in codec.AVAILABLE:
+            codec.use(backend)
+            loads_ms = _time_ms(lambda: codec.loads(frame), args.repeat)
+            dumps_ms = _time_ms(lambda: codec.dumps(outgoing), args.repeat)
+            frame_ms = _time_ms(lambda: decode_text(frame), args.repeat)
+            print(
+                f"{name:>17} {backend:>8} {len(frame):>8} {loads_ms:>9.4f} {dumps_ms:>9.4f} "
+                f"{frame_ms:>9.4f} {baseline / frame_ms:>8.2f}"
+            )
+    codec.use(default)
+
+
+if __name__ == "__main__":
+    main()
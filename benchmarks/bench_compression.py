@@ -0,0 +1,181 @@
+"""
+Bytes on the wire and decode time for rosbridge's subscription compression options.
+
+Builds publish frames the way rosbridge encodes them for compression="none" (JSON, with
+uint8[] as base64), "png" (that JSON packed into PNG pixels) and "cbor" (binary, with
+numeric arrays as RFC 8746 typed arrays), then times decode_frame(), which the
+connection's reader thread runs on every frame.
+
+Usage:
+    python -m benchmarks.bench_compression [--repeat 50]
+"""
+
+import argparse
+import base64
+import json
+import math
+import time
+
+import cv2
+import numpy as np
+
+from utils import cbor
+from utils.websocket_manager import decode_frame
+
+
+def _header(frame_id: str) -> dict:
+    return {"stamp": {"sec": 1700000000, "nanosec": 123456789}, "frame_id": frame_id}
+
+
+def laser_scan(points: int) -> dict:
+    rng = np.random.default_rng(0)
+    return {
+        "header": _header("laser"),
+        "angle_min": -math.pi,
+        "angle_max": math.pi,
+        "angle_increment": 2 * math.pi / points,
+        "time_increment": 0.0,
+        "scan_time": 0.1,
+        "range_min": 0.1,
+        "range_max": 30.0,
+        "ranges": rng.uniform(0.1, 30.0, points).astype(np.float32),
+        "intensities": rng.uniform(0, 1000, points).astype(np.float32),
+    }
+
+
+def joint_state(joints: int) -> dict:
+    rng = np.random.default_rng(0)
+    return {
+        "header": _header("base_link"),
+        "name": [f"joint_{i}" for i in range(joints)],
+        "position": rng.normal(size=joints),
+        "velocity": rng.normal(size=joints),
+        "effort": rng.normal(size=joints),
+    }
+
+
+def odometry() -> dict:
+    covariance = np.zeros(36)
+    covariance[::7] = 0.01
+    return {
+        "header": _header("odom"),
+        "child_frame_id": "base_link",
+        "pose": {
+            "pose": {
+                "position": {"x": 1.25, "y": -0.5, "z": 0.0},
+                "orientation": {"x": 0.0, "y": 0.0, "z": 0.38268343, "w": 0.92387953},
+            },
+            "covariance": covariance,
+        },
+        "twist": {
+            "twist": {
+                "linear": {"x": 0.5, "y": 0.0, "z": 0.0},
+                "angular": {"x": 0.0, "y": 0.0, "z": 0.1},
+            },
+            "covariance": covariance.copy(),
+        },
+    }
+
+
+def point_cloud(points: int) -> dict:
+    xyz = np.random.default_rng(0).normal(0, 5, (points, 4)).astype(np.float32)
+    return {
+        "header": _header("lidar"),
+        "height": 1,
+        "width": points,
+        "fields": [
+            {"name": name, "offset": 4 * i, "datatype": 7, "count": 1}
+            for i, name in enumerate(("x", "y", "z", "intensity"))
+        ],
+        "is_bigendian": False,
+        "point_step": 16,
+        "row_step": 16 * points,
+        "data": xyz.tobytes(),
+        "is_dense": True,
+    }
+
+
+def image(width: int, height: int) -> dict:
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    rgb = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2).astype(np.uint8)
+    return {
+        "header": _header("camera"),
+        "height": height,
+        "width": width,
+        "encoding": "rgb8",
+        "is_bigendian": 0,
+        "step": width * 3,
+        "data": rgb.tobytes(),
+    }
+
+
+MESSAGES = {
+    "Odometry": odometry,
+    "JointState x12": lambda: joint_state(12),
+    "LaserScan 720": lambda: laser_scan(720),
+    "LaserScan 1440": lambda: laser_scan(1440),
+    "PointCloud2 50k": lambda: point_cloud(50_000),
+    "Image 640x480": lambda: image(640, 480),
+}
+
+
+def json_frame(publish: dict) -> str:
+    """rosbridge's JSON encoding: float32 values widened to float64 text, uint8[] as base64."""
+    return json.dumps(cbor.to_jsonable(publish))
+
+
+def png_frame(publish: dict) -> str:
+    """rosbridge's png compression: the JSON text as RGB pixels, padded with newlines."""
+    data = json_frame(publish).encode()
+    width = max(1, int(math.floor(math.sqrt(len(data) / 3.0))))
+    height = int(math.ceil(len(data) / 3.0 / width))
+    data += b"\n" * (width * height * 3 - len(data))
+    rgb = np.frombuffer(data, np.uint8).reshape(height, width, 3)
+    ok, png = cv2.imencode(".png", rgb[:, :, ::-1])
+    return json.dumps({"op": "png", "data": base64.b64encode(png.tobytes()).decode()})
+
+
+def cbor_frame(publish: dict) -> bytes:
+    return cbor.dumps(publish)
+
+
+ENCODERS = {"none": json_frame, "png": png_frame, "cbor": cbor_frame}
+
+
+def _time_ms(fn, repeat: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(
+        f"{'message':>16} {'compression':>11} {'bytes':>10} {'vs json':>8} "
+        f"{'decode ms':>10} {'to JSON ms':>11}"
+    )
+    for name, make in MESSAGES.items():
+        publish = {"op": "publish", "topic": "/bench", "msg": make()}
+        json_size = None
+        for compression, encode in ENCODERS.items():
+            frame = encode(publish)
+            size = len(frame.encode() if isinstance(frame, str) else frame)
+            json_size = json_size or size
+            decode_ms = _time_ms(lambda: decode_frame(frame), args.repeat)
+            # What subscribe_once adds on top to hand the message to the model
+            msg = decode_frame(frame)["msg"]
+            jsonable_ms = _time_ms(lambda: cbor.to_jsonable(msg), args.repeat)
+            print(
+                f"{name:>16} {compression:>11} {size:>10} {size / json_size:>8.2f} "
+                f"{decode_ms:>10.3f} {jsonable_ms:>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Throughput of N concurrent introspection calls on one rosbridge connection.
+
+Compares the synchronous WebSocketManager, where tool calls run one after another
+behind its lock, with the async tools in server.py awaited concurrently with
+asyncio.gather() on the shared AsyncWebSocketManager.
+
+Usage:
+    python -m benchmarks.bench_concurrency [--calls 1 8 32 128] [--latency 0.01]
+"""
+
+import argparse
+import asyncio
+import time
+
+import server
+from benchmarks.mock_rosbridge import MockRosbridge
+from utils.websocket_manager import WebSocketManager
+
+ws_manager = server.robots.default.ws_manager
+
+
+def _topic_type_request(topic: str) -> dict:
+    return {
+        "op": "call_service",
+        "service": "/rosapi/topic_type",
+        "type": "rosapi/TopicType",
+        "args": {"topic": topic},
+        "id": f"get_topic_type_request_{topic.replace('/', '_')}",
+    }
+
+
+def _run_sync(bridge: MockRosbridge, topics: list) -> float:
+    manager = WebSocketManager(bridge.host, bridge.port)
+    manager.connect()
+    start = time.perf_counter()
+    for topic in topics:
+        assert "values" in manager.request(_topic_type_request(topic))
+    elapsed = time.perf_counter() - start
+    manager.close()
+    return elapsed
+
+
+async def _run_async(topics: list) -> float:
+    await ws_manager.connect()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(server.get_topic_type(topic) for topic in topics))
+    elapsed = time.perf_counter() - start
+    assert all("type" in result for result in results), results
+    await ws_manager.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument(
+        "--latency", type=float, default=0.01, help="one-way delay injected by the mock (s)"
+    )
+    args = parser.parse_args()
+
+    with MockRosbridge(latency=args.latency) as bridge:
+        ws_manager.set_ip(bridge.host, bridge.port)
+        topic_names = list(bridge.topics)
+
+        print(f"{args.latency * 1000:.1f} ms injected latency")
+        print(f"{'calls':>6} {'sync (s)':>10} {'async (s)':>10} {'sync/s':>9} {'async/s':>9}")
+        for calls in args.calls:
+            topics = [topic_names[i % len(topic_names)] for i in range(calls)]
+            sync_time = _run_sync(bridge, topics)
+            async_time = asyncio.run(_run_async(topics))
+            print(
+                f"{calls:>6} {sync_time:>10.3f} {async_time:>10.3f} "
+                f"{calls / sync_time:>9.0f} {calls / async_time:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Handshake-per-call vs. persistent rosbridge connection.
+
+Runs the same rosapi request N times against the mock rosbridge, first opening and
+closing a WebSocket around every call (the old `with ws_manager:` behaviour), then
+over one long-lived connection.
+
+Usage:
+    python -m benchmarks.bench_connection [--calls 200] [--latency 0.002]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.mock_rosbridge import MockRosbridge
+from utils.websocket_manager import WebSocketManager
+
+REQUEST = {
+    "op": "call_service",
+    "service": "/rosapi/topic_type",
+    "type": "rosapi/TopicType",
+    "args": {"topic": "/cmd_vel"},
+    "id": "bench_topic_type",
+}
+
+
+def _run(manager: WebSocketManager, calls: int, reconnect: bool) -> list:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = manager.request(REQUEST)
+        if reconnect:
+            manager.close()
+        samples.append(time.perf_counter() - start)
+        assert "values" in response, response
+    manager.close()
+    return samples
+
+
+def _report(label: str, samples: list):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(
+        f"{label:<22} mean {statistics.mean(samples_ms):7.3f} ms   "
+        f"p50 {statistics.median(samples_ms):7.3f} ms   p95 {p95:7.3f} ms   "
+        f"total {sum(samples_ms) / 1000:6.3f} s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=0.002, help="one-way delay injected by the mock (s)"
+    )
+    args = parser.parse_args()
+
+    with MockRosbridge(latency=args.latency) as bridge:
+        manager = WebSocketManager(bridge.host, bridge.port)
+        per_call = _run(manager, args.calls, reconnect=True)
+        handshakes = bridge.connections
+
+        manager = WebSocketManager(bridge.host, bridge.port)
+        persistent = _run(manager, args.calls, reconnect=False)
+        handshakes = (handshakes, bridge.connections - handshakes)
+
+    print(f"{args.calls} calls, {args.latency * 1000:.1f} ms injected latency")
+    _report(f"handshake-per-call ({handshakes[0]})", per_call)
+    _report(f"persistent ({handshakes[1]})", persistent)
+    print(f"speedup {sum(per_call) / sum(persistent):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
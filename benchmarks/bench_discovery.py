@@ -0,0 +1,74 @@
+"""
+Time to find rosbridge servers on a subnet: discover_rosbridge versus sequential port checks.
+
+Starts mock rosbridge servers on 127.0.0.1 and scans 127.0.0.0/24 for their ports. The
+sequential scan does what looping ping_ip_and_port over the range did for the port part
+(a blocking connect_ex per host and port, without the ping subprocess) and only finds
+open ports; the concurrent scan also confirms each one with a WebSocket handshake and a
+/rosapi/get_time call.
+
+On loopback a closed port is refused at once, so the sequential scan looks cheap here. On
+a LAN, absent hosts don't answer at all and each sequential check waits out the connect
+timeout: a /24 with one port costs up to 254 x timeout, against about timeout x
+ceil(targets / concurrency) for the concurrent scan. Point --cidr at a real subnet to see it.
+
+Usage:
+    python -m benchmarks.bench_discovery [--servers 2] [--cidr 127.0.0.0/24] [--concurrency 64 256]
+"""
+
+import argparse
+import asyncio
+import socket
+import time
+from contextlib import ExitStack
+
+from benchmarks.mock_rosbridge import MockRosbridge
+from utils.discovery import discover_rosbridge, scan_targets
+
+
+def _sequential(targets, timeout: float) -> int:
+    found = 0
+    for ip, port in targets:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            found += sock.connect_ex((ip, port)) == 0
+        finally:
+            sock.close()
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--servers", type=int, default=2)
+    parser.add_argument("--cidr", default="127.0.0.0/24")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[64, 256])
+    parser.add_argument("--timeout", type=float, default=0.5, help="TCP connect timeout (s)")
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        bridges = [stack.enter_context(MockRosbridge(latency=0.002)) for _ in range(args.servers)]
+        ports = [bridge.port for bridge in bridges]
+        targets = scan_targets(args.cidr, ports)
+        print(f"{len(targets)} targets ({args.cidr} x {len(ports)} ports)")
+        print(f"{'mode':>16} {'found':>6} {'confirmed':>10} {'elapsed s':>10}")
+
+        start = time.perf_counter()
+        found = _sequential(targets, args.timeout)
+        print(f"{'sequential':>16} {found:>6} {'-':>10} {time.perf_counter() - start:>10.3f}")
+
+        for concurrency in args.concurrency:
+            result = asyncio.run(
+                discover_rosbridge(
+                    args.cidr, ports, max_concurrency=concurrency, connect_timeout=args.timeout
+                )
+            )
+            found = len(result["endpoints"]) + len(result["open_ports"])
+            print(
+                f"{f'concurrent x{concurrency}':>16} {found:>6} {len(result['endpoints']):>10} "
+                f"{result['elapsed_s']:>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cost of turning a camera frame into a small JPEG/PNG for the model.
+
+Times decode -> resize -> encode as done by the subscribe_image tool, for raw
+sensor_msgs/Image (rgb8) and JPEG sensor_msgs/CompressedImage frames at 1080p and 4K.
+For comparison, "full-res" decodes the whole frame (and converts its colours) before
+resizing, and "json" is what subscribe_once returns for the same raw frame.
+
+Usage:
+    python -m benchmarks.bench_image [--size 640x480] [--quality 80] [--repeat 20]
+"""
+
+import argparse
+import base64
+import json
+import time
+
+import cv2
+import numpy as np
+
+from utils.image_utils import decode_compressed_image, decode_image, encode_image
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4K": (3840, 2160)}
+
+
+def _test_frame(width: int, height: int) -> np.ndarray:
+    """A gradient with noise, so JPEG sizes are in a realistic range."""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    frame += np.random.default_rng(0).normal(0, 8, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def _time_ms(fn, repeat: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="640x480", help="max output size, WIDTHxHEIGHT")
+    parser.add_argument("--quality", type=int, default=80, help="JPEG quality")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    max_width, max_height = (int(v) for v in args.size.split("x"))
+
+    print(f"output fits {max_width}x{max_height}, JPEG quality {args.quality}, ms per frame")
+    print(
+        f"{'frame':>6} {'source':>9} {'decode':>8} {'jpeg':>7} "
+        f"{'png':>7} {'total':>7} {'full-res':>9} {'out KB':>7} {'json KB':>8}"
+    )
+    for name, (width, height) in RESOLUTIONS.items():
+        rgb = _test_frame(width, height)
+        raw_msg = {
+            "height": height,
+            "width": width,
+            "encoding": "rgb8",
+            "is_bigendian": 0,
+            "step": width * 3,
+            "data": base64.b64encode(rgb.tobytes()).decode(),
+        }
+        ok, jpeg = cv2.imencode(".jpg", rgb[:, :, ::-1], [cv2.IMWRITE_JPEG_QUALITY, 90])
+        compressed_msg = {
+            "format": "rgb8; jpeg compressed bgr8",
+            "data": base64.b64encode(jpeg).decode(),
+        }
+
+        for source, msg, decode in (
+            ("raw rgb8", raw_msg, decode_image),
+            ("jpeg", compressed_msg, decode_compressed_image),
+        ):
+            # base64 is part of decoding: rosbridge always sends uint8[] that way
+            decode_ms = _time_ms(lambda: decode(msg, max_width, max_height), args.repeat)
+            small = decode(msg, max_width, max_height)
+            jpeg_ms = _time_ms(lambda: encode_image(small, "jpeg", args.quality), args.repeat)
+            png_ms = _time_ms(lambda: encode_image(small, "png"), args.repeat)
+            out_kb = len(encode_image(small, "jpeg", args.quality)) / 1024
+
+            if source == "jpeg":
+
+                def full():
+                    data = np.frombuffer(base64.b64decode(msg["data"]), np.uint8)
+                    image = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                    return cv2.resize(image, small.shape[1::-1], interpolation=cv2.INTER_AREA)
+
+                json_kb = float("nan")
+            else:
+
+                def full():
+                    data = np.frombuffer(base64.b64decode(msg["data"]), np.uint8)
+                    image = cv2.cvtColor(data.reshape(height, width, 3).copy(), cv2.COLOR_RGB2BGR)
+                    return cv2.resize(image, small.shape[1::-1], interpolation=cv2.INTER_AREA)
+
+                json_kb = len(json.dumps({"msg": msg})) / 1024
+            full_ms = _time_ms(full, args.repeat)
+
+            print(
+                f"{name:>6} {source:>9} {decode_ms:>8.2f} {jpeg_ms:>7.2f} "
+                f"{png_ms:>7.2f} {decode_ms + jpeg_ms:>7.2f} {full_ms:>9.2f} "
+                f"{out_kb:>7.1f} {json_kb:>8.0f}"
+            )
+    print("decode includes base64 and resizing; total = decode + jpeg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Result size and encoding cost of subscribe_for_duration with field projection and filters.
+
+Runs N messages through the per-message transform that compile_selection() builds (as
+the reader thread does), then through to_jsonable() and json.dumps() as the tool result
+would be, and compares against returning whole messages.
+
+Usage:
+    python -m benchmarks.bench_projection [--messages 1000]
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.bench_compression import joint_state, odometry
+from utils.cbor import to_jsonable
+from utils.message_filter import compile_selection
+
+
+def diagnostics(statuses: int) -> dict:
+    return {
+        "header": {"stamp": {"sec": 1700000000, "nanosec": 0}, "frame_id": ""},
+        "status": [
+            {
+                "level": i % 3,
+                "name": f"/robot/component_{i}",
+                "message": "OK" if i % 3 == 0 else "degraded",
+                "hardware_id": f"hw{i}",
+                "values": [{"key": f"key_{k}", "value": str(k * i)} for k in range(8)],
+            }
+            for i in range(statuses)
+        ],
+    }
+
+
+CASES = [
+    ("Odometry", odometry, None, None),
+    ("Odometry", odometry, ["pose.pose.position"], None),
+    ("JointState x30", lambda: joint_state(30), None, None),
+    ("JointState x30", lambda: joint_state(30), ["name[3]", "position[3]"], None),
+    ("Diagnostics x40", lambda: diagnostics(40), None, None),
+    ("Diagnostics x40", lambda: diagnostics(40), ["status[2]"], None),
+    ("Diagnostics x40", lambda: diagnostics(40), None, "status[0].level >= 1"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'message':>16} {'selection':>36} {'kept':>6} {'result KB':>10} {'ms':>8}")
+    for name, make, fields, where in CASES:
+        msg = make()
+        transform = compile_selection(fields, where)
+        start = time.perf_counter()
+        kept = []
+        for _ in range(args.messages):
+            selected = transform(msg) if transform is not None else msg
+            if selected is not None:
+                kept.append(to_jsonable(selected))
+        result = json.dumps({"messages": kept})
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        selection = f"fields={fields}" if fields else f"where={where!r}" if where else "-"
+        print(
+            f"{name:>16} {selection:>36} {len(kept):>6} {len(result) / 1e3:>10.1f} "
+            f"{elapsed_ms:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
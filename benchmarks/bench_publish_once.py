@@ -0,0 +1,79 @@
+"""
+Latency of publish_once with the advertisement registry versus the previous pattern.
+
+The previous pattern advertised, waited up to 1 s for a status frame, published, waited
+up to 1 s again and unadvertised on every call. Against the mock rosbridge (which, like
+rosbridge, answers neither op) that is ~2 s per publish. With the registry, the topic is
+advertised once and each later publish is a single send.
+
+Usage:
+    python -m benchmarks.bench_publish_once [--calls 1000] [--previous-calls 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import server
+from benchmarks.mock_rosbridge import MockRosbridge
+
+robot = server.robots.default
+ws_manager = robot.ws_manager
+
+TWIST = {"linear": {"x": 0.5, "y": 0.0, "z": 0.0}, "angular": {"x": 0.0, "y": 0.0, "z": 0.1}}
+
+
+async def _previous(topic: str):
+    """The old publish_once: advertise, receive(1.0), publish, receive(1.0), unadvertise."""
+    await ws_manager.send({"op": "advertise", "topic": topic, "type": "geometry_msgs/Twist"})
+    await ws_manager.receive(timeout=1.0)
+    await ws_manager.send({"op": "publish", "topic": topic, "msg": TWIST})
+    await ws_manager.receive(timeout=1.0)
+    await ws_manager.send({"op": "unadvertise", "topic": topic})
+
+
+async def _registry(topic: str):
+    result = await server.publish_once(topic, "geometry_msgs/Twist", TWIST)
+    assert result.get("success"), result
+
+
+async def _time_calls(fn, calls: int):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await fn("/bench_cmd")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def _run(calls: int, previous_calls: int):
+    await ws_manager.connect()
+    print(f"{'mode':>9} {'calls':>6} {'first ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'calls/s':>9}")
+    for mode, fn, n in (("previous", _previous, previous_calls), ("registry", _registry, calls)):
+        latencies = await _time_calls(fn, n)
+        ordered = sorted(latencies)
+        print(
+            f"{mode:>9} {n:>6} {latencies[0] * 1000:>9.3f} "
+            f"{statistics.median(ordered) * 1000:>9.3f} "
+            f"{ordered[int(0.95 * (n - 1))] * 1000:>9.3f} {n / sum(latencies):>9.0f}"
+        )
+    await robot.advertisements.unadvertise_all()
+    await ws_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument(
+        "--previous-calls", type=int, default=3, help="calls for the (slow) previous pattern"
+    )
+    args = parser.parse_args()
+
+    with MockRosbridge() as bridge:
+        ws_manager.set_ip(bridge.host, bridge.port)
+        asyncio.run(_run(args.calls, args.previous_calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Playback accuracy of publish_for_durations.
+
+Plays sequences of N messages with a fixed step against the mock rosbridge (which, like
+rosbridge, sends nothing back for a publish) and reports planned vs. elapsed time and
+per-step jitter. "previous" replays the old loop, which waited up to 1 s for a reply after
+every publish and then slept for the step, so its steps drift by the receive timeout.
+
+Usage:
+    python -m benchmarks.bench_publish_timing [--steps 10 100 1000] [--period 0.1 0.02]
+"""
+
+import argparse
+import asyncio
+import time
+
+import server
+from benchmarks.mock_rosbridge import MockRosbridge
+
+ws_manager = server.robots.default.ws_manager
+
+TWIST = {"linear": {"x": 0.5, "y": 0.0, "z": 0.0}, "angular": {"x": 0.0, "y": 0.0, "z": 0.1}}
+
+
+async def _previous(topic: str, steps: int, period: float) -> float:
+    """The old publish loop: publish, receive(timeout=1.0), sleep(period)."""
+    start = time.monotonic()
+    await ws_manager.send({"op": "advertise", "topic": topic, "type": "geometry_msgs/Twist"})
+    await ws_manager.receive(timeout=1.0)
+    for _ in range(steps):
+        await ws_manager.send({"op": "publish", "topic": topic, "msg": TWIST})
+        await ws_manager.receive(timeout=1.0)
+        await asyncio.sleep(period)
+    await ws_manager.send({"op": "unadvertise", "topic": topic})
+    return time.monotonic() - start
+
+
+async def _run(steps_list, periods, previous_steps: int):
+    await ws_manager.connect()
+    print(
+        f"{'steps':>6} {'period s':>9} {'mode':>9} {'planned s':>10} {'elapsed s':>10} "
+        f"{'max jitter ms':>14} {'mean jitter ms':>15}"
+    )
+    for period in periods:
+        elapsed = await _previous("/bench_cmd", previous_steps, period)
+        planned = previous_steps * period
+        print(
+            f"{previous_steps:>6} {period:>9.3f} {'previous':>9} {planned:>10.3f} "
+            f"{elapsed:>10.3f} {'-':>14} {'-':>15}"
+        )
+        for steps in steps_list:
+            result = await server.publish_for_durations(
+                "/bench_cmd", "geometry_msgs/Twist", [TWIST] * steps, [period] * steps
+            )
+            timing = result["timing"]
+            print(
+                f"{steps:>6} {period:>9.3f} {'deadline':>9} {timing['planned_s']:>10.3f} "
+                f"{timing['elapsed_s']:>10.3f} {timing['max_jitter_ms']:>14.3f} "
+                f"{timing['mean_jitter_ms']:>15.3f}"
+            )
+    await ws_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--period", type=float, nargs="+", default=[0.1, 0.02])
+    parser.add_argument(
+        "--previous-steps", type=int, default=5, help="steps for the (slow) previous loop"
+    )
+    args = parser.parse_args()
+
+    with MockRosbridge() as bridge:
+        ws_manager.set_ip(bridge.host, bridge.port)
+        asyncio.run(_run(args.steps, args.period, args.previous_steps))
+
+
+if __name__ == "__main__":
+    main()
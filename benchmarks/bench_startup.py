@@ -0,0 +1,193 @@
+"""
+Startup time and memory of the server, as an MCP host sees them.
+
+Each run spawns ``server.py`` on stdio the way a host does and times, from the spawn:
+"ready", the reply to ``initialize``, and "tools", the reply to the first ``tools/list``.
+"import" is the time ``import server`` takes inside a fresh interpreter (no interpreter
+start-up), and "peak RSS" the server process's high-water mark once it has answered.
+Medians over --runs are reported.
+
+With --max-ready-ms / --max-rss-mb, or --baseline (a file written by --json) and
+--tolerance, the exit status is 1 when startup got slower or bigger than allowed, so it
+can gate CI.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 10] [--max-ready-ms 1500] [--max-rss-mb 150]
+        [--json out.json] [--baseline before.json --tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_PROBE = (
+    "import time; start = time.perf_counter(); import server; print(time.perf_counter() - start)"
+)
+
+_INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "bench_startup", "version": "0"},
+    },
+}
+_INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+_LIST_TOOLS = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
+
+
+def _send(proc: subprocess.Popen, message: dict):
+    proc.stdin.write(json.dumps(message).encode() + b"\n")
+    proc.stdin.flush()
+
+
+def _reply(proc: subprocess.Popen, request_id: int) -> dict:
+    """Read stdout until the JSON-RPC reply to ``request_id``."""
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"server exited before answering request {request_id}")
+        try:
+            message = json.loads(line)
+        except ValueError:
+            raise RuntimeError(f"non-JSON-RPC output on stdout: {line[:200]!r}") from None
+        if message.get("id") == request_id:
+            if "error" in message:
+                raise RuntimeError(f"request {request_id} failed: {message['error']}")
+            return message
+
+
+def _peak_rss_mb(pid: int) -> Optional[float]:
+    """The process's peak resident set size (Linux /proc), or None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _run_server(timeout: float) -> Dict[str, float]:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "server.py"],
+        cwd=ROOT,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    watchdog = threading.Timer(timeout, proc.kill)
+    watchdog.start()
+    try:
+        _send(proc, _INITIALIZE)
+        _reply(proc, 1)
+        ready = time.perf_counter()
+        _send(proc, _INITIALIZED)
+        _send(proc, _LIST_TOOLS)
+        tools = len(_reply(proc, 2)["result"]["tools"])
+        listed = time.perf_counter()
+        rss_mb = _peak_rss_mb(proc.pid)
+    finally:
+        watchdog.cancel()
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    if rss_mb is None:  # not Linux: the largest child so far, in KB (bytes on macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        rss_mb = maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {
+        "ready_ms": (ready - start) * 1000,
+        "tools_ms": (listed - start) * 1000,
+        "peak_rss_mb": rss_mb,
+        "tools": tools,
+    }
+
+
+def _import_ms() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+def measure(runs: int, timeout: float) -> Dict[str, float]:
+    samples: List[Dict[str, float]] = []
+    for _ in range(runs):
+        sample = _run_server(timeout)
+        sample["import_ms"] = _import_ms()
+        samples.append(sample)
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in ("import_ms", "ready_ms", "tools_ms", "peak_rss_mb", "tools")
+    }
+
+
+def _regressions(result: Dict[str, float], args) -> List[str]:
+    failures = []
+    if args.max_ready_ms is not None and result["ready_ms"] > args.max_ready_ms:
+        failures.append(f"ready {result['ready_ms']} ms > {args.max_ready_ms} ms")
+    if args.max_rss_mb is not None and result["peak_rss_mb"] > args.max_rss_mb:
+        failures.append(f"peak RSS {result['peak_rss_mb']} MB > {args.max_rss_mb} MB")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["result"]
+        for key in ("import_ms", "ready_ms", "peak_rss_mb"):
+            limit = baseline[key] * (1 + args.tolerance)
+            if result[key] > limit:
+                failures.append(
+                    f"{key} {result[key]} > baseline {baseline[key]} +{args.tolerance:.0%}"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per server start (s)")
+    parser.add_argument("--max-ready-ms", type=float, help="fail if the median ready time is above")
+    parser.add_argument("--max-rss-mb", type=float, help="fail if the median peak RSS is above")
+    parser.add_argument("--baseline", help="results file (--json) to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed slowdown vs --baseline (0.2 = 20%%)"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    result = measure(args.runs, args.timeout)
+    print(f"{'import ms':>10} {'ready ms':>10} {'tools ms':>10} {'peak RSS MB':>12} {'tools':>6}")
+    print(
+        f"{result['import_ms']:>10.1f} {result['ready_ms']:>10.1f} {result['tools_ms']:>10.1f} "
+        f"{result['peak_rss_mb']:>12.1f} {result['tools']:>6.0f}"
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "result": result}, f, indent=2)
+
+    failures = _regressions(result, args)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Latency percentiles and throughput of every MCP tool against the mock rosbridge.
+
+Each tool is called through FastMCP's call_tool() (argument validation and result
+serialization included) with representative arguments: first one call at a time for
+p50/p95/p99 latency, then with up to --concurrency calls in flight for throughput.
+Tools whose work is time-bound (subscribe_for_duration, publish_for_durations) get
+fewer calls. A call fails if it raises or its result carries an "error"; "failed"
+counts both phases.
+
+Usage:
+    python -m benchmarks.bench_tools [--calls 100] [--concurrency 16] [--latency 0.002]
+        [--rate 50] [--scan-points 720] [--tools get_topics subscribe_once ...] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import server
+from benchmarks.mock_rosbridge import MockRosbridge
+
+robot = server.robots.default
+
+TWIST = {"linear": {"x": 0.5, "y": 0.0, "z": 0.0}, "angular": {"x": 0.0, "y": 0.0, "z": 0.1}}
+
+
+class Spec(NamedTuple):
+    tool: str
+    # Builds the arguments of call number i (may set up state first; not timed)
+    args: Callable[[int], Awaitable[dict]]
+    max_calls: Optional[int] = None
+
+
+def _fixed(args: dict) -> Callable[[int], Awaitable[dict]]:
+    async def build(i: int) -> dict:
+        return dict(args)
+
+    return build
+
+
+async def _session_args(i: int) -> dict:
+    result = await server.start_publisher("/bench_session", "geometry_msgs/Twist", 10.0, msg=TWIST)
+    return {"session_id": result["session_id"], "msg": TWIST}
+
+
+async def _new_robot_args(i: int) -> dict:
+    name = f"bench_{i}"
+    await server.connect_to_robot(robot.ws_manager.ip, robot.ws_manager.port, samples=1, robot=name)
+    return {"robot": name}
+
+
+async def _advertised_args(i: int) -> dict:
+    topic = f"/bench_adv_{i}"
+    await server.publish_once(topic, "geometry_msgs/Twist", TWIST)
+    return {"topic": topic}
+
+
+async def _subscribed_args(i: int) -> dict:
+    topic = f"/bench_sub_{i}"
+    await robot.subscriptions.ensure(topic, "std_msgs/String")
+    return {"topic": topic}
+
+
+async def _recording_args(i: int) -> dict:
+    recording, _ = await robot.recordings.start({"/odom": "nav_msgs/Odometry"})
+    return {"recording_id": recording.recording_id}
+
+
+async def _query_args(i: int) -> dict:
+    if not os.path.exists(os.path.join(server.RECORDING_DIR, "bench.rec")):
+        # One second of /odom and /scan, recorded on first use
+        result = await server.start_recording(
+            ["/odom", "/scan"], ["nav_msgs/Odometry", "sensor_msgs/LaserScan"], name="bench"
+        )
+        await asyncio.sleep(1.0)
+        await server.stop_recording(result["recording_id"])
+    return {
+        "recording": "bench",
+        "fields": ["/odom:twist.twist.linear.x", "/scan:min(ranges)"],
+        "threshold": 0.5,
+        "window": 0.1,
+    }
+
+
+async def _cursor_args(i: int) -> dict:
+    result = await server.get_topics(max_items=1)
+    return {"cursor": result["page"]["next_cursor"]}
+
+
+def specs(port: int) -> List[Spec]:
+    return [
+        Spec(
+            "connect_to_robot",
+            _fixed({"ip": "127.0.0.1", "port": port, "samples": 1, "robot": "bench"}),
+        ),
+        Spec("list_robots", _fixed({})),
+        Spec("remove_robot", _new_robot_args),
+        Spec("get_topics", _fixed({})),
+        Spec("get_graph_hash", _fixed({})),
+        Spec("get_topic_type", _fixed({"topic": "/odom"})),
+        Spec("get_message_details", _fixed({"message_type": "geometry_msgs/Twist"})),
+        Spec("get_publishers_for_topic", _fixed({"topic": "/odom"})),
+        Spec("get_subscribers_for_topic", _fixed({"topic": "/odom"})),
+        Spec("subscribe_once", _fixed({"topic": "/odom", "msg_type": "nav_msgs/Odometry"})),
+        Spec(
+            "subscribe_image",
+            _fixed(
+                {"topic": "/camera/image_raw", "msg_type": "sensor_msgs/Image", "max_width": 160}
+            ),
+        ),
+        Spec(
+            "publish_once",
+            _fixed({"topic": "/bench_cmd", "msg_type": "geometry_msgs/Twist", "msg": TWIST}),
+        ),
+        Spec(
+            "subscribe_for_duration",
+            _fixed({"topic": "/scan", "msg_type": "sensor_msgs/LaserScan", "duration": 0.2}),
+            max_calls=10,
+        ),
+        Spec("list_subscriptions", _fixed({})),
+        Spec(
+            "pin_subscription",
+            _fixed({"topic": "/joint_states", "msg_type": "sensor_msgs/JointState"}),
+        ),
+        Spec("drop_subscription", _subscribed_args),
+        Spec(
+            "publish_for_durations",
+            _fixed(
+                {
+                    "topic": "/bench_cmd",
+                    "msg_type": "geometry_msgs/Twist",
+                    "messages": [TWIST] * 5,
+                    "durations": [0.01] * 5,
+                }
+            ),
+            max_calls=10,
+        ),
+        Spec(
+            "start_publisher",
+            _fixed(
+                {
+                    "topic": "/bench_pub",
+                    "msg_type": "geometry_msgs/Twist",
+                    "rate_hz": 10.0,
+                    "msg": TWIST,
+                    "duration": 0.05,
+                }
+            ),
+        ),
+        Spec("update_publisher", _session_args),
+        Spec("stop_publisher", _session_args),
+        Spec("list_publishers", _fixed({})),
+        Spec("list_advertisements", _fixed({})),
+        Spec("unadvertise_topic", _advertised_args),
+        Spec(
+            "start_recording",
+            _fixed(
+                {
+                    "topics": ["/odom", "/scan"],
+                    "msg_types": ["nav_msgs/Odometry", "sensor_msgs/LaserScan"],
+                    "duration": 0.05,
+                }
+            ),
+        ),
+        Spec("stop_recording", _recording_args),
+        Spec("list_recordings", _fixed({})),
+        Spec("query_recording", _query_args),
+        Spec("get_services", _fixed({})),
+        Spec("get_service_type", _fixed({"service": "/spawn"})),
+        Spec("get_service_details", _fixed({"service_type": "turtlesim/Spawn"})),
+        Spec("get_service_providers", _fixed({"service": "/spawn"})),
+        Spec("inspect_all_services", _fixed({})),
+        Spec(
+            "call_service",
+            _fixed({"service_name": "/spawn", "service_type": "turtlesim/Spawn", "request": {}}),
+        ),
+        Spec("get_schema_cache_stats", _fixed({})),
+        Spec("fetch_page", _cursor_args),
+        Spec("get_server_metrics", _fixed({})),
+        Spec("get_recent_logs", _fixed({})),
+        Spec("ping_robot", _fixed({"samples": 3})),
+        Spec(
+            "discover_robots",
+            _fixed({"cidr": "127.0.0.1/32", "ports": [port], "time_budget": 2.0}),
+            max_calls=20,
+        ),
+    ]
+
+
+def _failed(contents) -> bool:
+    for content in contents:
+        if getattr(content, "type", None) == "text":
+            try:
+                result = json.loads(content.text)
+            except ValueError:
+                continue
+            if isinstance(result, dict) and result.get("error"):
+                return True
+    return False
+
+
+async def _call(tool: str, args: dict) -> bool:
+    """Call a tool through FastMCP. Returns True if it succeeded."""
+    try:
+        return not _failed(await server.mcp.call_tool(tool, args))
+    except Exception:
+        return False
+
+
+async def _bench(spec: Spec, calls: int, concurrency: int) -> Dict:
+    calls = min(calls, spec.max_calls or calls)
+
+    # One at a time, for latency
+    latencies, failures = [], 0
+    for args in [await spec.args(i) for i in range(calls)]:
+        start = time.perf_counter()
+        failures += not await _call(spec.tool, args)
+        latencies.append(time.perf_counter() - start)
+
+    # Many in flight, for throughput
+    slots = asyncio.Semaphore(concurrency)
+    batch = [await spec.args(calls + i) for i in range(calls)]
+
+    async def limited(args: dict) -> bool:
+        async with slots:
+            return await _call(spec.tool, args)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(args) for args in batch))
+    elapsed = time.perf_counter() - start
+    failures += results.count(False)
+
+    ordered = sorted(s * 1000 for s in latencies)
+    return {
+        "tool": spec.tool,
+        "calls": calls,
+        "failures": failures,
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[int(0.95 * (calls - 1))], 3),
+        "p99_ms": round(ordered[int(0.99 * (calls - 1))], 3),
+        "calls_per_s": round(calls / elapsed, 1),
+    }
+
+
+async def _run(args, port: int) -> List[Dict]:
+    await robot.ws_manager.connect()
+    server.RECORDING_DIR = tempfile.mkdtemp(prefix="bench_recordings_")
+    robot.recordings.directory = server.RECORDING_DIR
+    print(
+        f"{'tool':>26} {'calls':>6} {'failed':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'calls/s':>9}"
+    )
+    results = []
+    for spec in specs(port):
+        if args.tools and spec.tool not in args.tools:
+            continue
+        result = await _bench(spec, args.calls, args.concurrency)
+        # Sessions started for update/stop_publisher would otherwise skew the tools after them
+        await robot.publishers.stop_all("benchmark step done")
+        await robot.recordings.stop_all("benchmark step done")
+        results.append(result)
+        print(
+            f"{result['tool']:>26} {result['calls']:>6} {result['failures']:>7} "
+            f"{result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+            f"{result['calls_per_s']:>9.1f}"
+        )
+    for name in server.robots.names():
+        await server.robots.remove(name)
+    await server.robots.release_all("benchmark done")
+    await robot.ws_manager.close()
+    shutil.rmtree(server.RECORDING_DIR, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--latency", type=float, default=0.002, help="one-way delay injected by the mock (s)"
+    )
+    parser.add_argument("--rate", type=float, default=50.0, help="mock topic rate (Hz)")
+    parser.add_argument("--scan-points", type=int, default=720, help="points per LaserScan")
+    parser.add_argument("--tools", nargs="+", help="only benchmark these tools")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with MockRosbridge(
+        latency=args.latency,
+        default_rate=args.rate,
+        payload_sizes={"/scan": args.scan_points},
+    ) as bridge:
+        robot.ws_manager.set_ip(bridge.host, bridge.port)
+        results = asyncio.run(_run(args, bridge.port))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
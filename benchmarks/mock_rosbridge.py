@@ -0,0 +1,498 @@
+"""
+Minimal in-process rosbridge server for benchmarks.
+
+Speaks just enough of RFC 6455 and the rosbridge v2 protocol to stand in for a robot:
+``call_service`` for the rosapi services used by server.py (and an empty success for any
+other known service), ``subscribe``/``unsubscribe`` with synthetic messages published at
+a configurable rate per topic, and ``advertise``/``publish``/``unadvertise``, with
+publishes delivered to the mock's own subscribers like rosbridge would. Like rosbridge,
+it answers advertise and publish only with an error status, e.g. for a topic whose type
+it can't infer.
+
+Every reply and published frame is delayed by ``latency`` seconds (and so is the opening
+handshake), which stands in for a robot on a slow link. Replies are scheduled
+independently, so pipelined requests overlap like they would against a real rosbridge.
+``payload_sizes`` scales the synthetic messages: points per LaserScan, joints per
+JointState, image width (4:3) per Image, or characters of text for anything else.
+
+Usage:
+    with MockRosbridge(latency=0.005, rates={"/scan": 40.0}) as bridge:
+        manager = WebSocketManager(bridge.host, bridge.port)
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import struct
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils import cbor
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """Build a single unmasked server-to-client frame."""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    """Read one client frame and return (opcode, unmasked payload)."""
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+# Default payload size per message type, see MockRosbridge
+DEFAULT_PAYLOAD_SIZES = {
+    "sensor_msgs/LaserScan": 360,
+    "sensor_msgs/JointState": 6,
+    "sensor_msgs/Image": 320,
+}
+
+
+def _base_type(msg_type: str) -> str:
+    """ "sensor_msgs/msg/LaserScan" -> "sensor_msgs/LaserScan"."""
+    package, _, name = msg_type.rpartition("/")
+    return f"{package.split('/')[0]}/{name}" if package else name
+
+
+def synthetic_message(msg_type: str, size: Optional[int] = None) -> dict:
+    """
+    Build a message of ``msg_type`` for the mock to publish. Numeric arrays are numpy
+    arrays (CBOR typed arrays on the wire, lists in JSON); header stamps are filled in
+    per publish.
+    """
+    base = _base_type(msg_type)
+    size = size if size is not None else DEFAULT_PAYLOAD_SIZES.get(base, 16)
+    rng = np.random.default_rng(0)
+    header = {"stamp": {"sec": 0, "nanosec": 0}, "frame_id": "mock"}
+    if base == "sensor_msgs/LaserScan":
+        return {
+            "header": header,
+            "angle_min": -math.pi,
+            "angle_max": math.pi,
+            "angle_increment": 2 * math.pi / max(size, 1),
+            "time_increment": 0.0,
+            "scan_time": 0.1,
+            "range_min": 0.1,
+            "range_max": 30.0,
+            "ranges": rng.uniform(0.1, 30.0, size).astype(np.float32),
+            "intensities": rng.uniform(0, 1000, size).astype(np.float32),
+        }
+    if base == "sensor_msgs/JointState":
+        return {
+            "header": header,
+            "name": [f"joint_{i}" for i in range(size)],
+            "position": rng.normal(size=size),
+            "velocity": rng.normal(size=size),
+            "effort": rng.normal(size=size),
+        }
+    if base == "nav_msgs/Odometry":
+        covariance = np.zeros(36)
+        covariance[::7] = 0.01
+        return {
+            "header": header,
+            "child_frame_id": "base_link",
+            "pose": {
+                "pose": {
+                    "position": {"x": 1.25, "y": -0.5, "z": 0.0},
+                    "orientation": {"x": 0.0, "y": 0.0, "z": 0.38268343, "w": 0.92387953},
+                },
+                "covariance": covariance,
+            },
+            "twist": {
+                "twist": {
+                    "linear": {"x": 0.5, "y": 0.0, "z": 0.0},
+                    "angular": {"x": 0.0, "y": 0.0, "z": 0.1},
+                },
+                "covariance": covariance.copy(),
+            },
+        }
+    if base == "sensor_msgs/Image":
+        width, height = size, max(size * 3 // 4, 1)
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        rgb = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2).astype(np.uint8)
+        return {
+            "header": header,
+            "height": height,
+            "width": width,
+            "encoding": "rgb8",
+            "is_bigendian": 0,
+            "step": width * 3,
+            "data": rgb.tobytes(),
+        }
+    if base == "geometry_msgs/Twist":
+        return {
+            "linear": {"x": 0.5, "y": 0.0, "z": 0.0},
+            "angular": {"x": 0.0, "y": 0.0, "z": 0.1},
+        }
+    if base == "rosgraph_msgs/Log":
+        return {"header": header, "level": 2, "name": "/mock_node", "msg": "x" * size}
+    return {"data": "x" * size}
+
+
+class _Subscriber:
+    def __init__(self, writer: asyncio.StreamWriter, message: dict):
+        self.writer = writer
+        self.id = message.get("id")
+        self.compression = message.get("compression", "none")
+        self.throttle_s = (message.get("throttle_rate") or 0) / 1000.0
+        self.last_sent = 0.0
+
+
+class MockRosbridge:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        topics: Optional[dict] = None,
+        services: Optional[dict] = None,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: float = 10.0,
+        payload_sizes: Optional[Dict[str, int]] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        # topic name -> message type
+        self.topics = topics or {
+            "/cmd_vel": "geometry_msgs/Twist",
+            "/odom": "nav_msgs/Odometry",
+            "/joint_states": "sensor_msgs/JointState",
+            "/scan": "sensor_msgs/LaserScan",
+            "/camera/image_raw": "sensor_msgs/Image",
+            "/rosout": "rosgraph_msgs/Log",
+        }
+        # service name -> service type
+        self.services = services or {
+            "/rosapi/topics": "rosapi/Topics",
+            "/rosapi/services": "rosapi/Services",
+            "/rosapi/get_time": "rosapi/GetTime",
+            "/spawn": "turtlesim/Spawn",
+        }
+        # topic name -> messages per second published to subscribers
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        # topic name -> payload size of its synthetic messages (see synthetic_message)
+        self.payload_sizes = dict(payload_sizes or {})
+        self.connections = 0
+        self.op_counts: Counter = Counter()
+        self.published: deque = deque(maxlen=10000)  # publish ops received from clients
+        self.sent_messages = 0  # publish frames sent to subscribers
+        self._clients: set = set()
+        self._subscribers: Dict[str, List[_Subscriber]] = {}
+        self._pumps: Dict[str, asyncio.Task] = {}
+        self._advertised: Dict[asyncio.StreamWriter, set] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ lifecycle
+
+    def start(self) -> "MockRosbridge":
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="mock-rosbridge", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            await self._server.wait_closed()
+            for writer in list(self._clients):
+                writer.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+
+    def drop_clients(self):
+        """Close every client connection but keep listening, like a robot's Wi-Fi roaming."""
+        if self._loop is None:
+            return
+
+        async def drop():
+            for writer in list(self._clients):
+                writer.transport.abort()
+
+        asyncio.run_coroutine_threadsafe(drop(), self._loop).result()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    # ------------------------------------------------------------------ protocol
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()  # a plain TCP port check, not a WebSocket client
+            return
+        key = ""
+        for line in request.decode("latin-1").split("\r\n"):
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "sec-websocket-key":
+                key = value.strip()
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        self.connections += 1
+        self._clients.add(writer)
+        self._advertised[writer] = set()
+
+        try:
+            while True:
+                opcode, payload = await _read_frame(reader)
+                if opcode == 0x8:  # close
+                    writer.write(_frame(payload[:2], opcode=0x8))
+                    break
+                if opcode == 0x9:  # ping
+                    writer.write(_frame(payload, opcode=0xA))
+                    continue
+                if opcode != 0x1:
+                    continue
+                self._handle_op(json.loads(payload), writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._disconnect(writer)
+            writer.close()
+
+    def _disconnect(self, writer: asyncio.StreamWriter):
+        """Forget a client's subscriptions and advertisements, as rosbridge does."""
+        self._clients.discard(writer)
+        for topic in list(self._subscribers):
+            self._remove_subscribers(topic, lambda sub: sub.writer is writer)
+        self._advertised.pop(writer, None)
+
+    def _send(self, writer: asyncio.StreamWriter, frame: bytes):
+        """Write a frame to a client after the injected latency."""
+        if writer.is_closing():
+            return
+        if self.latency:
+            self._loop.call_later(self.latency, lambda: writer.is_closing() or writer.write(frame))
+        else:
+            writer.write(frame)
+
+    def _status(self, writer: asyncio.StreamWriter, message: dict, text: str):
+        status = {"op": "status", "level": "error", "msg": text}
+        if "id" in message:
+            status["id"] = message["id"]
+        self._send(writer, _frame(json.dumps(status).encode()))
+
+    def _handle_op(self, message: dict, writer: asyncio.StreamWriter):
+        op = message.get("op")
+        self.op_counts[op] += 1
+        if op == "call_service":
+            asyncio.ensure_future(self._call_service(message, writer))
+        elif op == "subscribe":
+            self._subscribe(message, writer)
+        elif op == "unsubscribe":
+            self._remove_subscribers(
+                message.get("topic"),
+                lambda sub: sub.writer is writer and sub.id == message.get("id"),
+            )
+        elif op == "advertise":
+            topic, msg_type = message.get("topic"), message.get("type")
+            if self.topics.get(topic, msg_type) != msg_type:
+                self._status(writer, message, f"{topic} already has type {self.topics[topic]}")
+                return
+            self.topics[topic] = msg_type
+            self._advertised[writer].add(topic)
+        elif op == "unadvertise":
+            self._advertised[writer].discard(message.get("topic"))
+        elif op == "publish":
+            topic = message.get("topic")
+            if topic not in self._advertised[writer] and topic not in self.topics:
+                self._status(writer, message, f"Cannot infer topic type for topic {topic}")
+                return
+            self.published.append(message)
+            # rosbridge's own subscribers to the topic see it too
+            self._deliver(topic, message.get("msg", {}))
+
+    async def _call_service(self, message: dict, writer: asyncio.StreamWriter):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        values = self.call_service(message.get("service", ""), message.get("args") or {})
+        reply = {
+            "op": "service_response",
+            "service": message.get("service"),
+            "values": values if values is not None else {},
+            "result": values is not None,
+        }
+        if "id" in message:
+            reply["id"] = message["id"]
+        if not writer.is_closing():
+            writer.write(_frame(json.dumps(reply).encode()))
+
+    def call_service(self, service: str, args: dict) -> Optional[dict]:
+        """Answer a rosapi service call, or return None for an unknown service."""
+        if service == "/rosapi/topics":
+            return {"topics": list(self.topics), "types": list(self.topics.values())}
+        if service == "/rosapi/topic_type":
+            return {"type": self.topics.get(args.get("topic"), "")}
+        if service in ("/rosapi/publishers", "/rosapi/subscribers"):
+            key = service.rsplit("/", 1)[1]
+            return {key: ["/mock_node"] if args.get("topic") in self.topics else []}
+        if service == "/rosapi/services":
+            return {"services": list(self.services)}
+        if service == "/rosapi/service_type":
+            return {"type": self.services.get(args.get("service"), "")}
+        if service == "/rosapi/service_providers":
+            return {"providers": ["/mock_node"] if args.get("service") in self.services else []}
+        if service == "/rosapi/get_time":
+            return {"time": {"secs": 0, "nsecs": 0}}
+        if service in (
+            "/rosapi/message_details",
+            "/rosapi/service_request_details",
+            "/rosapi/service_response_details",
+        ):
+            return {
+                "typedefs": [
+                    {
+                        "type": args.get("type", ""),
+                        "fieldnames": ["x", "y", "z"],
+                        "fieldtypes": ["float64", "float64", "float64"],
+                        "fieldarraylen": [-1, -1, -1],
+                        "examples": ["0.0", "0.0", "0.0"],
+                    }
+                ]
+            }
+        if service in self.services:
+            return {}
+        return None
+
+    # ------------------------------------------------------------------ topics
+
+    def _subscribe(self, message: dict, writer: asyncio.StreamWriter):
+        topic = message.get("topic")
+        msg_type = self.topics.get(topic) or message.get("type")
+        if not msg_type:
+            self._status(writer, message, f"Cannot infer topic type for topic {topic}")
+            return
+        if message.get("type") and _base_type(message["type"]) != _base_type(msg_type):
+            self._status(writer, message, f"{topic} has type {msg_type}, not {message['type']}")
+            return
+        self.topics.setdefault(topic, msg_type)
+        subscribers = self._subscribers.setdefault(topic, [])
+        # Like rosbridge, subscribing again under the same id updates that subscription
+        subscribers[:] = [
+            sub for sub in subscribers if not (sub.writer is writer and sub.id == message.get("id"))
+        ]
+        subscribers.append(_Subscriber(writer, message))
+        if topic not in self._pumps:
+            self._pumps[topic] = asyncio.ensure_future(self._pump(topic, msg_type))
+
+    def _remove_subscribers(self, topic: str, match):
+        subscribers = [sub for sub in self._subscribers.get(topic, []) if not match(sub)]
+        if subscribers:
+            self._subscribers[topic] = subscribers
+            return
+        self._subscribers.pop(topic, None)
+        pump = self._pumps.pop(topic, None)
+        if pump is not None:
+            pump.cancel()
+
+    async def _pump(self, topic: str, msg_type: str):
+        """Publish synthetic messages on a topic at its rate while it has subscribers."""
+        template = synthetic_message(msg_type, self.payload_sizes.get(topic))
+        period = 1.0 / self.rates.get(topic, self.default_rate)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            now = time.time()
+            msg = dict(template)
+            if "header" in msg:
+                stamp = {"sec": int(now), "nanosec": int(now % 1 * 1e9)}
+                msg["header"] = {**msg["header"], "stamp": stamp}
+            self._deliver(topic, msg)
+            deadline += period
+            delay = deadline - loop.time()
+            if delay < 0:
+                deadline = loop.time()  # fell behind: don't burst to catch up
+            await asyncio.sleep(max(delay, 0))
+
+    def _deliver(self, topic: str, msg: dict):
+        """Send one message to every subscriber of a topic in its requested encoding."""
+        subscribers = self._subscribers.get(topic)
+        if not subscribers:
+            return
+        frames: Dict[str, bytes] = {}
+        now = time.monotonic()
+        for sub in subscribers:
+            if sub.throttle_s and now - sub.last_sent < sub.throttle_s:
+                continue
+            sub.last_sent = now
+            encoding = "cbor" if sub.compression == "cbor-raw" else sub.compression
+            if encoding not in frames:
+                publish = {"op": "publish", "topic": topic, "msg": msg}
+                if encoding == "cbor":
+                    frames[encoding] = _frame(cbor.dumps(publish), opcode=0x2)
+                elif encoding == "png":
+                    # Imported here so OpenCV is only loaded for png subscriptions
+                    from benchmarks.bench_compression import png_frame
+
+                    frames[encoding] = _frame(png_frame(publish).encode())
+                else:
+                    frames[encoding] = _frame(json.dumps(cbor.to_jsonable(publish)).encode())
+            self._send(sub.writer, frames[encoding])
+            self.sent_messages += 1
@@ -1,11 +1,27 @@
-import json
+import asyncio
+import functools
+import inspect
+import os
 import time
-from typing import Optional
-
-from mcp.server.fastmcp import FastMCP
-
-from utils.websocket_manager import WebSocketManager, parse_json
-from utils.network_utils import ping_ip_and_port
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+
+from mcp.server.fastmcp import FastMCP, Image
+
+from utils.cbor import to_jsonable
+from utils.discovery import discover_rosbridge
+from utils.logging_utils import LOGGER_NAME, get_logger, setup_logging
+from utils.message_filter import FieldPathError, compile_selection
+from utils.metrics import ToolMetrics, prometheus_text, write_textfile
+from utils.network_utils import measure_latency
+from utils.publisher_sessions import INTERPOLATIONS, parse_keyframes
+from utils.recorder import COMPRESSIONS as RECORDING_COMPRESSIONS
+from utils.recorder import EXTENSION as RECORDING_EXTENSION
+from utils.recorder import recording_path
+from utils.result_store import ResultStore
+from utils.robot_pool import ALL_ROBOTS, RobotConnection, RobotPool
+from utils.subscription_manager import COMPRESSIONS, ManagedSubscription
 
 # ROS bridge connection settings
 ROSBRIDGE_IP = "127.0.0.1"  # Default is localhost. Replace with your local IPor set using the LLM.
@@ -13,53 +29,345 @@ ROSBRIDGE_PORT = (
     9090  # Rosbridge default is 9090. Replace with your rosbridge port or set using the LLM.
 )
 
-# Initialize MCP server and WebSocket manager
-mcp = FastMCP("ros-mcp-server")
-ws_manager = WebSocketManager(
-    ROSBRIDGE_IP, ROSBRIDGE_PORT, default_timeout=5.0
-)  # Increased default timeout for ROS operations
+# Message/service type definition cache settings
+SCHEMA_CACHE_SIZE = 1024  # Maximum number of type definitions kept in memory
+SCHEMA_CACHE_FILE = None  # Set to a file path to keep type definitions across restarts
+
+# ROS graph snapshot settings (topics, publishers, subscribers, services, providers)
+GRAPH_CACHE_TTL = 5.0  # Seconds a snapshot is served from memory. Set to 0 to always query live.
+
+# Background subscription settings
+SUBSCRIPTION_BUFFER_SIZE = 100  # Messages kept per subscribed topic
+SUBSCRIPTION_EXPIRY = 60.0  # Seconds an unpinned subscription survives without being read
+
+# Publisher settings
+ADVERTISEMENT_IDLE_TIMEOUT = 30.0  # Seconds a topic stays advertised after its last publish
+PUBLISHER_MAX_RATE_HZ = 1000.0  # Highest rate a publisher session may be started with
+PUBLISH_STATUS_WINDOW = 1.0  # Seconds publish_for_durations listens for a message's error status
+
+# Reconnect settings, used while subscriptions or advertisements are open
+RECONNECT_INITIAL_DELAY = 0.1  # Backoff ceiling for the first retry; it doubles on each failure
+RECONNECT_MAX_DELAY = 5.0  # Longest wait between reconnect attempts
+RECONNECT_TIMEOUT = 60.0  # Seconds to keep retrying before subscriptions are failed. None disables.
+
+# Network discovery settings
+DISCOVERY_MAX_CONCURRENCY = 256  # Probes in flight at once (each holds a socket)
+
+# Topic recording settings
+RECORDING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+# Result pagination settings (get_topics, get_services, inspect_all_services,
+# subscribe_for_duration); later pages are served by fetch_page
+RESULT_PAGE_MAX_ITEMS = 100  # Default items per page
+RESULT_PAGE_MAX_BYTES = 100_000  # Default JSON bytes per page (a single larger item still fits)
+RESULT_STORE_MAX_RESULTS = 32  # Paginated results kept; least recently used are dropped
+RESULT_STORE_MAX_MEMORY = 64 * 1024 * 1024  # Bytes of paginated results kept
+
+# Logging settings (never to stdout: that is the MCP stream)
+LOG_LEVEL = "INFO"
+LOG_FILE = None  # Set to a file path to log there instead of to stderr
+LOG_FORMAT = "text"  # "text", or "json" for one JSON object per line
+LOG_BUFFER_SIZE = 500  # Recent records kept in memory for get_recent_logs
+LOG_RATE_LIMIT_BURST = 5  # Repeats of one message logged per interval. None disables the limit.
+LOG_RATE_LIMIT_INTERVAL = 10.0  # Seconds of a rate limit window
+
+# Metrics settings
+METRICS_TEXTFILE = None  # Set to a file path to write Prometheus metrics there periodically
+METRICS_TEXTFILE_INTERVAL = 15.0  # Seconds between writes of METRICS_TEXTFILE
+
+
+logs = setup_logging(
+    LOG_LEVEL,
+    LOG_FILE,
+    LOG_FORMAT,
+    buffer_size=LOG_BUFFER_SIZE,
+    rate_limit_burst=LOG_RATE_LIMIT_BURST,
+    rate_limit_interval=LOG_RATE_LIMIT_INTERVAL,
+)
+logger = get_logger("server")
+
+
+def instrumented(tool, name: Optional[str] = None):
+    """
+    Record the latency and outcome of every call of ``tool`` in ``tool_metrics``.
+
+    A call fails if it raises or returns a dict with an "error". Calls whose arguments
+    FastMCP rejects never reach the tool, so they aren't counted.
+    """
+    name = name or tool.__name__
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await tool(*args, **kwargs)
+            ok = not (isinstance(result, dict) and result.get("error"))
+            return result
+        finally:
+            tool_metrics.record(name, time.perf_counter() - start, ok)
+
+    return wrapper
+
+
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP that registers every tool wrapped with ``instrumented``."""
+
+    def add_tool(self, fn: Callable, name: Optional[str] = None, description: Optional[str] = None):
+        super().add_tool(instrumented(fn, name), name=name, description=description)
+
+
+def _write_metrics_textfile():
+    connections = {
+        name: (robots.get(name).ws_manager.metrics, robots.get(name).ws_manager.reconnects)
+        for name in robots.names()
+    }
+    write_textfile(METRICS_TEXTFILE, prometheus_text(tool_metrics, connections))
+
+
+async def _metrics_writer():
+    while True:
+        try:
+            _write_metrics_textfile()
+        except OSError as e:
+            logger.warning("Failed to write metrics to %s: %s", METRICS_TEXTFILE, e)
+        await asyncio.sleep(METRICS_TEXTFILE_INTERVAL)
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    writer = asyncio.ensure_future(_metrics_writer()) if METRICS_TEXTFILE else None
+    try:
+        yield
+    finally:
+        if writer is not None:
+            writer.cancel()
+        # Don't leave publishers advertised on the robots after we're gone
+        await robots.release_all("server shutdown")
+
+
+# Initialize MCP server, its tool metrics and the pool of robot connections
+mcp = InstrumentedFastMCP("ros-mcp-server", lifespan=_lifespan)
+tool_metrics = ToolMetrics()
+robots = RobotPool(
+    ROSBRIDGE_IP,
+    ROSBRIDGE_PORT,
+    default_timeout=5.0,  # Increased default timeout for ROS operations
+    schema_cache_size=SCHEMA_CACHE_SIZE,
+    schema_cache_file=SCHEMA_CACHE_FILE,
+    graph_cache_ttl=GRAPH_CACHE_TTL,
+    subscription_buffer_size=SUBSCRIPTION_BUFFER_SIZE,
+    subscription_expiry=SUBSCRIPTION_EXPIRY,
+    advertisement_idle_timeout=ADVERTISEMENT_IDLE_TIMEOUT,
+    reconnect_initial_delay=RECONNECT_INITIAL_DELAY,
+    reconnect_max_delay=RECONNECT_MAX_DELAY,
+    reconnect_timeout=RECONNECT_TIMEOUT,
+    recording_dir=RECORDING_DIR,
+)
+results = ResultStore(RESULT_STORE_MAX_RESULTS, RESULT_STORE_MAX_MEMORY)
+
+
+def _check_page_limits(max_items: Optional[int], max_bytes: Optional[int]) -> Optional[str]:
+    for limit in (max_items, max_bytes):
+        if limit is not None and (not isinstance(limit, int) or limit < 1):
+            return "max_items and max_bytes must be integers ≥ 1"
+    return None
+
+
+def _paginate(
+    source: str, result: dict, keys: tuple, max_items: Optional[int], max_bytes: Optional[int]
+) -> dict:
+    """Return the first page of ``result``'s collections under ``keys``; see ResultStore."""
+    try:
+        return results.paginate(
+            source,
+            result,
+            keys,
+            RESULT_PAGE_MAX_ITEMS if max_items is None else max_items,
+            RESULT_PAGE_MAX_BYTES if max_bytes is None else max_bytes,
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+def for_robots(tool):
+    """
+    Resolve a tool's ``robot`` argument before running it.
+
+    An unknown robot name returns an error. With robot="all" the tool runs on every robot
+    concurrently and the results are merged as {"robots": {name: result}}; tools returning
+    content lists (images) get one flat list instead, with each robot's dicts tagged "robot".
+    """
+    signature = inspect.signature(tool)
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        robot = bound.arguments.get("robot")
+        if robot == ALL_ROBOTS:
+            results = await robots.fan_out(lambda name: tool(**{**bound.arguments, "robot": name}))
+            if not any(isinstance(result, list) for result in results.values()):
+                return {"robots": results}
+            merged = []
+            for name, result in results.items():
+                for item in result if isinstance(result, list) else [result]:
+                    merged.append({"robot": name, **item} if isinstance(item, dict) else item)
+            return merged
+        if robot is not None and robot not in robots:
+            return {"error": f"Unknown robot {robot!r}; known robots: {robots.names()}"}
+        return await tool(*args, **kwargs)
+
+    return wrapper
 
 
-@mcp.tool(description=("Connect to a robot by setting IP/port and testing connectivity."))
-def connect_to_robot(ip: Optional[str] = None, port: Optional[int] = None, ping_timeout: float = 2.0, port_timeout: float = 2.0) -> dict:
+@mcp.tool(
+    description=(
+        "Connect to a robot by setting IP/port and testing connectivity.\n"
+        "Give a robot name to keep several robots connected side by side; other tools take the same "
+        "robot argument, or robot='all' to run on every robot at once.\n"
+        "Example:\n"
+        "connect_to_robot(ip='192.168.1.100', port=9090)\n"
+        "connect_to_robot(ip='192.168.1.101', port=9090, robot='arm')  # Add a second robot named 'arm'"
+    )
+)
+async def connect_to_robot(
+    ip: Optional[str] = None,
+    port: Optional[int] = None,
+    timeout: float = 2.0,
+    samples: int = 3,
+    robot: Optional[str] = None,
+) -> dict:
     """
     Connect to a robot by setting the IP and port for the WebSocket connection, then testing connectivity.
 
+    Each named robot has its own connection, caches, subscriptions and publishers. Pointing
+    an existing robot at a new address drops what was kept for the old one; other robots
+    are left alone.
+
     Args:
         ip (Optional[str]): The IP address of the rosbridge server. Defaults to "127.0.0.1" (localhost).
         port (Optional[int]): The port number of the rosbridge server. Defaults to 9090.
-        ping_timeout (float): Timeout for ping in seconds. Default = 2.0.
-        port_timeout (float): Timeout for port check in seconds. Default = 2.0.
+        timeout (float): Timeout for each step of the connectivity test in seconds. Default = 2.0.
+        samples (int): Number of latency samples taken by the connectivity test. Default = 3.
+        robot (Optional[str]): Name for this robot. A new name adds a robot to the pool. Defaults to
+            the default robot.
 
     Returns:
-        dict: Connection status with ping and port check results.
+        dict: Connection status with the connectivity test results (see ping_robot).
     """
     # Set default values if None
     actual_ip = ip if ip is not None else "127.0.0.1"
     actual_port = port if port is not None else 9090
-    
-    # Set the IP and port
-    ws_manager.set_ip(actual_ip, actual_port)
-    
+    name = robot if robot is not None else robots.default_name
+
+    # Set the IP and port; anything cached for another address no longer applies
+    if name in robots:
+        await robots.get(name).retarget(actual_ip, actual_port)
+    else:
+        try:
+            robots.add(name, actual_ip, actual_port)
+        except ValueError as e:
+            return {"error": str(e)}
+
     # Test connectivity
-    ping_result = ping_robot(actual_ip, actual_port, ping_timeout, port_timeout)
-    
+    ping_result = await measure_latency(actual_ip, actual_port, samples, timeout)
+
     # Combine the results
     return {
         "message": f"WebSocket IP set to {actual_ip}:{actual_port}",
-        "connectivity_test": ping_result
+        "robot": name,
+        "connectivity_test": ping_result,
     }
 
 
-@mcp.tool(description=("Fetch available topics from the ROS bridge.\nExample:\nget_topics()"))
-def get_topics() -> dict:
+@mcp.tool(
+    description=(
+        "List the robots in the connection pool with their address and what is kept open on each.\n"
+        "Example:\n"
+        "list_robots()"
+    )
+)
+async def list_robots() -> dict:
+    """
+    List the named robot connections.
+
+    Returns:
+        dict: Contains 'robots', mapping each name to its ip, port, connection state, number
+            of reconnects and the number of subscriptions, advertisements and publisher
+            sessions, and 'default'.
+    """
+    return {
+        "robots": {name: robots.get(name).info() for name in robots.names()},
+        "default": robots.default_name,
+    }
+
+
+@mcp.tool(
+    description=(
+        "Disconnect a named robot and remove it from the pool.\nExample:\nremove_robot(robot='arm')"
+    )
+)
+async def remove_robot(robot: str) -> dict:
+    """
+    Stop a robot's publishers, drop its subscriptions, close its connection and forget it.
+
+    Args:
+        robot (str): The robot name given to connect_to_robot. The default robot can't be removed.
+
+    Returns:
+        dict: {"success": True} if it was removed, or {"error": "<error message>"}.
+    """
+    if robot == robots.default_name:
+        return {"error": "The default robot can't be removed; use connect_to_robot to retarget it"}
+    if not await robots.remove(robot):
+        return {"error": f"Unknown robot {robot!r}; known robots: {robots.names()}"}
+    return {"success": True, "robot": robot}
+
+
+@mcp.tool(
+    description=(
+        "Fetch available topics from the ROS bridge. Long lists come in pages; pass "
+        "'next_cursor' to fetch_page for the rest.\n"
+        "Example:\n"
+        "get_topics()\n"
+        "get_topics(max_items=20)"
+    )
+)
+@for_robots
+async def get_topics(
+    max_items: Optional[int] = None, max_bytes: Optional[int] = None, robot: Optional[str] = None
+) -> dict:
     """
     Fetch available topics from the ROS bridge.
 
+    Args:
+        max_items (Optional[int]): Topics per page. Defaults to RESULT_PAGE_MAX_ITEMS.
+        max_bytes (Optional[int]): JSON bytes per page. Defaults to RESULT_PAGE_MAX_BYTES.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
     Returns:
         dict: Contains two lists - 'topics' and 'types',
             or a message string if no topics are found.
+            When there are more than fit in a page, also 'page' with 'offset', 'items',
+            'total_items' and 'next_cursor' (see fetch_page).
     """
+    conn = robots.get(robot)
+    limit_error = _check_page_limits(max_items, max_bytes)
+    if limit_error:
+        return {"error": limit_error}
+
+    # Serve from the graph snapshot when it is fresh
+    snapshot = await conn.graph_cache.get()
+    if snapshot is not None:
+        topics = snapshot["topics"]
+        result = {
+            "topics": list(topics),
+            "types": [info["type"] for info in topics.values()],
+            "graph_hash": snapshot["hash"],
+        }
+        return _paginate("get_topics", result, ("topics", "types"), max_items, max_bytes)
+
     # rosbridge service call to get topic list
     message = {
         "op": "call_service",
@@ -69,8 +377,7 @@ def get_topics() -> dict:
     }
 
     # Request topic list from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -80,29 +387,88 @@ def get_topics() -> dict:
 
     # Return topic info if present
     if response and "values" in response:
-        return response["values"]
+        return _paginate(
+            "get_topics", response["values"], ("topics", "types"), max_items, max_bytes
+        )
     else:
         return {"warning": "No topics found"}
 
 
+@mcp.tool(
+    description=(
+        "Check whether the ROS graph (topics, services, publishers, subscribers, providers) changed.\n"
+        "Pass the graph_hash from an earlier get_topics/get_services result to check topics and services, or the connections_hash from an earlier get_graph_hash to also check publishers, subscribers and providers.\n"
+        "Example:\n"
+        "get_graph_hash()\n"
+        "get_graph_hash(known_hash='3f9c0a1b2d4e5f60')"
+    )
+)
+@for_robots
+async def get_graph_hash(known_hash: Optional[str] = None, robot: Optional[str] = None) -> dict:
+    """
+    Get the hashes of the current ROS graph snapshot, without the full lists.
+
+    This fetches every topic's publishers and subscribers and every service's providers
+    (one rosapi call each, pipelined), at most once per GRAPH_CACHE_TTL.
+
+    Args:
+        known_hash (Optional[str]): A graph_hash or connections_hash from an earlier call to
+            compare against.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: Contains 'graph_hash' (topics, types and services), 'connections_hash' (also
+            publishers, subscribers and providers), topic and service counts, the snapshot
+            age, and 'changed' (True/False) when known_hash was given.
+    """
+    conn = robots.get(robot)
+    snapshot = await conn.graph_cache.get(details=True)
+    if snapshot is None:
+        if not conn.graph_cache.enabled:
+            snapshot = await conn.graph_cache.refresh(details=True)
+        if snapshot is None:
+            return {"error": f"Failed to fetch ROS graph: {conn.graph_cache.last_error}"}
+
+    result = {
+        "graph_hash": snapshot["hash"],
+        "connections_hash": snapshot["connections_hash"],
+        "topic_count": len(snapshot["topics"]),
+        "service_count": len(snapshot["services"]),
+        "age_s": round(conn.graph_cache.age(), 3),
+    }
+    if known_hash is not None:
+        result["changed"] = known_hash not in (snapshot["hash"], snapshot["connections_hash"])
+    return result
+
+
 @mcp.tool(
     description=("Get the message type for a specific topic.\nExample:\nget_topic_type('/cmd_vel')")
 )
-def get_topic_type(topic: str) -> dict:
+@for_robots
+async def get_topic_type(topic: str, robot: Optional[str] = None) -> dict:
     """
     Get the message type for a specific topic.
 
     Args:
         topic (str): The topic name (e.g., '/cmd_vel')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains the 'type' field with the message type,
             or an error message if topic doesn't exist.
     """
+    conn = robots.get(robot)
     # Validate input
     if not topic or not topic.strip():
         return {"error": "Topic name cannot be empty"}
 
+    # Serve from the graph snapshot when it is fresh and knows the topic
+    snapshot = await conn.graph_cache.get()
+    if snapshot is not None and snapshot["topics"].get(topic, {}).get("type"):
+        return {"topic": topic, "type": snapshot["topics"][topic]["type"]}
+
     # rosbridge service call to get topic type
     message = {
         "op": "call_service",
@@ -113,8 +479,7 @@ def get_topic_type(topic: str) -> dict:
     }
 
     # Request topic type from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -140,62 +505,71 @@ def get_topic_type(topic: str) -> dict:
         "get_message_details('geometry_msgs/Twist')"
     )
 )
-def get_message_details(message_type: str) -> dict:
+@for_robots
+async def get_message_details(message_type: str, robot: Optional[str] = None) -> dict:
     """
     Get the complete structure/definition of a message type.
 
     Args:
         message_type (str): The message type (e.g., 'geometry_msgs/Twist')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains the message structure with field names and types,
             or an error message if the message type doesn't exist.
     """
+    conn = robots.get(robot)
     # Validate input
     if not message_type or not message_type.strip():
         return {"error": "Message type cannot be empty"}
 
-    # rosbridge service call to get message details
-    message = {
-        "op": "call_service",
-        "service": "/rosapi/message_details",
-        "type": "rosapi/MessageDetails",
-        "args": {"type": message_type},
-        "id": f"get_message_details_request_{message_type.replace('/', '_')}",
-    }
+    # Type definitions don't change while the robot runs, so serve repeats from the cache
+    typedefs = conn.schema_cache.get(message_type)
 
-    # Request message details from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    if typedefs is None:
+        # rosbridge service call to get message details
+        message = {
+            "op": "call_service",
+            "service": "/rosapi/message_details",
+            "type": "rosapi/MessageDetails",
+            "args": {"type": message_type},
+            "id": f"get_message_details_request_{message_type.replace('/', '_')}",
+        }
 
-    # Check for service response errors first
-    if response and "result" in response and not response["result"]:
-        # Service call failed - return error with details from values
-        error_msg = response.get("values", {}).get("message", "Service call failed")
-        return {"error": f"Service call failed: {error_msg}"}
+        # Request message details from rosbridge
+        response = await conn.ws_manager.request(message)
+
+        # Check for service response errors first
+        if response and "result" in response and not response["result"]:
+            # Service call failed - return error with details from values
+            error_msg = response.get("values", {}).get("message", "Service call failed")
+            return {"error": f"Service call failed: {error_msg}"}
+
+        if not response or "values" not in response:
+            return {"error": f"Failed to get details for message type {message_type}"}
 
-    # Return message structure if present
-    if response and "values" in response:
         typedefs = response["values"].get("typedefs", [])
-        if typedefs:
-            # Parse the structure into a more readable format
-            structure = {}
-            for typedef in typedefs:
-                type_name = typedef.get("type", message_type)
-                field_names = typedef.get("fieldnames", [])
-                field_types = typedef.get("fieldtypes", [])
+        conn.schema_cache.put(message_type, typedefs)
 
-                fields = {}
-                for name, ftype in zip(field_names, field_types):
-                    fields[name] = ftype
+    # Return message structure if present
+    if typedefs:
+        # Parse the structure into a more readable format
+        structure = {}
+        for typedef in typedefs:
+            type_name = typedef.get("type", message_type)
+            field_names = typedef.get("fieldnames", [])
+            field_types = typedef.get("fieldtypes", [])
 
-                structure[type_name] = {"fields": fields, "field_count": len(fields)}
+            fields = {}
+            for name, ftype in zip(field_names, field_types):
+                fields[name] = ftype
 
-            return {"message_type": message_type, "structure": structure}
-        else:
-            return {"error": f"Message type {message_type} not found or has no definition"}
+            structure[type_name] = {"fields": fields, "field_count": len(fields)}
+
+        return {"message_type": message_type, "structure": structure}
     else:
-        return {"error": f"Failed to get details for message type {message_type}"}
+        return {"error": f"Message type {message_type} not found or has no definition"}
 
 
 @mcp.tool(
@@ -205,21 +579,31 @@ def get_message_details(message_type: str) -> dict:
         "get_publishers_for_topic('/cmd_vel')"
     )
 )
-def get_publishers_for_topic(topic: str) -> dict:
+@for_robots
+async def get_publishers_for_topic(topic: str, robot: Optional[str] = None) -> dict:
     """
     Get list of nodes that are publishing to a specific topic.
 
     Args:
         topic (str): The topic name (e.g., '/cmd_vel')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains list of publisher node names,
             or a message if no publishers found.
     """
+    conn = robots.get(robot)
     # Validate input
     if not topic or not topic.strip():
         return {"error": "Topic name cannot be empty"}
 
+    # Serve from the graph snapshot when it is fresh and knows the topic
+    snapshot = await conn.graph_cache.get()
+    publishers = snapshot["topics"].get(topic, {}).get("publishers") if snapshot else None
+    if publishers is not None:
+        return {"topic": topic, "publishers": publishers, "publisher_count": len(publishers)}
+
     # rosbridge service call to get publishers
     message = {
         "op": "call_service",
@@ -230,8 +614,7 @@ def get_publishers_for_topic(topic: str) -> dict:
     }
 
     # Request publishers from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -254,21 +637,31 @@ def get_publishers_for_topic(topic: str) -> dict:
         "get_subscribers_for_topic('/cmd_vel')"
     )
 )
-def get_subscribers_for_topic(topic: str) -> dict:
+@for_robots
+async def get_subscribers_for_topic(topic: str, robot: Optional[str] = None) -> dict:
     """
     Get list of nodes that are subscribed to a specific topic.
 
     Args:
         topic (str): The topic name (e.g., '/cmd_vel')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains list of subscriber node names,
             or a message if no subscribers found.
     """
+    conn = robots.get(robot)
     # Validate input
     if not topic or not topic.strip():
         return {"error": "Topic name cannot be empty"}
 
+    # Serve from the graph snapshot when it is fresh and knows the topic
+    snapshot = await conn.graph_cache.get()
+    subscribers = snapshot["topics"].get(topic, {}).get("subscribers") if snapshot else None
+    if subscribers is not None:
+        return {"topic": topic, "subscribers": subscribers, "subscriber_count": len(subscribers)}
+
     # rosbridge service call to get subscribers
     message = {
         "op": "call_service",
@@ -279,8 +672,7 @@ def get_subscribers_for_topic(topic: str) -> dict:
     }
 
     # Request subscribers from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -296,24 +688,94 @@ def get_subscribers_for_topic(topic: str) -> dict:
         return {"error": f"Failed to get subscribers for topic {topic}"}
 
 
+async def _latest_message(
+    conn: RobotConnection,
+    sub: ManagedSubscription,
+    timeout: Optional[float],
+    max_age: Optional[float],
+    transform: Optional[Callable[[dict], Optional[dict]]] = None,
+) -> dict:
+    """
+    Return the newest message of a managed subscription, waiting for one if needed.
+
+    With a transform (see compile_selection), only messages it accepts count, and they are
+    returned transformed.
+
+    Returns:
+        dict:
+            - {"msg": <parsed ROS message>, "age_s": <seconds since it arrived>} if successful
+            - {"error": "<error message>"} if the subscription fails or times out
+    """
+    async with sub.listen(transform) as frames:
+        # Return the buffered message right away if it is fresh enough
+        latest = sub.latest(transform)
+        if latest is not None and (max_age is None or latest[0] <= max_age):
+            age, msg = latest
+            return {"msg": msg, "age_s": round(age, 3)}
+
+        # Use default timeout if none specified
+        actual_timeout = timeout if timeout is not None else conn.ws_manager.default_timeout
+
+        # Wait until we receive the next message or timeout
+        end_time = time.time() + actual_timeout
+        while time.time() < end_time:
+            try:
+                msg_data = await asyncio.wait_for(frames.get(), end_time - time.time())
+            except asyncio.TimeoutError:
+                break  # deadline passed
+
+            # Connection dropped while waiting
+            if "error" in msg_data:
+                return {"error": msg_data["error"]}
+
+            # Check for status errors from rosbridge; don't keep a broken subscription
+            if msg_data.get("op") == "status" and msg_data.get("level") == "error":
+                await conn.subscriptions.drop(sub.topic)
+                return {"error": f"Rosbridge error: {msg_data.get('msg', 'Unknown error')}"}
+
+            # Check for the next published message
+            if msg_data.get("op") == "publish":
+                return {"msg": msg_data.get("msg", {}), "age_s": 0.0}
+
+        conn.ws_manager.metrics.timeout("subscribe")
+        if sub.gap_since is not None:
+            return {"error": "Timeout waiting for message: connection lost, reconnecting"}
+        return {"error": "Timeout waiting for message from topic"}
+
+
 @mcp.tool(
     description=(
-        "Subscribe to a ROS topic and return the first message received.\n"
+        "Get the latest message on a ROS topic.\n"
+        "The topic stays subscribed in the background, so repeated calls return the newest "
+        "buffered message immediately, together with its age in seconds.\n"
         "Example:\n"
         "subscribe_once(topic='/cmd_vel', msg_type='geometry_msgs/msg/TwistStamped')\n"
+        "subscribe_once(topic='/odom', msg_type='nav_msgs/Odometry', max_age=0.5)  # Wait for a fresher message if the buffered one is older\n"
         "subscribe_once(topic='/slow_topic', msg_type='my_package/SlowMsg', timeout=10.0)  # Specify timeout only if topic publishes infrequently\n"
-        "subscribe_once(topic='/high_rate_topic', msg_type='sensor_msgs/Image', queue_length=5, throttle_rate_ms=100)  # Control message buffering and rate"
+        "subscribe_once(topic='/high_rate_topic', msg_type='sensor_msgs/Image', queue_length=5, throttle_rate_ms=100)  # Control message buffering and rate\n"
+        "subscribe_once(topic='/scan', msg_type='sensor_msgs/LaserScan', compression='cbor')  # Binary encoding for large messages\n"
+        "subscribe_once(topic='/odom', msg_type='nav_msgs/Odometry', fields=['pose.pose.position'])  # Return only some fields\n"
+        "subscribe_once(topic='/diagnostics', msg_type='diagnostic_msgs/DiagnosticArray', where='status[0].level >= 2')  # Wait for a matching message"
     )
 )
-def subscribe_once(
+@for_robots
+async def subscribe_once(
     topic: str = "",
     msg_type: str = "",
     timeout: Optional[float] = None,
     queue_length: Optional[int] = None,
     throttle_rate_ms: Optional[int] = None,
+    max_age: Optional[float] = None,
+    compression: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    where: Optional[str] = None,
+    robot: Optional[str] = None,
 ) -> dict:
     """
-    Subscribe to a given ROS topic via rosbridge and return the first message received.
+    Get the latest message on a ROS topic via a managed background subscription.
+
+    The first call subscribes and waits for a message; the subscription then stays alive
+    (see list_subscriptions) and later calls return the newest buffered message at once.
 
     Args:
         topic (str): The ROS topic name (e.g., "/cmd_vel", "/joint_states").
@@ -321,12 +783,26 @@ def subscribe_once(
         timeout (Optional[float]): Timeout in seconds. If None, uses the default timeout.
         queue_length (Optional[int]): How many messages to buffer before dropping old ones. Must be ≥ 1.
         throttle_rate_ms (Optional[int]): Minimum interval between messages in milliseconds. Must be ≥ 0.
+        max_age (Optional[float]): Oldest acceptable buffered message in seconds. If the latest
+            buffered message is older, wait for the next one. If None, any buffered message is returned.
+        compression (Optional[str]): How rosbridge encodes messages on the wire: "none" (JSON),
+            "png", "cbor" or "cbor-raw" (serialized ROS bytes, returned base64-encoded). "cbor"
+            saves the most bandwidth on scans, point clouds and images. If None, an existing
+            subscription is reused as is, otherwise "none".
+        fields (Optional[List[str]]): Field paths to return instead of the whole message, e.g.
+            ["pose.pose.position", "name[3]"]. The result maps each path to its value (None if absent).
+        where (Optional[str]): Filter on message fields, e.g. "twist.twist.linear.x > 0.1 and
+            header.frame_id == 'odom'". Supports comparisons, and/or/not, arithmetic and
+            abs/len/min/max/round. Messages that don't match, or lack a field, are skipped.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict:
-            - {"msg": <parsed ROS message>} if successful
+            - {"msg": <parsed ROS message>, "age_s": <seconds since it arrived>} if successful
             - {"error": "<error message>"} if subscription or timeout fails
     """
+    conn = robots.get(robot)
     # Validate critical args before attempting subscription
     if not topic or not msg_type:
         return {"error": "Missing required arguments: topic and msg_type must be provided."}
@@ -340,56 +816,145 @@ def subscribe_once(
     ):
         return {"error": "throttle_rate_ms must be an integer ≥ 0"}
 
-    # Construct the rosbridge subscribe message
-    subscribe_msg: dict = {
-        "op": "subscribe",
-        "topic": topic,
-        "type": msg_type,
-    }
+    if max_age is not None and max_age < 0:
+        return {"error": "max_age must be ≥ 0"}
 
-    # Add optional parameters if provided
-    if queue_length is not None:
-        subscribe_msg["queue_length"] = queue_length
+    if compression is not None and compression not in COMPRESSIONS:
+        return {"error": f"compression must be one of {', '.join(COMPRESSIONS)}"}
 
-    if throttle_rate_ms is not None:
-        subscribe_msg["throttle_rate"] = throttle_rate_ms
+    try:
+        transform = compile_selection(fields, where)
+    except FieldPathError as e:
+        return {"error": str(e)}
 
-    # Subscribe and wait for the first message
-    with ws_manager:
-        # Send subscription request
-        send_error = ws_manager.send(subscribe_msg)
-        if send_error:
-            return {"error": f"Failed to subscribe: {send_error}"}
+    # Reuse the background subscription, or start one
+    sub, send_error = await conn.subscriptions.ensure(
+        topic, msg_type, queue_length, throttle_rate_ms, compression=compression
+    )
+    if send_error:
+        return {"error": f"Failed to subscribe: {send_error}"}
 
-        # Use default timeout if none specified
-        actual_timeout = timeout if timeout is not None else ws_manager.default_timeout
+    result = await _latest_message(conn, sub, timeout, max_age, transform)
+    if "msg" in result:
+        # CBOR arrays/bytes as rosbridge JSON would have them
+        result["msg"] = to_jsonable(result["msg"])
+    return result
 
-        # Loop until we receive the first message or timeout
-        end_time = time.time() + actual_timeout
-        while time.time() < end_time:
-            response = ws_manager.receive(timeout=0.5)  # non-blocking small timeout
-            if response is None:
-                continue  # idle timeout: no frame this tick
 
-            msg_data = parse_json(response)
-            if not msg_data:
-                continue  # non-JSON or empty
+@mcp.tool(
+    description=(
+        "Get the latest frame of a camera topic as an image (sensor_msgs/Image or sensor_msgs/CompressedImage).\n"
+        "The frame is downscaled to fit max_width x max_height and re-encoded, instead of returning raw pixel data.\n"
+        "Example:\n"
+        "subscribe_image(topic='/camera/image_raw', msg_type='sensor_msgs/Image')\n"
+        "subscribe_image(topic='/camera/image_raw/compressed', msg_type='sensor_msgs/CompressedImage', max_width=320, max_height=240, quality=60)\n"
+        "subscribe_image(topic='/camera/depth/image_raw', msg_type='sensor_msgs/Image', format='png')  # Depth is scaled to its value range"
+    )
+)
+@for_robots
+async def subscribe_image(
+    topic: str = "",
+    msg_type: str = "sensor_msgs/Image",
+    max_width: int = 640,
+    max_height: int = 480,
+    format: str = "jpeg",
+    quality: int = 80,
+    timeout: Optional[float] = None,
+    throttle_rate_ms: Optional[int] = None,
+    max_age: Optional[float] = None,
+    compression: Optional[str] = None,
+    robot: Optional[str] = None,
+):
+    """
+    Get the latest frame of an image topic, downscaled and encoded as JPEG or PNG.
 
-            # Check for status errors from rosbridge
-            if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                return {"error": f"Rosbridge error: {msg_data.get('msg', 'Unknown error')}"}
+    Like subscribe_once, the topic stays subscribed in the background, but only the newest
+    frame is buffered. Decoding and encoding run in a worker thread.
 
-            # Check for the first published message
-            if msg_data.get("op") == "publish" and msg_data.get("topic") == topic:
-                # Unsubscribe before returning the message
-                unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
-                ws_manager.send(unsubscribe_msg)
-                return {"msg": msg_data.get("msg", {})}
+    Args:
+        topic (str): The image topic (e.g., "/camera/image_raw").
+        msg_type (str): "sensor_msgs/Image" or "sensor_msgs/CompressedImage" (ROS 2 "/msg/" names work too).
+        max_width (int): Maximum width of the returned image in pixels. Default = 640.
+        max_height (int): Maximum height of the returned image in pixels. Default = 480.
+        format (str): "jpeg" or "png". Default = "jpeg".
+        quality (int): JPEG quality, 1-100. Default = 80.
+        timeout (Optional[float]): Timeout in seconds. If None, uses the default timeout.
+        throttle_rate_ms (Optional[int]): Minimum interval between frames sent by rosbridge in milliseconds.
+        max_age (Optional[float]): Oldest acceptable buffered frame in seconds. If None, any buffered frame is returned.
+        compression (Optional[str]): rosbridge wire encoding, as for subscribe_once. "cbor" sends
+            pixel data as raw bytes instead of base64 text.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
-        # Timeout - unsubscribe and return error
-        unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
-        ws_manager.send(unsubscribe_msg)
-        return {"error": "Timeout waiting for message from topic"}
+    Returns:
+        list: [<image content>, {"topic", "width", "height", "source_width", "source_height",
+            "encoding", "bytes", "age_s"}] if successful
+        dict: {"error": "<error message>"} if subscription, decoding or timeout fails
+    """
+    conn = robots.get(robot)
+    if not topic:
+        return {"error": "Missing required argument: topic must be provided."}
+    if max_width < 1 or max_height < 1:
+        return {"error": "max_width and max_height must be ≥ 1"}
+    if format.lower() not in ("jpeg", "jpg", "png"):
+        return {"error": "format must be 'jpeg' or 'png'"}
+    if not 1 <= quality <= 100:
+        return {"error": "quality must be between 1 and 100"}
+    if max_age is not None and max_age < 0:
+        return {"error": "max_age must be ≥ 0"}
+    if compression is not None and compression not in COMPRESSIONS:
+        return {"error": f"compression must be one of {', '.join(COMPRESSIONS)}"}
+
+    # Frames are large: keep only the newest one, in rosbridge and in our buffer
+    sub, send_error = await conn.subscriptions.ensure(
+        topic,
+        msg_type,
+        queue_length=1,
+        throttle_rate_ms=throttle_rate_ms,
+        buffer_size=1,
+        compression=compression,
+    )
+    if send_error:
+        return {"error": f"Failed to subscribe: {send_error}"}
+
+    result = await _latest_message(conn, sub, timeout, max_age)
+    if "error" in result:
+        return result
+    msg = result["msg"]
+
+    def render():
+        # OpenCV and numpy are loaded on the first image, not at startup
+        from utils.image_utils import decode_compressed_image, decode_image, encode_image
+
+        if "CompressedImage" in msg_type:
+            image = decode_compressed_image(msg, max_width, max_height)
+            source_size = (None, None)  # not part of the CompressedImage header
+            encoding = msg.get("format", "")
+        else:
+            image = decode_image(msg, max_width, max_height)
+            source_size = (msg.get("width"), msg.get("height"))
+            encoding = msg.get("encoding", "")
+        return image, encode_image(image, format, quality), source_size, encoding
+
+    try:
+        image, data, (source_width, source_height), encoding = await asyncio.to_thread(render)
+    except ValueError as e:
+        return {"error": f"Failed to convert image: {e}"}
+
+    image_format = "png" if format.lower() == "png" else "jpeg"
+    return [
+        Image(data=data, format=image_format),
+        {
+            "topic": topic,
+            "width": image.shape[1],
+            "height": image.shape[0],
+            "source_width": source_width,
+            "source_height": source_height,
+            "encoding": encoding,
+            "bytes": len(data),
+            "age_s": result["age_s"],
+        },
+    ]
 
 
 @mcp.tool(
@@ -399,72 +964,48 @@ def subscribe_once(
         "publish_once(topic='/cmd_vel', msg_type='geometry_msgs/msg/TwistStamped', msg={'linear': {'x': 1.0}})"
     )
 )
-def publish_once(topic: str = "", msg_type: str = "", msg: dict = {}) -> dict:
+@for_robots
+async def publish_once(
+    topic: str = "", msg_type: str = "", msg: dict = {}, robot: Optional[str] = None
+) -> dict:
     """
     Publish a single message to a ROS topic via rosbridge.
 
+    The topic is advertised on the first publish and stays advertised for
+    ADVERTISEMENT_IDLE_TIMEOUT seconds after the last one, so repeated publishes don't
+    pay for an advertise/unadvertise each and subscribers don't see the publisher come
+    and go. Nothing is awaited after sending: rosbridge rarely answers a publish, and
+    errors it reports arrive in the background and are returned by the next call.
+
     Args:
         topic (str): ROS topic name (e.g., "/cmd_vel")
         msg_type (str): ROS message type (e.g., "geometry_msgs/Twist")
         msg (dict): Message payload as a dictionary
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict:
-            - {"success": True} if sent without errors
+            - {"success": True, "errors": [...]} if sent, where errors are those rosbridge
+              reported for this topic's advertise or earlier publishes since the last call
             - {"error": "<error message>"} if connection/send failed
-            - If rosbridge responds (usually it doesn’t for publish), parsed JSON or error info
     """
+    conn = robots.get(robot)
     # Validate critical args before attempting publish
     if not topic or not msg_type or msg == {}:
         return {
             "error": "Missing required arguments: topic, msg_type, and msg must all be provided."
         }
 
-    # Use proper advertise → publish → unadvertise pattern
-    with ws_manager:
-        # 1. Advertise the topic
-        advertise_msg = {"op": "advertise", "topic": topic, "type": msg_type}
-        send_error = ws_manager.send(advertise_msg)
-        if send_error:
-            return {"error": f"Failed to advertise topic: {send_error}"}
-
-        # Check for advertise response/errors
-        response = ws_manager.receive(timeout=1.0)
-        if response:
-            try:
-                msg_data = json.loads(response)
-                if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                    return {"error": f"Advertise failed: {msg_data.get('msg', 'Unknown error')}"}
-            except json.JSONDecodeError:
-                pass  # Non-JSON response is usually fine for advertise
-
-        # 2. Publish the message
-        publish_msg = {"op": "publish", "topic": topic, "msg": msg}
-        send_error = ws_manager.send(publish_msg)
-        if send_error:
-            # Try to unadvertise even if publish failed
-            ws_manager.send({"op": "unadvertise", "topic": topic})
-            return {"error": f"Failed to publish message: {send_error}"}
-
-        # Check for publish response/errors
-        response = ws_manager.receive(timeout=1.0)
-        if response:
-            try:
-                msg_data = json.loads(response)
-                if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                    # Unadvertise before returning error
-                    ws_manager.send({"op": "unadvertise", "topic": topic})
-                    return {"error": f"Publish failed: {msg_data.get('msg', 'Unknown error')}"}
-            except json.JSONDecodeError:
-                pass  # Non-JSON response is usually fine for publish
-
-        # 3. Unadvertise the topic
-        unadvertise_msg = {"op": "unadvertise", "topic": topic}
-        ws_manager.send(unadvertise_msg)
+    adv, error = await conn.advertisements.publish(topic, msg_type, msg)
+    if error:
+        return {"error": f"Failed to publish message: {error}"}
 
     return {
         "success": True,
-        "note": "Message published using advertise → publish → unadvertise pattern",
+        "topic": topic,
+        "advertised_for_s": round(time.monotonic() - adv.created_at, 3),
+        "errors": adv.take_errors(),
     }
 
 
@@ -473,27 +1014,58 @@ def publish_once(topic: str = "", msg_type: str = "", msg: dict = {}) -> dict:
         "Subscribe to a topic for a duration and collect messages.\n"
         "Example:\n"
         "subscribe_for_duration(topic='/cmd_vel', msg_type='geometry_msgs/msg/TwistStamped', duration=5, max_messages=10)\n"
-        "subscribe_for_duration(topic='/high_rate_topic', msg_type='sensor_msgs/Image', duration=10, queue_length=5, throttle_rate_ms=100)  # Control message buffering and rate"
+        "subscribe_for_duration(topic='/high_rate_topic', msg_type='sensor_msgs/Image', duration=10, queue_length=5, throttle_rate_ms=100)  # Control message buffering and rate\n"
+        "subscribe_for_duration(topic='/scan', msg_type='sensor_msgs/LaserScan', duration=2, compression='cbor')  # Binary encoding for large messages\n"
+        "subscribe_for_duration(topic='/odom', msg_type='nav_msgs/Odometry', duration=5, aggregate=True)  # Per-field count/mean/min/max/std/last instead of messages\n"
+        "subscribe_for_duration(topic='/joint_states', msg_type='sensor_msgs/JointState', duration=2, fields=['position[3]'], where='velocity[3] != 0')  # Only some fields of matching messages\n"
+        "Many or large messages come in pages; pass 'next_cursor' to fetch_page for the rest."
     )
 )
-def subscribe_for_duration(
+@for_robots
+async def subscribe_for_duration(
     topic: str = "",
     msg_type: str = "",
     duration: float = 5.0,
-    max_messages: int = 100,
+    max_messages: Optional[int] = None,
     queue_length: Optional[int] = None,
     throttle_rate_ms: Optional[int] = None,
+    compression: Optional[str] = None,
+    aggregate: bool = False,
+    fields: Optional[List[str]] = None,
+    where: Optional[str] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    robot: Optional[str] = None,
 ) -> dict:
     """
     Subscribe to a ROS topic via rosbridge for a fixed duration and collect messages.
 
+    Messages are read from the topic's managed background subscription (started if needed),
+    so there is no subscribe/unsubscribe round trip per call.
+
     Args:
         topic (str): ROS topic name (e.g. "/cmd_vel", "/joint_states")
         msg_type (str): ROS message type (e.g. "geometry_msgs/Twist")
         duration (float): How long (seconds) to listen for messages
-        max_messages (int): Maximum number of messages to collect before stopping
+        max_messages (Optional[int]): Maximum number of messages to collect before stopping.
+            If None, 100, or no limit when aggregating.
         queue_length (Optional[int]): How many messages to buffer before dropping old ones. Must be ≥ 1.
         throttle_rate_ms (Optional[int]): Minimum interval between messages in milliseconds. Must be ≥ 0.
+        compression (Optional[str]): rosbridge wire encoding: "none", "png", "cbor" or "cbor-raw".
+            See subscribe_once.
+        aggregate (bool): Return statistics per numeric field instead of the messages. Messages
+            are folded into running statistics as they arrive and never stored, so memory use
+            doesn't grow with the duration or message rate.
+        fields (Optional[List[str]]): Field paths to return instead of the whole message, e.g.
+            ["pose.pose.position", "name[3]"]. The result maps each path to its value (None if absent).
+        where (Optional[str]): Filter on message fields, e.g. "twist.twist.linear.x > 0.1 and
+            header.frame_id == 'odom'". Supports comparisons, and/or/not, arithmetic and
+            abs/len/min/max/round. Messages that don't match, or lack a field, are
+            not collected (nor counted).
+        max_items (Optional[int]): Messages per page. Defaults to RESULT_PAGE_MAX_ITEMS.
+        max_bytes (Optional[int]): JSON bytes per page. Defaults to RESULT_PAGE_MAX_BYTES.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict:
@@ -502,7 +1074,22 @@ def subscribe_for_duration(
                 "collected_count": N,
                 "messages": [msg1, msg2, ...]
             }
+            or, with aggregate=True,
+            {
+                "topic": topic_name,
+                "collected_count": N,
+                "rate_hz": N / duration,
+                "fields": {"<path, e.g. twist.twist.linear.x>":
+                    {"count", "mean", "min", "max", "std", "last"}, ...}
+            }
+            Numeric arrays longer than 64 elements are summarized as a whole under "<path>[*]".
+            Both also carry "gaps": the connection outages during collection, each as
+            {"start_s" (offset from the start), "duration_s", "recovered"}. Messages published
+            during a gap were lost; the subscription is resent when the connection comes back.
+            When the messages don't fit in one page, "messages" holds the first page and
+            "page" has 'offset', 'items', 'total_items' and 'next_cursor' (see fetch_page).
     """
+    conn = robots.get(robot)
     # Validate critical args before subscribing
     if not topic or not msg_type:
         return {"error": "Missing required arguments: topic and msg_type must be provided."}
@@ -516,60 +1103,204 @@ def subscribe_for_duration(
     ):
         return {"error": "throttle_rate_ms must be an integer ≥ 0"}
 
-    # Send subscription request
-    subscribe_msg: dict = {
-        "op": "subscribe",
-        "topic": topic,
-        "type": msg_type,
-    }
+    if compression is not None and compression not in COMPRESSIONS:
+        return {"error": f"compression must be one of {', '.join(COMPRESSIONS)}"}
 
-    # Add optional parameters if provided
-    if queue_length is not None:
-        subscribe_msg["queue_length"] = queue_length
+    limit_error = _check_page_limits(max_items, max_bytes)
+    if limit_error:
+        return {"error": limit_error}
 
-    if throttle_rate_ms is not None:
-        subscribe_msg["throttle_rate"] = throttle_rate_ms
+    if max_messages is None:
+        max_messages = None if aggregate else 100
 
-    with ws_manager:
-        send_error = ws_manager.send(subscribe_msg)
-        if send_error:
-            return {"error": f"Failed to subscribe: {send_error}"}
+    try:
+        transform = compile_selection(fields, where)
+    except FieldPathError as e:
+        return {"error": str(e)}
+
+    # Reuse the background subscription, or start one
+    sub, send_error = await conn.subscriptions.ensure(
+        topic, msg_type, queue_length, throttle_rate_ms, compression=compression
+    )
+    if send_error:
+        return {"error": f"Failed to subscribe: {send_error}"}
 
+    aggregator = None
+    if aggregate:
+        from utils.aggregation import StreamAggregator  # loads numpy on first use
+
+        aggregator = StreamAggregator()
+    async with sub.listen(transform) as frames:
         collected_messages = []
+        collected_count = 0
         status_errors = []
-        end_time = time.time() + duration
+        start_time = time.time()
+        end_time = start_time + duration
+        # Connection gaps during the collection: drop time -> recovery time (None while down)
+        gaps = {sub.gap_since: None} if sub.gap_since is not None else {}
 
         # Loop until duration expires or we hit max_messages
-        while time.time() < end_time and len(collected_messages) < max_messages:
-            response = ws_manager.receive(timeout=0.5)  # non-blocking small timeout
-            if response is None:
-                continue  # idle timeout: no frame this tick
+        while time.time() < end_time and (max_messages is None or collected_count < max_messages):
+            try:
+                msg_data = await asyncio.wait_for(frames.get(), end_time - time.time())
+            except asyncio.TimeoutError:
+                break  # duration expired
 
-            msg_data = parse_json(response)
-            if not msg_data:
-                continue  # non-JSON or empty
+            # Connection dropped while collecting
+            if "error" in msg_data:
+                status_errors.append(msg_data["error"])
+                break
 
             # Check for status errors from rosbridge
             if msg_data.get("op") == "status" and msg_data.get("level") == "error":
                 status_errors.append(msg_data.get("msg", "Unknown error"))
                 continue
 
+            # The connection dropped or came back; messages in between were lost
+            if msg_data.get("op") == "gap":
+                gaps[msg_data["since"]] = msg_data["until"]
+                continue
+
             # Check for published messages matching our topic
-            if msg_data.get("op") == "publish" and msg_data.get("topic") == topic:
-                collected_messages.append(msg_data.get("msg", {}))
+            if msg_data.get("op") == "publish":
+                collected_count += 1
+                if aggregator is not None:
+                    aggregator.add(msg_data.get("msg", {}))
+                else:
+                    collected_messages.append(to_jsonable(msg_data.get("msg", {})))
+
+    stop_time = time.time()
+    gap_list = [
+        {
+            "start_s": round(max(since - start_time, 0.0), 3),
+            "duration_s": round(min(until or stop_time, stop_time) - max(since, start_time), 3),
+            "recovered": until is not None,
+        }
+        for since, until in sorted(gaps.items())
+    ]
 
-        # Unsubscribe when done
-        unsubscribe_msg = {"op": "unsubscribe", "topic": topic}
-        ws_manager.send(unsubscribe_msg)
+    if aggregator is not None:
+        elapsed = stop_time - start_time
+        return {
+            "topic": topic,
+            "collected_count": collected_count,
+            "rate_hz": round(collected_count / elapsed, 3) if elapsed > 0 else None,
+            "fields": aggregator.result(),
+            "status_errors": status_errors,
+            "gaps": gap_list,
+        }
 
-    return {
+    result = {
         "topic": topic,
         "collected_count": len(collected_messages),
         "messages": collected_messages,
         "status_errors": status_errors,  # Include any errors encountered during collection
+        "gaps": gap_list,  # Connection outages during collection; messages in them were lost
+    }
+    return _paginate("subscribe_for_duration", result, ("messages",), max_items, max_bytes)
+
+
+@mcp.tool(
+    description=(
+        "List the topics kept subscribed in the background, with buffer fill and message age.\n"
+        "Example:\n"
+        "list_subscriptions()"
+    )
+)
+@for_robots
+async def list_subscriptions(robot: Optional[str] = None) -> dict:
+    """
+    List the managed background subscriptions.
+
+    Args:
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: Contains a 'subscriptions' list with each topic's type, pinned state, number of
+            buffered and received messages, age of the latest message, idle time, and the
+            number and total length of connection gaps it was resubscribed after.
+    """
+    conn = robots.get(robot)
+    subs = conn.subscriptions.list()
+    return {
+        "subscriptions": subs,
+        "subscription_count": len(subs),
+        "expiry_s": conn.subscriptions.expiry,
     }
 
 
+@mcp.tool(
+    description=(
+        "Keep a topic subscribed in the background so it never expires (or unpin it again).\n"
+        "Example:\n"
+        "pin_subscription(topic='/odom', msg_type='nav_msgs/Odometry')\n"
+        "pin_subscription(topic='/odom', msg_type='nav_msgs/Odometry', pinned=False)  # Let it expire when unused"
+    )
+)
+@for_robots
+async def pin_subscription(
+    topic: str = "",
+    msg_type: str = "",
+    pinned: bool = True,
+    buffer_size: Optional[int] = None,
+    robot: Optional[str] = None,
+) -> dict:
+    """
+    Pin (or unpin) a managed background subscription, subscribing first if needed.
+
+    Args:
+        topic (str): The ROS topic name (e.g., "/odom").
+        msg_type (str): The ROS message type (e.g., "nav_msgs/Odometry").
+        pinned (bool): True to keep the subscription alive indefinitely, False to let it expire.
+        buffer_size (Optional[int]): Messages to keep for this topic if a new subscription is created.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: The subscription's state, or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    if not topic or not msg_type:
+        return {"error": "Missing required arguments: topic and msg_type must be provided."}
+
+    if buffer_size is not None and (not isinstance(buffer_size, int) or buffer_size < 1):
+        return {"error": "buffer_size must be an integer ≥ 1"}
+
+    sub, send_error = await conn.subscriptions.ensure(topic, msg_type, buffer_size=buffer_size)
+    if send_error:
+        return {"error": f"Failed to subscribe: {send_error}"}
+
+    sub.pinned = pinned
+    return sub.info()
+
+
+@mcp.tool(
+    description=(
+        "Unsubscribe a topic kept subscribed in the background and discard its buffer.\n"
+        "Example:\n"
+        "drop_subscription(topic='/odom')"
+    )
+)
+@for_robots
+async def drop_subscription(topic: str, robot: Optional[str] = None) -> dict:
+    """
+    Unsubscribe a managed background subscription and discard its buffered messages.
+
+    Args:
+        topic (str): The ROS topic name (e.g., "/odom").
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: {"success": True} if it was dropped, or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    if not await conn.subscriptions.drop(topic):
+        return {"error": f"No managed subscription for topic {topic}"}
+    return {"success": True, "topic": topic}
+
+
 @mcp.tool(
     description=(
         "Publish a sequence of messages with delays.\n"
@@ -577,17 +1308,31 @@ def subscribe_for_duration(
         "publish_for_durations(topic='/cmd_vel', msg_type='geometry_msgs/msg/TwistStamped', messages=[{'linear': {'x': 1.0}}, {'linear': {'x': 0.0}}], durations=[1, 2])"
     )
 )
-def publish_for_durations(
-    topic: str = "", msg_type: str = "", messages: list = [], durations: list = []
+@for_robots
+async def publish_for_durations(
+    topic: str = "",
+    msg_type: str = "",
+    messages: list = [],
+    durations: list = [],
+    robot: Optional[str] = None,
 ) -> dict:
     """
     Publish a sequence of messages to a given ROS topic with delays in between.
 
+    Each message is published on an absolute deadline (the sum of the preceding durations,
+    on the monotonic clock), so timing errors don't accumulate over the sequence. Error
+    status frames from rosbridge are collected by message id in the background, for
+    PUBLISH_STATUS_WINDOW seconds after each publish, instead of waiting for a reply after
+    every publish. The topic's advertisement is shared with the other publish tools and
+    kept until idle.
+
     Args:
         topic (str): ROS topic name (e.g., "/cmd_vel")
         msg_type (str): ROS message type (e.g., "geometry_msgs/Twist")
         messages (list): A list of message dictionaries (ROS-compatible payloads)
         durations (list): A list of durations (seconds) to wait between messages
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict:
@@ -595,10 +1340,13 @@ def publish_for_durations(
                 "success": True,
                 "published_count": <number of messages>,
                 "topic": topic,
-                "msg_type": msg_type
+                "msg_type": msg_type,
+                "timing": {"planned_s", "elapsed_s", "max_jitter_ms", "mean_jitter_ms",
+                           "step_jitter_ms": [<send time - deadline per message>, ...]}
             }
             OR {"error": "<error message>"} if something failed
     """
+    conn = robots.get(robot)
     # Validate critical args before publishing
     if not topic or not msg_type or messages == [] or durations == []:
         return {
@@ -609,68 +1357,560 @@ def publish_for_durations(
     if len(messages) != len(durations):
         return {"error": "messages and durations must have the same length"}
 
-    # Use proper advertise → publish → unadvertise pattern
-    with ws_manager:
-        # 1. Advertise the topic
-        advertise_msg = {"op": "advertise", "topic": topic, "type": msg_type}
-        send_error = ws_manager.send(advertise_msg)
-        if send_error:
-            return {"error": f"Failed to advertise topic: {send_error}"}
-
-        # Check for advertise response/errors
-        response = ws_manager.receive(timeout=1.0)
-        if response:
-            try:
-                msg_data = json.loads(response)
-                if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                    return {"error": f"Advertise failed: {msg_data.get('msg', 'Unknown error')}"}
-            except json.JSONDecodeError:
-                pass  # Non-JSON response is usually fine for advertise
+    if any(not isinstance(d, (int, float)) or d < 0 for d in durations):
+        return {"error": "durations must be numbers ≥ 0"}
 
-        published_count = 0
-        errors = []
+    # Status frames for a message carry its id; they are collected here as they arrive
+    # (on the reader thread) and read once the sequence is done. A dropped connection
+    # fails the ids too, but a message already sent isn't undone by it: only rosbridge's
+    # own error status marks one as failed.
+    status_errors: List[tuple] = []
 
-        # 2. Iterate and publish each message with a delay
-        for i, (msg, delay) in enumerate(zip(messages, durations)):
-            # Build the rosbridge publish message
-            publish_msg = {"op": "publish", "topic": topic, "msg": msg}
+    def on_status(step: int):
+        def handler(frame: dict):
+            if frame.get("op") == "status" and frame.get("level") == "error":
+                status_errors.append((step, frame.get("msg", "Unknown error")))
 
-            # Send it
-            send_error = ws_manager.send(publish_msg)
-            if send_error:
-                errors.append(f"Message {i + 1}: {send_error}")
-                continue  # Continue with next message instead of failing completely
+        return handler
 
-            # Check for publish response/errors
-            response = ws_manager.receive(timeout=1.0)
-            if response:
-                try:
-                    msg_data = json.loads(response)
-                    if msg_data.get("op") == "status" and msg_data.get("level") == "error":
-                        errors.append(f"Message {i + 1}: {msg_data.get('msg', 'Unknown error')}")
-                        continue
-                except json.JSONDecodeError:
-                    pass  # Non-JSON response is usually fine for publish
+    # 1. Advertise the topic, or reuse its advertisement
+    adv, error = await conn.advertisements.acquire(topic, msg_type)
+    if error:
+        return {"error": f"Failed to advertise topic: {error}"}
+    listening: deque = deque()  # (time to stop listening, publish id), oldest first
 
-            published_count += 1
+    loop = asyncio.get_running_loop()
+    errors = []
+    sent = 0
+    jitter = []
 
-            # Wait before sending the next message
-            time.sleep(delay)
-
-        # 3. Unadvertise the topic
-        unadvertise_msg = {"op": "unadvertise", "topic": topic}
-        ws_manager.send(unadvertise_msg)
+    # 2. Publish each message at its deadline
+    start = deadline = loop.time()
+    try:
+        for i, (msg, delay) in enumerate(zip(messages, durations)):
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            while listening and listening[0][0] <= loop.time():
+                conn.ws_manager.unregister_request(listening.popleft()[1])
+
+            publish_id = conn.ws_manager.next_id(f"publish_{topic}")
+            listening.append((loop.time() + PUBLISH_STATUS_WINDOW, publish_id))
+            conn.ws_manager.register_request(publish_id, on_status(i + 1))
+            send_error = await conn.ws_manager.send(
+                {"op": "publish", "id": publish_id, "topic": topic, "msg": msg}
+            )
+            jitter.append(loop.time() - deadline)
+            if send_error:
+                errors.append(f"Message {i + 1}: {send_error}")
+            else:
+                sent += 1
+            deadline += delay
+
+        # Hold the last message for its duration, as before
+        remaining = deadline - loop.time()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        elapsed = loop.time() - start
+    finally:
+        # 3. Release the advertisement; the registry unadvertises it once idle
+        conn.advertisements.release(adv)
+        for _, publish_id in listening:
+            conn.ws_manager.unregister_request(publish_id)
+
+    errors.extend(f"Advertise failed: {message}" for message in adv.take_errors())
+    failed_steps = set()
+    for step, message in status_errors:
+        failed_steps.add(step)
+        errors.append(f"Message {step}: {message}")
 
     return {
         "success": True,
-        "published_count": published_count,
+        "published_count": sent - len(failed_steps),
         "total_messages": len(messages),
         "topic": topic,
         "msg_type": msg_type,
+        "timing": {
+            "planned_s": round(sum(durations), 6),
+            "elapsed_s": round(elapsed, 6),
+            "max_jitter_ms": round(max(jitter) * 1000, 3),
+            "mean_jitter_ms": round(sum(jitter) / len(jitter) * 1000, 3),
+            "step_jitter_ms": [round(j * 1000, 3) for j in jitter],
+        },
         "errors": errors,  # Include any errors encountered during publishing
     }
 
 
+def _check_rate(rate_hz) -> Optional[str]:
+    if isinstance(rate_hz, bool) or not isinstance(rate_hz, (int, float)):
+        return "rate_hz must be a number"
+    if not 0 < rate_hz <= PUBLISHER_MAX_RATE_HZ:
+        return f"rate_hz must be > 0 and ≤ {PUBLISHER_MAX_RATE_HZ}"
+    return None
+
+
+@mcp.tool(
+    description=(
+        "Start publishing a message at a fixed rate in the background. Returns a session_id right away.\n"
+        "Give either msg (constant) or keyframes ([{'t': seconds, 'msg': {...}}]) to change the message over time.\n"
+        "Example:\n"
+        "start_publisher(topic='/cmd_vel', msg_type='geometry_msgs/Twist', rate_hz=20, msg={'linear': {'x': 0.2}}, duration=5)\n"
+        "start_publisher(topic='/cmd_vel', msg_type='geometry_msgs/Twist', rate_hz=20, keyframes=[{'t': 0, 'msg': {'linear': {'x': 0.0}}}, {'t': 2, 'msg': {'linear': {'x': 0.5}}}], interpolation='linear')  # Ramp up over 2 s"
+    )
+)
+@for_robots
+async def start_publisher(
+    topic: str = "",
+    msg_type: str = "",
+    rate_hz: float = 10.0,
+    msg: Optional[dict] = None,
+    keyframes: Optional[List[dict]] = None,
+    interpolation: str = "step",
+    loop: bool = False,
+    duration: Optional[float] = None,
+    stop_msg: Optional[dict] = None,
+    robot: Optional[str] = None,
+) -> dict:
+    """
+    Start a background publisher session.
+
+    Messages are sent on fixed deadlines of the monotonic clock. If the server falls behind
+    by more than a period, the skipped sends are counted as missed deadlines, not sent late.
+
+    Args:
+        topic (str): The ROS topic name (e.g., "/cmd_vel").
+        msg_type (str): The ROS message type (e.g., "geometry_msgs/Twist").
+        rate_hz (float): Publishing rate in Hz.
+        msg (Optional[dict]): A message to publish unchanged. Mutually exclusive with keyframes.
+        keyframes (Optional[List[dict]]): Messages at times ("t", seconds from start). Before the first
+            and after the last keyframe, that keyframe's message is published.
+        interpolation (str): "step" holds each keyframe until the next; "linear" blends numeric
+            fields between keyframes (a ramp).
+        loop (bool): Restart the keyframe timeline after its last keyframe.
+        duration (Optional[float]): Stop automatically after this many seconds. None runs until
+            stop_publisher is called.
+        stop_msg (Optional[dict]): A message published once when the session stops (e.g. a zero Twist).
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: The session's state including "session_id", or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    if not topic or not msg_type:
+        return {"error": "Missing required arguments: topic and msg_type must be provided."}
+    if (msg is None) == (keyframes is None):
+        return {"error": "Provide exactly one of msg or keyframes"}
+    rate_error = _check_rate(rate_hz)
+    if rate_error:
+        return {"error": rate_error}
+    if interpolation not in INTERPOLATIONS:
+        return {"error": f"interpolation must be one of {list(INTERPOLATIONS)}"}
+    if duration is not None and duration <= 0:
+        return {"error": "duration must be > 0"}
+    try:
+        frames = parse_keyframes(keyframes if keyframes is not None else [{"t": 0.0, "msg": msg}])
+    except ValueError as e:
+        return {"error": str(e)}
+
+    session, error = await conn.publishers.start(
+        topic, msg_type, float(rate_hz), frames, interpolation, loop, duration, stop_msg
+    )
+    if error:
+        return {"error": f"Failed to advertise: {error}"}
+    return session.info()
+
+
+@mcp.tool(
+    description=(
+        "Change the message, keyframes or rate of a running background publisher.\n"
+        "Example:\n"
+        "update_publisher(session_id='pub-1', msg={'linear': {'x': 0.0}})\n"
+        "update_publisher(session_id='pub-1', rate_hz=50)"
+    )
+)
+@for_robots
+async def update_publisher(
+    session_id: str,
+    msg: Optional[dict] = None,
+    keyframes: Optional[List[dict]] = None,
+    rate_hz: Optional[float] = None,
+    interpolation: Optional[str] = None,
+    loop: Optional[bool] = None,
+    robot: Optional[str] = None,
+) -> dict:
+    """
+    Update a background publisher session in place, without re-advertising.
+
+    Args:
+        session_id (str): The id returned by start_publisher.
+        msg (Optional[dict]): Replace the message (or timeline) with this constant message.
+        keyframes (Optional[List[dict]]): Replace the timeline; it restarts at t=0.
+        rate_hz (Optional[float]): New publishing rate. Resets the achieved-rate statistics.
+        interpolation (Optional[str]): "step" or "linear".
+        loop (Optional[bool]): Whether the timeline repeats.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: The session's state, or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    session = conn.publishers.sessions.get(session_id)
+    if session is None:
+        return {"error": f"No publisher session {session_id}"}
+    if not session.running:
+        return {"error": f"Publisher session {session_id} has stopped ({session.stopped_reason})"}
+    if msg is not None and keyframes is not None:
+        return {"error": "Provide at most one of msg or keyframes"}
+    if rate_hz is not None:
+        rate_error = _check_rate(rate_hz)
+        if rate_error:
+            return {"error": rate_error}
+    if interpolation is not None and interpolation not in INTERPOLATIONS:
+        return {"error": f"interpolation must be one of {list(INTERPOLATIONS)}"}
+    frames = None
+    if msg is not None or keyframes is not None:
+        try:
+            frames = parse_keyframes(
+                keyframes if keyframes is not None else [{"t": 0.0, "msg": msg}]
+            )
+        except ValueError as e:
+            return {"error": str(e)}
+
+    session.update(
+        rate_hz=float(rate_hz) if rate_hz is not None else None,
+        keyframes=frames,
+        interpolation=interpolation,
+        loop=loop,
+    )
+    return session.info()
+
+
+@mcp.tool(
+    description=(
+        "Stop a background publisher, publish its stop_msg if any, and report its final statistics.\n"
+        "Example:\n"
+        "stop_publisher(session_id='pub-1')"
+    )
+)
+@for_robots
+async def stop_publisher(session_id: str, robot: Optional[str] = None) -> dict:
+    """
+    Stop a background publisher session. Its topic stays advertised until idle.
+
+    Args:
+        session_id (str): The id returned by start_publisher.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: The session's final state (published count, achieved rate, missed deadlines,
+            errors), or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    session = await conn.publishers.stop(session_id)
+    if session is None:
+        return {"error": f"No publisher session {session_id}"}
+    return session.info()
+
+
+@mcp.tool(
+    description=(
+        "List background publisher sessions with their target and achieved rates and missed deadlines.\n"
+        "Example:\n"
+        "list_publishers()"
+    )
+)
+@for_robots
+async def list_publishers(robot: Optional[str] = None) -> dict:
+    """
+    List background publisher sessions, including ones whose duration has elapsed.
+
+    Args:
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: Contains a 'publishers' list with each session's topic, rate_hz, achieved_rate_hz,
+            published count, missed_deadlines, jitter and recent errors.
+    """
+    conn = robots.get(robot)
+    sessions = conn.publishers.list()
+    return {"publishers": sessions, "publisher_count": len(sessions)}
+
+
+@mcp.tool(
+    description=(
+        "List the topics kept advertised between publishes, with publish counts and pending errors.\n"
+        "Example:\n"
+        "list_advertisements()"
+    )
+)
+@for_robots
+async def list_advertisements(robot: Optional[str] = None) -> dict:
+    """
+    List the topics the server currently advertises.
+
+    Args:
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: Contains an 'advertisements' list with each topic's type, number of publishers
+            holding it, publish count, errors not yet reported and idle time.
+    """
+    conn = robots.get(robot)
+    advs = conn.advertisements.list()
+    return {
+        "advertisements": advs,
+        "advertisement_count": len(advs),
+        "idle_timeout_s": conn.advertisements.idle_timeout,
+    }
+
+
+@mcp.tool(
+    description=(
+        "Unadvertise a topic now instead of waiting for it to go idle.\n"
+        "Example:\n"
+        "unadvertise_topic(topic='/cmd_vel')"
+    )
+)
+@for_robots
+async def unadvertise_topic(topic: str, robot: Optional[str] = None) -> dict:
+    """
+    Unadvertise a topic kept advertised between publishes.
+
+    Args:
+        topic (str): The ROS topic name (e.g., "/cmd_vel").
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: {"success": True} if it was unadvertised, or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    if not await conn.advertisements.unadvertise(topic):
+        return {"error": f"Topic {topic} is not advertised"}
+    return {"success": True, "topic": topic}
+
+
+## ############################################################################################## ##
+##
+##                       TOPIC RECORDINGS
+##
+## ############################################################################################## ##
+
+
+@mcp.tool(
+    description=(
+        "Start recording topics to a file in the background, for later analysis with "
+        "query_recording. Messages are streamed to disk as they arrive, not kept in memory.\n"
+        "Example:\n"
+        "start_recording(topics=['/odom', '/scan', '/joint_states'])\n"
+        "start_recording(topics=['/odom'], msg_types=['nav_msgs/Odometry'], name='odom_run1', duration=120)"
+    )
+)
+@for_robots
+async def start_recording(
+    topics: List[str],
+    msg_types: Optional[List[str]] = None,
+    name: Optional[str] = None,
+    compression: str = "zlib",
+    duration: Optional[float] = None,
+    robot: Optional[str] = None,
+) -> dict:
+    """
+    Record messages from topics to an append-only file in RECORDING_DIR.
+
+    Each topic is read from its managed background subscription (started if needed). A
+    writer thread compresses and writes the messages, so recording doesn't slow down the
+    connection.
+
+    Args:
+        topics (List[str]): Topics to record (e.g., ['/odom', '/scan']).
+        msg_types (Optional[List[str]]): Message type of each topic, in the same order.
+            Looked up on the robot if omitted.
+        name (Optional[str]): File name (letters, digits, '-', '_', '.'); '.rec' is appended.
+            Defaults to '<robot>-<date>-<time>-<number>'.
+        compression (str): "zlib" (per message) or "none".
+        duration (Optional[float]): Stop automatically after this many seconds. None records
+            until stop_recording is called.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: The recording's state including "recording_id" and "path", or
+            {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    if not topics or len(set(topics)) != len(topics):
+        return {"error": "topics must be a non-empty list of distinct topic names"}
+    if msg_types is not None and len(msg_types) != len(topics):
+        return {"error": "msg_types must have one type per topic"}
+    if compression not in RECORDING_COMPRESSIONS:
+        return {"error": f"compression must be one of {', '.join(RECORDING_COMPRESSIONS)}"}
+    if duration is not None and duration <= 0:
+        return {"error": "duration must be > 0"}
+
+    if msg_types is None:
+        msg_types = []
+        for topic in topics:
+            result = await get_topic_type(topic, robot=robot)
+            if "error" in result:
+                return {"error": f"Cannot record {topic}: {result['error']}"}
+            msg_types.append(result["type"])
+
+    recording, error = await conn.recordings.start(
+        dict(zip(topics, msg_types)),
+        name,
+        compression,
+        duration,
+        metadata={"robot": conn.name, "ip": conn.ws_manager.ip, "port": conn.ws_manager.port},
+    )
+    if error:
+        return {"error": error}
+    return recording.info()
+
+
+@mcp.tool(
+    description=(
+        "Stop a recording started with start_recording and finish its file.\n"
+        "Example:\n"
+        "stop_recording(recording_id='rec-1')"
+    )
+)
+@for_robots
+async def stop_recording(recording_id: str, robot: Optional[str] = None) -> dict:
+    """
+    Stop a recording: write what is still queued, then the file's time index.
+
+    Args:
+        recording_id (str): The id returned by start_recording.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: The recording's final state (path, messages per topic, bytes, compression
+            ratio, dropped messages, connection gaps), or {"error": "<error message>"}.
+    """
+    conn = robots.get(robot)
+    recording = await conn.recordings.stop(recording_id)
+    if recording is None:
+        return {"error": f"No recording {recording_id!r}"}
+    return recording.info()
+
+
+@mcp.tool(
+    description=(
+        "List recordings in progress and the recording files available to query_recording.\n"
+        "Example:\n"
+        "list_recordings()"
+    )
+)
+@for_robots
+async def list_recordings(robot: Optional[str] = None) -> dict:
+    """
+    List the robot's recordings and the files in RECORDING_DIR.
+
+    Args:
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: 'recordings', the state of each recording started on this robot and not yet
+            stopped with stop_recording, and 'files', each with name, bytes and modified
+            (Unix time), newest first.
+    """
+    conn = robots.get(robot)
+    files = []
+    if os.path.isdir(RECORDING_DIR):
+        for entry in os.scandir(RECORDING_DIR):
+            if entry.is_file() and entry.name.endswith(RECORDING_EXTENSION):
+                stat = entry.stat()
+                files.append({"name": entry.name, "bytes": stat.st_size, "modified": stat.st_mtime})
+    files.sort(key=lambda f: f["modified"], reverse=True)
+    return {"recordings": conn.recordings.list(), "files": files}
+
+
+@mcp.tool(
+    description=(
+        "Compute statistics over numeric fields of a recording without reading its messages into "
+        "the context. Fields are '<topic>:<path>'; reduce arrays with min(), max(), mean(), sum() "
+        "or len(). Times are seconds since the recording's first message.\n"
+        "Example:\n"
+        "query_recording(recording='odom_run1', fields=['/odom:twist.twist.linear.x'], start=30, end=60, stats=['max', 't_max'])\n"
+        "query_recording(recording='odom_run1', fields=['/scan:min(ranges)'], threshold=0.3)  # How often min range went below 0.3 m\n"
+        "query_recording(recording='odom_run1', fields=['/odom:twist.twist.linear.x', '/odom:twist.twist.angular.z'], window=5)  # Stats per 5 s window\n"
+        "query_recording(recording='odom_run1', fields=['/odom:pose.pose.position.x'], resample_hz=2)"
+    )
+)
+async def query_recording(
+    recording: str,
+    fields: List[str],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    stats: Optional[List[str]] = None,
+    threshold: Optional[float] = None,
+    resample_hz: Optional[float] = None,
+    window: Optional[float] = None,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> dict:
+    """
+    Load numeric fields of a recording into columns and aggregate them.
+
+    Only the records of the fields' topics between start and end are decoded, and only the
+    fields' values are kept, so a query's memory grows with what it asks for. The recording
+    may still be running.
+
+    Args:
+        recording (str): Recording file name, as in list_recordings (".rec" optional).
+        fields (List[str]): Fields as '<topic>:<path>' (e.g. '/odom:twist.twist.linear.x',
+            '/joint_states:position[2]'), or '<topic>:<reduction>(<path>)' to reduce an array
+            to one number per message (e.g. '/scan:min(ranges)').
+        start (Optional[float]): Seconds since the first message. Defaults to the beginning.
+        end (Optional[float]): Seconds since the first message. Defaults to the end.
+        stats (Optional[List[str]]): Statistics of each field: count, mean, std, min, max,
+            sum, median, first, last, t_min / t_max (time of the min / max), or a percentile
+            such as p95. Defaults to count, mean, std, min, max. With window, only count,
+            mean, std, min, max, sum, first and last.
+        threshold (Optional[float]): Also count the episodes (runs of samples) each field
+            spent below and at or above this value, with their total and longest duration
+            and when they started.
+        resample_hz (Optional[float]): Also return the fields linearly interpolated onto a
+            uniform grid of this rate, as "rows" of [t, field1, field2, ...].
+        window (Optional[float]): Also return stats over consecutive windows of this many
+            seconds, as "rows" of [t, field1.stat1, field1.stat2, ...] (t = window start).
+        max_items (Optional[int]): Rows per page. Defaults to RESULT_PAGE_MAX_ITEMS.
+        max_bytes (Optional[int]): JSON bytes per page. Defaults to RESULT_PAGE_MAX_BYTES.
+
+    Returns:
+        dict: 'start' and 'end' of the range queried, 'messages' read per topic, 'fields' with
+            the stats (and threshold episodes) of each field, and with resample_hz or window
+            'columns' and 'rows'; or {"error": "<error message>"}.
+    """
+    # Imported here so numpy is only loaded once a recording is queried
+    from utils.recording_query import query
+
+    limit_error = _check_page_limits(max_items, max_bytes)
+    if limit_error:
+        return {"error": limit_error}
+    try:
+        path = recording_path(RECORDING_DIR, recording)
+        result = await asyncio.to_thread(
+            query, path, fields, start, end, stats, threshold, resample_hz, window
+        )
+    except FileNotFoundError:
+        return {"error": f"No recording {recording!r}; see list_recordings"}
+    except (OSError, ValueError) as e:
+        return {"error": str(e)}
+    result = {"recording": os.path.basename(path), **result}
+    if "rows" not in result:
+        return result
+    return _paginate("query_recording", result, ("rows",), max_items, max_bytes)
+
+
 ## ############################################################################################## ##
 ##
 ##                       ROS SERVICES
@@ -678,15 +1918,49 @@ def publish_for_durations(
 ## ############################################################################################## ##
 
 
-@mcp.tool(description=("Get list of all available ROS services.\nExample:\nget_services()"))
-def get_services() -> dict:
+@mcp.tool(
+    description=(
+        "Get list of all available ROS services. Long lists come in pages; pass "
+        "'next_cursor' to fetch_page for the rest.\n"
+        "Example:\n"
+        "get_services()"
+    )
+)
+@for_robots
+async def get_services(
+    max_items: Optional[int] = None, max_bytes: Optional[int] = None, robot: Optional[str] = None
+) -> dict:
     """
     Get list of all available ROS services.
 
+    Args:
+        max_items (Optional[int]): Services per page. Defaults to RESULT_PAGE_MAX_ITEMS.
+        max_bytes (Optional[int]): JSON bytes per page. Defaults to RESULT_PAGE_MAX_BYTES.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
     Returns:
         dict: Contains list of all active services,
             or a message string if no services are found.
+            When there are more than fit in a page, also 'page' with 'offset', 'items',
+            'total_items' and 'next_cursor' (see fetch_page).
     """
+    conn = robots.get(robot)
+    limit_error = _check_page_limits(max_items, max_bytes)
+    if limit_error:
+        return {"error": limit_error}
+
+    # Serve from the graph snapshot when it is fresh
+    snapshot = await conn.graph_cache.get()
+    if snapshot is not None:
+        services = list(snapshot["services"])
+        result = {
+            "services": services,
+            "service_count": len(services),
+            "graph_hash": snapshot["hash"],
+        }
+        return _paginate("get_services", result, ("services",), max_items, max_bytes)
+
     # rosbridge service call to get service list
     message = {
         "op": "call_service",
@@ -697,8 +1971,7 @@ def get_services() -> dict:
     }
 
     # Request service list from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -709,7 +1982,8 @@ def get_services() -> dict:
     # Return service info if present
     if response and "values" in response:
         services = response["values"].get("services", [])
-        return {"services": services, "service_count": len(services)}
+        result = {"services": services, "service_count": len(services)}
+        return _paginate("get_services", result, ("services",), max_items, max_bytes)
     else:
         return {"warning": "No services found"}
 
@@ -719,17 +1993,21 @@ def get_services() -> dict:
         "Get the service type for a specific service.\nExample:\nget_service_type('/rosapi/topics')"
     )
 )
-def get_service_type(service: str) -> dict:
+@for_robots
+async def get_service_type(service: str, robot: Optional[str] = None) -> dict:
     """
     Get the service type for a specific service.
 
     Args:
         service (str): The service name (e.g., '/rosapi/topics')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains the service type,
             or an error message if service doesn't exist.
     """
+    conn = robots.get(robot)
     # Validate input
     if not service or not service.strip():
         return {"error": "Service name cannot be empty"}
@@ -744,8 +2022,7 @@ def get_service_type(service: str) -> dict:
     }
 
     # Request service type from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -771,25 +2048,30 @@ def get_service_type(service: str) -> dict:
         "get_service_details('my_package/CustomService')"
     )
 )
-def get_service_details(service_type: str) -> dict:
+@for_robots
+async def get_service_details(service_type: str, robot: Optional[str] = None) -> dict:
     """
     Get complete service details including request and response structures.
 
     Args:
         service_type (str): The service type (e.g., 'my_package/CustomService')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains complete service definition with request and response structures.
     """
+    conn = robots.get(robot)
     # Validate input
     if not service_type or not service_type.strip():
         return {"error": "Service type cannot be empty"}
 
     result = {"service_type": service_type, "request": {}, "response": {}}
 
-    # Get both request and response details in a single WebSocket context
-    with ws_manager:
-        # Get request details
+    # Get both request and response details, serving repeats from the schema cache
+    # Get request details
+    request_typedefs = conn.schema_cache.get(f"{service_type}:request")
+    if request_typedefs is None:
         request_message = {
             "op": "call_service",
             "service": "/rosapi/service_request_details",
@@ -798,19 +2080,22 @@ def get_service_details(service_type: str) -> dict:
             "id": f"get_service_details_request_{service_type.replace('/', '_')}",
         }
 
-        request_response = ws_manager.request(request_message)
+        request_response = await conn.ws_manager.request(request_message)
         if request_response and "values" in request_response:
-            typedefs = request_response["values"].get("typedefs", [])
-            if typedefs:
-                for typedef in typedefs:
-                    field_names = typedef.get("fieldnames", [])
-                    field_types = typedef.get("fieldtypes", [])
-                    fields = {}
-                    for name, ftype in zip(field_names, field_types):
-                        fields[name] = ftype
-                    result["request"] = {"fields": fields, "field_count": len(fields)}
-
-        # Get response details
+            request_typedefs = request_response["values"].get("typedefs", [])
+            conn.schema_cache.put(f"{service_type}:request", request_typedefs)
+
+    for typedef in request_typedefs or []:
+        field_names = typedef.get("fieldnames", [])
+        field_types = typedef.get("fieldtypes", [])
+        fields = {}
+        for name, ftype in zip(field_names, field_types):
+            fields[name] = ftype
+        result["request"] = {"fields": fields, "field_count": len(fields)}
+
+    # Get response details
+    response_typedefs = conn.schema_cache.get(f"{service_type}:response")
+    if response_typedefs is None:
         response_message = {
             "op": "call_service",
             "service": "/rosapi/service_response_details",
@@ -819,17 +2104,18 @@ def get_service_details(service_type: str) -> dict:
             "id": f"get_service_details_response_{service_type.replace('/', '_')}",
         }
 
-        response_response = ws_manager.request(response_message)
+        response_response = await conn.ws_manager.request(response_message)
         if response_response and "values" in response_response:
-            typedefs = response_response["values"].get("typedefs", [])
-            if typedefs:
-                for typedef in typedefs:
-                    field_names = typedef.get("fieldnames", [])
-                    field_types = typedef.get("fieldtypes", [])
-                    fields = {}
-                    for name, ftype in zip(field_names, field_types):
-                        fields[name] = ftype
-                    result["response"] = {"fields": fields, "field_count": len(fields)}
+            response_typedefs = response_response["values"].get("typedefs", [])
+            conn.schema_cache.put(f"{service_type}:response", response_typedefs)
+
+    for typedef in response_typedefs or []:
+        field_names = typedef.get("fieldnames", [])
+        field_types = typedef.get("fieldtypes", [])
+        fields = {}
+        for name, ftype in zip(field_names, field_types):
+            fields[name] = ftype
+        result["response"] = {"fields": fields, "field_count": len(fields)}
 
     # Check if we got any data
     if not result["request"] and not result["response"]:
@@ -845,21 +2131,31 @@ def get_service_details(service_type: str) -> dict:
         "get_service_providers('/rosapi/topics')"
     )
 )
-def get_service_providers(service: str) -> dict:
+@for_robots
+async def get_service_providers(service: str, robot: Optional[str] = None) -> dict:
     """
     Get list of nodes that provide a specific service.
 
     Args:
         service (str): The service name (e.g., '/rosapi/topics')
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains list of nodes providing this service,
             or an error message if service doesn't exist.
     """
+    conn = robots.get(robot)
     # Validate input
     if not service or not service.strip():
         return {"error": "Service name cannot be empty"}
 
+    # Serve from the graph snapshot when it is fresh and knows the service
+    snapshot = await conn.graph_cache.get()
+    providers = snapshot["services"].get(service, {}).get("providers") if snapshot else None
+    if providers is not None:
+        return {"service": service, "providers": providers, "provider_count": len(providers)}
+
     # rosbridge service call to get service providers
     message = {
         "op": "call_service",
@@ -870,8 +2166,7 @@ def get_service_providers(service: str) -> dict:
     }
 
     # Request service providers from rosbridge
-    with ws_manager:
-        response = ws_manager.request(message)
+    response = await conn.ws_manager.request(message)
 
     # Return service providers if present
     if response and "values" in response:
@@ -883,19 +2178,46 @@ def get_service_providers(service: str) -> dict:
 
 @mcp.tool(
     description=(
-        "Get comprehensive information about all services including types and providers.\n"
+        "Get comprehensive information about all services including types and providers. "
+        "Many services come in pages; pass 'next_cursor' to fetch_page for the rest.\n"
         "Example:\n"
-        "inspect_all_services()"
+        "inspect_all_services()\n"
+        "inspect_all_services(max_in_flight=16)  # Limit concurrent lookups on a constrained rosbridge"
     )
 )
-def inspect_all_services() -> dict:
+@for_robots
+async def inspect_all_services(
+    max_in_flight: int = 64,
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    robot: Optional[str] = None,
+) -> dict:
     """
     Get comprehensive information about all services including types and providers.
 
+    The per-service lookups are pipelined over the shared connection, so the whole
+    inspection costs roughly one round trip instead of two per service.
+
+    Args:
+        max_in_flight (int): Maximum number of lookups awaiting a reply at once. Must be ≥ 1.
+        max_items (Optional[int]): Services per page. Defaults to RESULT_PAGE_MAX_ITEMS.
+        max_bytes (Optional[int]): JSON bytes per page. Defaults to RESULT_PAGE_MAX_BYTES.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
     Returns:
         dict: Contains detailed information about all services,
             including service names, types, and provider nodes.
+            When there are more than fit in a page, also 'page' with 'offset', 'items',
+            'total_items' and 'next_cursor' (see fetch_page).
     """
+    conn = robots.get(robot)
+    if not isinstance(max_in_flight, int) or max_in_flight < 1:
+        return {"error": "max_in_flight must be an integer ≥ 1"}
+    limit_error = _check_page_limits(max_items, max_bytes)
+    if limit_error:
+        return {"error": limit_error}
+
     # First get all services
     services_message = {
         "op": "call_service",
@@ -905,62 +2227,68 @@ def inspect_all_services() -> dict:
         "id": "inspect_all_services_request_1",
     }
 
-    with ws_manager:
-        services_response = ws_manager.request(services_message)
+    services_response = await conn.ws_manager.request(services_message)
 
-        if not services_response or "values" not in services_response:
-            return {"error": "Failed to get services list"}
+    if not services_response or "values" not in services_response:
+        return {"error": "Failed to get services list"}
 
-        services = services_response["values"].get("services", [])
-        service_details = {}
+    services = services_response["values"].get("services", [])
+    service_details = {}
 
-        # Get details for each service
-        service_errors = []
-        for service in services:
-            # Get service type
-            type_message = {
+    # Send the type and providers lookups for every service at once; the replies are
+    # matched back to their requests by id in whatever order rosbridge answers them
+    requests = []
+    for service in services:
+        requests.append(
+            {
                 "op": "call_service",
                 "service": "/rosapi/service_type",
                 "type": "rosapi/ServiceType",
                 "args": {"service": service},
                 "id": f"get_type_{service.replace('/', '_')}",
             }
-
-            type_response = ws_manager.request(type_message)
-            service_type = ""
-            if type_response and "values" in type_response:
-                service_type = type_response["values"].get("type", "unknown")
-            elif type_response and "error" in type_response:
-                service_errors.append(f"Service {service}: {type_response['error']}")
-
-            # Get service providers
-            providers_message = {
+        )
+        requests.append(
+            {
                 "op": "call_service",
                 "service": "/rosapi/service_providers",
                 "type": "rosapi/ServiceProviders",
                 "args": {"service": service},
                 "id": f"get_providers_{service.replace('/', '_')}",
             }
-
-            providers_response = ws_manager.request(providers_message)
-            providers = []
-            if providers_response and "values" in providers_response:
-                providers = providers_response["values"].get("providers", [])
-            elif providers_response and "error" in providers_response:
-                service_errors.append(f"Service {service} providers: {providers_response['error']}")
-
-            service_details[service] = {
-                "type": service_type,
-                "providers": providers,
-                "provider_count": len(providers),
-            }
-
-        return {
-            "total_services": len(services),
-            "services": service_details,
-            "service_errors": service_errors,  # Include any errors encountered during inspection
+        )
+    responses = await conn.ws_manager.request_many(requests, max_in_flight=max_in_flight)
+
+    # Get details for each service
+    service_errors = []
+    for i, service in enumerate(services):
+        type_response, providers_response = responses[2 * i], responses[2 * i + 1]
+
+        service_type = ""
+        if type_response and "values" in type_response:
+            service_type = type_response["values"].get("type", "unknown")
+        elif type_response and "error" in type_response:
+            service_errors.append(f"Service {service}: {type_response['error']}")
+
+        providers = []
+        if providers_response and "values" in providers_response:
+            providers = providers_response["values"].get("providers", [])
+        elif providers_response and "error" in providers_response:
+            service_errors.append(f"Service {service} providers: {providers_response['error']}")
+
+        service_details[service] = {
+            "type": service_type,
+            "providers": providers,
+            "provider_count": len(providers),
         }
 
+    result = {
+        "total_services": len(services),
+        "services": service_details,
+        "service_errors": service_errors,  # Include any errors encountered during inspection
+    }
+    return _paginate("inspect_all_services", result, ("services",), max_items, max_bytes)
+
 
 @mcp.tool(
     description=(
@@ -970,8 +2298,13 @@ def inspect_all_services() -> dict:
         "call_service('/slow_service', 'my_package/SlowService', {}, timeout=10.0)  # Specify timeout only for slow services"
     )
 )
-def call_service(
-    service_name: str, service_type: str, request: dict, timeout: Optional[float] = None
+@for_robots
+async def call_service(
+    service_name: str,
+    service_type: str,
+    request: dict,
+    timeout: Optional[float] = None,
+    robot: Optional[str] = None,
 ) -> dict:
     """
     Call a ROS service with specified request data.
@@ -981,10 +2314,13 @@ def call_service(
         service_type (str): The service type (e.g., 'rosapi/Topics')
         request (dict): Service request data as a dictionary
         timeout (Optional[float]): Timeout in seconds. If None, uses the default timeout.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
 
     Returns:
         dict: Contains the service response or error information.
     """
+    conn = robots.get(robot)
     # rosbridge service call
     message = {
         "op": "call_service",
@@ -995,8 +2331,7 @@ def call_service(
     }
 
     # Call the service through rosbridge
-    with ws_manager:
-        response = ws_manager.request(message, timeout=timeout)
+    response = await conn.ws_manager.request(message, timeout=timeout)
 
     # Check for service response errors first
     if response and "result" in response and not response["result"]:
@@ -1045,6 +2380,148 @@ def call_service(
         }
 
 
+@mcp.tool(
+    description=(
+        "Get hit/miss counters for the message and service type definition cache.\n"
+        "Example:\n"
+        "get_schema_cache_stats()"
+    )
+)
+@for_robots
+async def get_schema_cache_stats(robot: Optional[str] = None) -> dict:
+    """
+    Get hit/miss counters for the message and service type definition cache.
+
+    Args:
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: Number of cached type definitions, capacity, hits, misses and hit rate.
+    """
+    conn = robots.get(robot)
+    return conn.schema_cache.stats()
+
+
+@mcp.tool(
+    description=(
+        "Fetch the next page of a paginated result (get_topics, get_services, "
+        "inspect_all_services, subscribe_for_duration) by the 'next_cursor' it returned.\n"
+        "Example:\n"
+        "fetch_page(cursor='Zq3x0aV1Tn4:100')\n"
+        "fetch_page(cursor='Zq3x0aV1Tn4:100', max_items=20)"
+    )
+)
+async def fetch_page(
+    cursor: str, max_items: Optional[int] = None, max_bytes: Optional[int] = None
+) -> dict:
+    """
+    Fetch one page of a result kept by the server.
+
+    Results are kept for RESULT_STORE_MAX_RESULTS paginated calls (and up to
+    RESULT_STORE_MAX_MEMORY bytes), least recently used first out; an expired cursor
+    returns an error and the tool has to be called again.
+
+    Args:
+        cursor (str): A 'next_cursor' from a previous page.
+        max_items (Optional[int]): Items in this page. Defaults to the first page's limit.
+        max_bytes (Optional[int]): JSON bytes in this page. Defaults to the first page's limit.
+
+    Returns:
+        dict: 'source' (the tool that produced the result), the page's items under the same
+            key as in that tool's result, and 'page' with 'offset', 'items', 'total_items'
+            and 'next_cursor' (None on the last page), or {"error": "<error message>"}.
+    """
+    page, error = results.fetch(cursor, max_items, max_bytes)
+    if error:
+        return {"error": error}
+    return page
+
+
+@mcp.tool(
+    description=(
+        "Get server metrics: latency percentiles and error counts per tool, and per robot the "
+        "rosbridge traffic by op, timeouts, reconnects and message rate per subscribed topic.\n"
+        "Example:\n"
+        "get_server_metrics()"
+    )
+)
+async def get_server_metrics() -> dict:
+    """
+    Get the server's tool and connection metrics, collected since it started.
+
+    Returns:
+        dict: 'uptime_s'; 'tools' with count, mean/p50/p95/p99/max latency in ms and errors
+            for each tool called so far; 'result_store' with the number and size of the
+            paginated results kept for fetch_page; and 'robots', with each robot's
+            connection state, reconnects, 'traffic' (frames and bytes per op, "in" and
+            "out"), 'timeouts' per op and 'topics' (messages, bytes, rate_hz and
+            last_message_age_s per topic). Also rewrites METRICS_TEXTFILE when one is
+            configured.
+    """
+    result = {
+        "uptime_s": round(time.time() - tool_metrics.started_at, 3),
+        "tools": tool_metrics.snapshot(),
+        "result_store": results.stats(),
+        "robots": {},
+    }
+    for name in robots.names():
+        ws_manager = robots.get(name).ws_manager
+        result["robots"][name] = {
+            "connected": ws_manager.connected,
+            "reconnecting": ws_manager.reconnecting,
+            "reconnects": ws_manager.reconnects,
+            **ws_manager.metrics.snapshot(),
+        }
+    if METRICS_TEXTFILE:
+        try:
+            _write_metrics_textfile()
+        except OSError as e:
+            result["textfile_error"] = str(e)
+    return result
+
+
+@mcp.tool(
+    description=(
+        "Get the server's recent log records (connections, reconnects, errors), newest last.\n"
+        "Example:\n"
+        "get_recent_logs()\n"
+        "get_recent_logs(level='WARNING', component='websocket', limit=20)"
+    )
+)
+async def get_recent_logs(
+    limit: int = 50,
+    level: Optional[str] = None,
+    component: Optional[str] = None,
+    since: Optional[float] = None,
+) -> dict:
+    """
+    Get recent log records from the server's in-memory log buffer.
+
+    Args:
+        limit (int): Maximum number of records to return. Default = 50.
+        level (Optional[str]): Only records at or above this level (e.g., 'WARNING').
+        component (Optional[str]): Only records from this component: 'websocket',
+            'schema_cache' or 'server'.
+        since (Optional[float]): Only records logged after this Unix time.
+
+    Returns:
+        dict: 'logs', each with time, level, logger, message and its structured fields (such
+            as 'target' and 'suppressed', the number of identical messages dropped by the rate
+            limit before it); 'buffered' and 'suppressed' totals; or {"error": "<message>"}.
+    """
+    try:
+        source = f"{LOGGER_NAME}.{component}" if component else None
+        records = logs.ring.recent(limit, level, source, since)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {
+        "logs": records,
+        "buffered": len(logs.ring.entries),
+        "suppressed": logs.rate_limit.suppressed_total if logs.rate_limit else 0,
+    }
+
+
 ## ############################################################################################## ##
 ##
 ##                       NETWORK DIAGNOSTICS
@@ -1054,26 +2531,94 @@ def call_service(
 
 @mcp.tool(
     description=(
-        "Ping a robot's IP address and check if a specific port is open.\n"
-        "A successful ping to the IP but not the port can indicate that ROSbridge is not running.\n"
+        "Check that a robot's rosbridge is reachable and measure latency: TCP connect, WebSocket handshake "
+        "and rosbridge round trip, each with p50/p95/jitter.\n"
+        "An open port that fails the handshake can indicate that something other than ROSbridge is listening.\n"
         "Example:\n"
-        "ping_robot(ip='192.168.1.100', port=9090)"
+        "ping_robot(ip='192.168.1.100', port=9090)\n"
+        "ping_robot(robot='all', samples=10)  # Check every connected robot"
     )
 )
-def ping_robot(ip: str, port: int, ping_timeout: float = 2.0, port_timeout: float = 2.0) -> dict:
+@for_robots
+async def ping_robot(
+    ip: Optional[str] = None,
+    port: Optional[int] = None,
+    samples: int = 5,
+    timeout: float = 2.0,
+    robot: Optional[str] = None,
+) -> dict:
+    """
+    Probe a rosbridge server in-process and report per-step latency.
+
+    Each sample opens a TCP connection, performs the WebSocket handshake and calls
+    /rosapi/get_time, timing the three steps separately.
+
+    Args:
+        ip (Optional[str]): The IP address to probe (e.g., '192.168.1.100'). Defaults to the robot's.
+        port (Optional[int]): The port number to probe (e.g., 9090). Defaults to the robot's.
+        samples (int): Number of samples to take. Default = 5.
+        timeout (float): Timeout for each step in seconds. Default = 2.0.
+        robot (Optional[str]): Robot name given to connect_to_robot, or "all" to run on every
+            robot. Defaults to the default robot.
+
+    Returns:
+        dict: 'tcp_connect', 'ws_handshake' and 'rosbridge_rtt', each with samples, p50_ms, p95_ms,
+            min_ms, max_ms and jitter_ms (None if that step never succeeded), plus 'failures',
+            'errors' and 'overall_status'.
+    """
+    if samples < 1 or samples > 100:
+        return {"error": "samples must be between 1 and 100"}
+    conn = robots.get(robot)
+    actual_ip = ip if ip is not None else conn.ws_manager.ip
+    actual_port = port if port is not None else conn.ws_manager.port
+    return await measure_latency(actual_ip, actual_port, samples, timeout)
+
+
+@mcp.tool(
+    description=(
+        "Scan an address range for rosbridge servers and list them fastest first.\n"
+        "Open ports are confirmed with a WebSocket handshake and a /rosapi/get_time call.\n"
+        "Example:\n"
+        "discover_robots(cidr='192.168.1.0/24')\n"
+        "discover_robots(cidr='10.0.0.0/22', ports=[9090, 9091], time_budget=20)"
+    )
+)
+async def discover_robots(
+    cidr: str,
+    ports: Optional[List[int]] = None,
+    max_concurrency: int = DISCOVERY_MAX_CONCURRENCY,
+    connect_timeout: float = 0.5,
+    time_budget: float = 10.0,
+) -> dict:
     """
-    Ping an IP address and check if a specific port is open.
+    Find rosbridge servers in a subnet by probing every host and port concurrently.
 
     Args:
-        ip (str): The IP address to ping (e.g., '192.168.1.100')
-        port (int): The port number to check (e.g., 9090)
-        ping_timeout (float): Timeout for ping in seconds. Default = 2.0.
-        port_timeout (float): Timeout for port check in seconds. Default = 2.0.
+        cidr (str): Address range in CIDR notation (e.g., '192.168.1.0/24'), or a single address.
+        ports (Optional[List[int]]): Ports to probe on each host. Defaults to [9090].
+        max_concurrency (int): Maximum probes in flight at once.
+        connect_timeout (float): Seconds to wait for each TCP connect.
+        time_budget (float): Seconds for the whole scan; probes still running are abandoned.
 
     Returns:
-        dict: Contains ping and port check results with detailed status information.
+        dict: 'endpoints' with each confirmed rosbridge's ip, port, tcp_connect_ms, handshake_ms
+            and rosapi_ms (fastest first), 'open_ports' that aren't rosbridge, and scan counts
+            ('targets', 'probed', 'unfinished', 'complete'), or {"error": "<error message>"}.
     """
-    return ping_ip_and_port(ip, port, ping_timeout, port_timeout)
+    if max_concurrency < 1:
+        return {"error": "max_concurrency must be ≥ 1"}
+    if connect_timeout <= 0 or time_budget <= 0:
+        return {"error": "connect_timeout and time_budget must be > 0"}
+    try:
+        return await discover_rosbridge(
+            cidr,
+            ports if ports is not None else [ROSBRIDGE_PORT],
+            max_concurrency=max_concurrency,
+            connect_timeout=connect_timeout,
+            time_budget=time_budget,
+        )
+    except ValueError as e:
+        return {"error": str(e)}
 
 
 if __name__ == "__main__":
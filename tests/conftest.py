@@ -0,0 +1,9 @@
+import pytest
+
+from benchmarks.mock_rosbridge import MockRosbridge
+
+
+@pytest.fixture
+def bridge():
+    with MockRosbridge() as bridge:
+        yield bridge
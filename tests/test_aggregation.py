@@ -0,0 +1,73 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.aggregation import StreamAggregator
+
+
+def test_scalar_fields_match_numpy():
+    values = np.random.default_rng(0).normal(5.0, 2.0, 1000)
+    aggregator = StreamAggregator(chunk_size=64)
+    for i, value in enumerate(values):
+        aggregator.add({"twist": {"linear": {"x": float(value)}}, "seq": i, "ok": True})
+
+    fields = aggregator.result()
+    x = fields["twist.linear.x"]
+    assert aggregator.messages == 1000
+    assert x["count"] == 1000
+    assert x["mean"] == pytest.approx(values.mean())
+    assert x["std"] == pytest.approx(values.std())
+    assert (x["min"], x["max"], x["last"]) == (values.min(), values.max(), values[-1])
+    assert fields["seq"]["max"] == 999
+    assert fields["ok"]["mean"] == 1.0
+
+
+def test_short_arrays_are_split_per_element():
+    aggregator = StreamAggregator()
+    aggregator.add({"position": [1.0, 10.0]})
+    aggregator.add({"position": [3.0, 20.0]})
+
+    fields = aggregator.result()
+    assert fields["position[0]"]["mean"] == 2.0
+    assert fields["position[1]"]["mean"] == 15.0
+
+
+def test_long_arrays_are_pooled():
+    aggregator = StreamAggregator(max_elementwise=4, max_pending=10)
+    for _ in range(3):
+        aggregator.add({"ranges": np.arange(8, dtype=np.float32)})
+
+    ranges = aggregator.result()["ranges[*]"]
+    assert ranges["count"] == 24
+    assert ranges["mean"] == 3.5
+    assert aggregator._pending_values == 0
+
+
+def test_non_finite_values_are_skipped():
+    aggregator = StreamAggregator()
+    aggregator.add({"range": math.inf})
+    aggregator.add({"range": 2.0})
+    aggregator.add({"range": math.nan, "other": math.nan})
+
+    fields = aggregator.result()
+    assert fields["range"]["count"] == 1
+    assert fields["range"]["last"] == 2.0
+    assert fields["other"] == {
+        "count": 0,
+        "mean": None,
+        "min": None,
+        "max": None,
+        "std": None,
+        "last": None,
+    }
+
+
+def test_fields_appearing_later_widen_the_chunk():
+    aggregator = StreamAggregator(chunk_size=4)
+    aggregator.add({"a": 1})
+    aggregator.add({f"f{i}": i for i in range(40)})
+
+    fields = aggregator.result()
+    assert fields["a"]["count"] == 1
+    assert fields["f39"]["last"] == 39
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils import cbor
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        23,
+        24,
+        255,
+        65536,
+        2**40,
+        -1,
+        -1000,
+        1.5,
+        "",
+        "héllo",
+        b"\x00\x01",
+        [],
+        [1, "a", None],
+        {"a": {"b": [1, 2.5]}},
+    ],
+)
+def test_round_trip(value):
+    assert cbor.loads(cbor.dumps(value)) == value
+
+
+def test_typed_arrays_decode_to_numpy():
+    ranges = np.array([0.5, math.inf, 2.0], dtype=np.float32)
+    decoded = cbor.loads(cbor.dumps({"ranges": ranges, "counts": np.arange(4, dtype=np.int16)}))
+
+    assert decoded["ranges"].dtype == np.float32
+    np.testing.assert_array_equal(decoded["ranges"], ranges)
+    np.testing.assert_array_equal(decoded["counts"], np.arange(4))
+    assert not decoded["ranges"].flags.writeable
+
+
+def test_uint8_arrays_become_bytes():
+    assert cbor.loads(cbor.dumps(np.array([1, 2, 3], dtype=np.uint8))) == b"\x01\x02\x03"
+
+
+def test_to_jsonable_matches_rosbridge_json():
+    msg = {"data": b"\xff", "ranges": np.array([1.0, 2.0]), "header": {"seq": np.uint32(7)}}
+
+    assert cbor.to_jsonable(msg) == {"data": "/w==", "ranges": [1.0, 2.0], "header": {"seq": 7}}
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x82\x01",  # array of two items, one present
+        b"\x01\x02",  # trailing bytes
+        b"\xff",  # break outside an indefinite-length item
+        b"\xa1\x80\x01",  # map keyed by an array
+        b"\x81" * 100000,  # nesting deeper than the stack
+    ],
+)
+def test_malformed_data_raises_decode_error(data):
+    with pytest.raises(cbor.CBORDecodeError):
+        cbor.loads(data)
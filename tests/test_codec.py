@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils import codec
+
+
+@pytest.fixture(params=codec.AVAILABLE)
+def backend(request):
+    return codec.get(request.param)
+
+
+def test_round_trip(backend):
+    msg = {"op": "publish", "msg": {"data": [1, 2.5, "x", None, True]}}
+
+    assert backend.loads(backend.dumps(msg)) == msg
+    assert backend.loads(backend.dumps(msg).decode()) == msg
+
+
+def test_non_finite_floats_fall_back_to_json(backend):
+    decoded = backend.loads(b'{"ranges": [1.0, Infinity, -Infinity, NaN]}')
+
+    assert decoded["ranges"][:3] == [1.0, math.inf, -math.inf]
+    assert math.isnan(decoded["ranges"][3])
+
+
+def test_invalid_json_raises_value_error(backend):
+    with pytest.raises(ValueError):
+        backend.loads(b'{"op": ')
+
+
+def test_numpy_and_bytes_are_encoded_like_rosbridge(backend):
+    msg = {"ranges": np.array([0.5, 1.0]), "seq": np.int64(3), "data": b"\x00\xff"}
+
+    assert backend.loads(backend.dumps(msg)) == {"ranges": [0.5, 1.0], "seq": 3, "data": "AP8="}
+
+
+def test_unencodable_values_raise_type_error(backend):
+    with pytest.raises(TypeError):
+        backend.dumps({"value": object()})
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        codec.get("ujson")
@@ -0,0 +1,71 @@
+import pytest
+
+from utils.message_filter import (
+    FieldPathError,
+    compile_filter,
+    compile_projection,
+    compile_selection,
+    parse_path,
+)
+
+ODOM = {
+    "header": {"frame_id": "odom"},
+    "pose": {"pose": {"position": {"x": 1.5, "y": -2.0}}},
+    "name": ["wheel_left", "wheel_right"],
+}
+
+
+def test_parse_path():
+    assert parse_path("pose.pose.position.x") == ("pose", "pose", "position", "x")
+    assert parse_path("name[1]") == ("name", 1)
+    assert parse_path("name[-1]") == ("name", -1)
+
+
+@pytest.mark.parametrize("path", ["", ".pose", "[0]", "pose..x", "pose.x[", "pose x"])
+def test_parse_path_rejects_malformed_paths(path):
+    with pytest.raises(FieldPathError):
+        parse_path(path)
+
+
+def test_projection_returns_none_for_missing_fields():
+    project = compile_projection(["pose.pose.position.x", "name[1]", "twist.linear.x"])
+
+    assert project(ODOM) == {
+        "pose.pose.position.x": 1.5,
+        "name[1]": "wheel_right",
+        "twist.linear.x": None,
+    }
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("pose.pose.position.x > 1", True),
+        ("abs(pose.pose.position.y) < 1", False),
+        ("pose.pose.position.x * 2 == 3 and header.frame_id == 'odom'", True),
+        ("'wheel_left' in name", True),
+        ("len(name) == 2 and not name[0] == 'base'", True),
+        ("twist.linear.x > 0", False),  # missing field
+        ("header.frame_id > 1", False),  # str vs number
+        ("pose.pose.position.x / 0 > 1", False),
+    ],
+)
+def test_filter(expression, expected):
+    assert compile_filter(expression)(ODOM) is expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["__import__('os')", "open('x')", "[x for x in name]", "pose.pose +", "x" * 1001],
+)
+def test_filter_rejects_unsupported_expressions(expression):
+    with pytest.raises(FieldPathError):
+        compile_filter(expression)
+
+
+def test_selection_filters_then_projects():
+    transform = compile_selection(["header.frame_id"], "pose.pose.position.x > 1")
+
+    assert transform(ODOM) == {"header.frame_id": "odom"}
+    assert transform({**ODOM, "pose": {"pose": {"position": {"x": 0.0}}}}) is None
+    assert compile_selection() is None
@@ -0,0 +1,66 @@
+import asyncio
+
+import server
+
+
+def _run(bridge, tool_call):
+    """Run a server tool against the mock on the default robot, then release everything."""
+    robot = server.robots.default
+
+    async def main():
+        robot.ws_manager.set_ip(bridge.host, bridge.port)
+        try:
+            return await tool_call()
+        finally:
+            await server.robots.release_all("test done")
+            await robot.ws_manager.close()
+
+    return asyncio.run(main())
+
+
+def test_publishes_every_message(bridge):
+    twist = {"linear": {"x": 0.1, "y": 0.0, "z": 0.0}, "angular": {"x": 0.0, "y": 0.0, "z": 0.0}}
+
+    result = _run(
+        bridge,
+        lambda: server.publish_for_durations(
+            "/cmd_vel", "geometry_msgs/Twist", [twist] * 3, [0.01] * 3
+        ),
+    )
+
+    assert result["published_count"] == 3
+    assert result["errors"] == []
+    assert len(bridge.published) == 3
+
+
+def test_rosbridge_errors_are_reported(bridge):
+    result = _run(
+        bridge,
+        lambda: server.publish_for_durations("/cmd_vel", "std_msgs/String", [{"data": "x"}], [0.2]),
+    )
+
+    assert result["errors"] == ["Advertise failed: /cmd_vel already has type geometry_msgs/Twist"]
+
+
+def test_connection_drop_does_not_fail_messages_already_sent(bridge):
+    twist = {"linear": {"x": 0.1, "y": 0.0, "z": 0.0}, "angular": {"x": 0.0, "y": 0.0, "z": 0.0}}
+
+    async def publish_and_drop():
+        publish = asyncio.ensure_future(
+            server.publish_for_durations(
+                "/cmd_vel", "geometry_msgs/Twist", [twist] * 20, [0.1] * 20
+            )
+        )
+        await asyncio.sleep(1.0)
+        await asyncio.to_thread(bridge.drop_clients)
+        return await publish
+
+    result = _run(bridge, publish_and_drop)
+
+    assert bridge.connections == 2  # dropped once, then reconnected
+    # A message due while the connection is being reopened isn't sent and is reported as
+    # such; every message that was sent is counted as published
+    assert result["published_count"] == len(bridge.published) >= 18
+    assert result["published_count"] + len(result["errors"]) == 20
+    assert all("reconnecting" in error for error in result["errors"])
+    assert not server.robots.default.ws_manager.manager._pending
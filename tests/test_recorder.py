@@ -0,0 +1,136 @@
+import asyncio
+import os
+
+import pytest
+
+from utils.async_websocket_manager import AsyncWebSocketManager
+from utils.recorder import (
+    _RECORD,
+    _TRAILER,
+    FLAG_ZLIB,
+    MAGIC,
+    RecordingFormatError,
+    RecordingManager,
+    RecordingReader,
+    RecordingWriter,
+)
+from utils.subscription_manager import SubscriptionManager
+
+TOPICS = {"/odom": "nav_msgs/Odometry", "/scan": "sensor_msgs/LaserScan"}
+START = 1000.0
+
+
+def _write(path, compression="zlib", count=10):
+    """Write ``count`` messages half a second apart, alternating topics; returns them."""
+    writer = RecordingWriter(str(path), TOPICS, compression, metadata={"robot": "arm"})
+    written = []
+    for i in range(count):
+        topic = "/odom" if i % 2 == 0 else "/scan"
+        msg = {"seq": i, "ranges": [float(i)] * 3}
+        writer.append(topic, msg, t=START + i * 0.5)
+        written.append((START + i * 0.5, topic, msg))
+    writer.note_gap(START + 1.0, START + 1.2, "connection lost")
+    summary = writer.close()
+    return written, summary
+
+
+@pytest.mark.parametrize("compression", ["zlib", "none"])
+def test_round_trip(tmp_path, compression):
+    path = tmp_path / "run.rec"
+    written, summary = _write(path, compression)
+
+    assert summary["messages"] == {"/odom": 5, "/scan": 5}
+    with RecordingReader(str(path)) as reader:
+        assert reader.complete
+        assert reader.header["compression"] == compression
+        assert reader.header["robot"] == "arm"
+        assert reader.topics == TOPICS
+        assert list(reader.messages()) == written
+        assert reader.counts() == {"/odom": 5, "/scan": 5}
+        assert (reader.start_time, reader.end_time) == (START, START + 4.5)
+        assert reader.summary["gaps"] == [
+            {"since": START + 1.0, "until": START + 1.2, "reason": "connection lost"}
+        ]
+        # One index entry per INDEX_INTERVAL (1 s) of records
+        assert reader._index_times == [START, START + 1.0, START + 2.0, START + 3.0, START + 4.0]
+
+        _, _, _, flags = _RECORD.unpack_from(reader._map, reader.data_start)
+        assert bool(flags & FLAG_ZLIB) == (compression == "zlib")
+
+
+def test_time_range_and_topic_filter(tmp_path):
+    path = tmp_path / "run.rec"
+    written, _ = _write(path)
+
+    with RecordingReader(str(path)) as reader:
+        assert list(reader.messages(START + 1.5, START + 3.0, ["/scan"])) == [
+            w for w in written if START + 1.5 <= w[0] <= START + 3.0 and w[1] == "/scan"
+        ]
+        assert reader.seek(START + 2.2) == reader._index_offsets[2]
+
+
+def test_truncated_file_is_read_by_scanning(tmp_path):
+    path = tmp_path / "run.rec"
+    written, _ = _write(path)
+    with RecordingReader(str(path)) as reader:
+        index_times = reader._index_times
+        data_end = reader.data_end
+    # Drop the index, summary and trailer, and half of the last record
+    os.truncate(path, data_end - 5)
+
+    with RecordingReader(str(path)) as reader:
+        assert not reader.complete
+        assert reader.summary is None
+        assert reader._index_times == index_times
+        assert list(reader.messages()) == written[:-1]
+        assert reader.counts() == {"/odom": 5, "/scan": 4}
+        assert reader.end_time == written[-2][0]
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "bad.rec"
+    path.write_bytes(b"not a recording at all")
+    with pytest.raises(RecordingFormatError):
+        RecordingReader(str(path))
+
+    path.write_bytes(MAGIC + b"\x02\x00\x00\x00{x")
+    with pytest.raises(RecordingFormatError):
+        RecordingReader(str(path))
+
+
+def test_writer_never_overwrites(tmp_path):
+    path = tmp_path / "run.rec"
+    _write(path, count=1)
+    size = path.stat().st_size
+    assert size > _TRAILER.size
+    with pytest.raises(FileExistsError):
+        RecordingWriter(str(path), TOPICS)
+    assert path.stat().st_size == size
+
+
+@pytest.mark.parametrize("how", ["dropped", "replaced"])
+def test_recording_reports_a_subscription_it_lost(bridge, tmp_path, how):
+    async def main():
+        ws = AsyncWebSocketManager(bridge.host, bridge.port)
+        subscriptions = SubscriptionManager(ws)
+        recordings = RecordingManager(subscriptions, str(tmp_path))
+        try:
+            recording, error = await recordings.start({"/odom": "nav_msgs/Odometry"})
+            assert error is None
+            if how == "dropped":
+                await subscriptions.drop("/odom")
+            else:
+                _, error = await subscriptions.ensure(
+                    "/odom", "nav_msgs/Odometry", compression="cbor"
+                )
+                assert error is None
+            return recording.info()
+        finally:
+            await recordings.stop_all()
+            await subscriptions.drop_all()
+            await ws.close()
+
+    info = asyncio.run(main())
+
+    assert list(info["lost_topics"]) == ["/odom"]
+    assert "/odom" in info["lost_topics"]["/odom"]
@@ -0,0 +1,197 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.recorder import _RECORD, RecordingFormatError, RecordingReader, RecordingWriter
+from utils.recording_query import (
+    QueryError,
+    parse_field,
+    query,
+    resample,
+    summarize,
+    threshold_episodes,
+    windows,
+)
+
+NAN = math.nan
+EMPTY = np.array([], dtype=float)
+
+
+def test_parse_field():
+    field = parse_field("/odom:twist.twist.linear.x")
+    assert (field.topic, field.steps, field.reduction) == (
+        "/odom",
+        ("twist", "twist", "linear", "x"),
+        None,
+    )
+
+    field = parse_field("/scan:min(ranges)")
+    assert (field.topic, field.steps, field.reduction) == ("/scan", ("ranges",), "min")
+
+
+@pytest.mark.parametrize(
+    "name", ["twist.linear.x", "odom:twist", "/odom:median(ranges)", "/odom:twist..x", "/odom:"]
+)
+def test_parse_field_rejects_malformed_fields(name):
+    with pytest.raises(QueryError):
+        parse_field(name)
+
+
+def test_summarize_skips_non_finite_values():
+    t = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+    v = np.array([3.0, NAN, 1.0, math.inf, 5.0])
+
+    summary = summarize(
+        t, v, ["count", "mean", "min", "max", "first", "last", "t_min", "t_max", "p50"]
+    )
+
+    assert summary == {
+        "count": 3,
+        "mean": 3.0,
+        "min": 1.0,
+        "max": 5.0,
+        "first": 3.0,
+        "last": 5.0,
+        "t_min": 2.0,
+        "t_max": 4.0,
+        "p50": 3.0,
+    }
+
+
+@pytest.mark.parametrize("v", [EMPTY, np.array([NAN, NAN])])
+def test_summarize_without_values(v):
+    t = np.arange(v.size, dtype=float)
+
+    assert summarize(t, v, ["count", "mean", "std", "median", "t_max", "p95"]) == {
+        "count": 0,
+        "mean": None,
+        "std": None,
+        "median": None,
+        "t_max": None,
+        "p95": None,
+    }
+
+
+def test_threshold_episodes():
+    t = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+    v = np.array([0.0, 0.0, 5.0, NAN, 0.0, 5.0])
+
+    result = threshold_episodes(t, v, 1.0)
+
+    # The NaN sample is dropped: 5.0 at t=2 runs until the 0.0 at t=4
+    assert result["below"] == {
+        "episodes": 2,
+        "samples": 3,
+        "time_s": 3.0,
+        "longest_s": 2.0,
+        "starts": [0.0, 4.0],
+    }
+    assert result["above"] == {
+        "episodes": 2,
+        "samples": 2,
+        "time_s": 2.0,
+        "longest_s": 2.0,
+        "starts": [2.0, 5.0],
+    }
+
+
+@pytest.mark.parametrize("v", [EMPTY, np.array([NAN])])
+def test_threshold_episodes_without_values(v):
+    result = threshold_episodes(np.arange(v.size, dtype=float), v, 1.0)
+
+    empty = {"episodes": 0, "samples": 0, "time_s": 0.0, "longest_s": 0.0, "starts": []}
+    assert result == {"below": empty, "above": empty}
+
+
+def _columns(**fields):
+    """({topic: times}, {name: values}, [Field]) for fields given as name=(times, values)."""
+    t, v, parsed = {}, {}, []
+    for i, (name, (times, values)) in enumerate(fields.items()):
+        field = parse_field(f"/t{i}:{name}")
+        t[field.topic] = np.asarray(times, dtype=float)
+        v[field.name] = np.asarray(values, dtype=float)
+        parsed.append(field)
+    return t, v, parsed
+
+
+def test_resample_interpolates_inside_each_fields_samples():
+    t, v, fields = _columns(x=([1.0, 2.0, 3.0], [10.0, NAN, 30.0]), empty=([], []))
+
+    grid, (x, empty) = resample(t, v, fields, 0.0, 4.0, 2.0)
+
+    np.testing.assert_allclose(grid, [0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0])
+    np.testing.assert_allclose(x, [NAN, NAN, 10.0, 15.0, 20.0, 25.0, 30.0, NAN, NAN])
+    assert np.isnan(empty).all()
+
+
+def test_resample_limits_rows():
+    t, v, fields = _columns(x=([0.0], [1.0]))
+
+    with pytest.raises(QueryError):
+        resample(t, v, fields, 0.0, 1e6, 1.0)
+
+
+def test_windows():
+    t, v, fields = _columns(x=([0.0, 0.5, 1.0, 2.6, 2.8], [1.0, 3.0, NAN, 4.0, 8.0]))
+
+    starts, columns = windows(
+        t, v, fields, 0.0, 2.9, 1.0, ["count", "mean", "std", "min", "max", "sum", "first", "last"]
+    )
+
+    np.testing.assert_allclose(starts, [0.0, 1.0, 2.0])
+    count, mean, std, low, high, total, first, last = columns
+    np.testing.assert_array_equal(count, [2, 0, 2])
+    np.testing.assert_allclose(mean, [2.0, NAN, 6.0])
+    np.testing.assert_allclose(std, [1.0, NAN, 2.0])
+    np.testing.assert_allclose(low, [1.0, NAN, 4.0])
+    np.testing.assert_allclose(high, [3.0, NAN, 8.0])
+    np.testing.assert_allclose(total, [4.0, NAN, 12.0])
+    np.testing.assert_allclose(first, [1.0, NAN, 4.0])
+    np.testing.assert_allclose(last, [3.0, NAN, 8.0])
+
+
+def test_windows_without_values():
+    t, v, fields = _columns(x=([], []))
+
+    _, (count, mean, low, first) = windows(
+        t, v, fields, 0.0, 1.5, 1.0, ["count", "mean", "min", "first"]
+    )
+
+    np.testing.assert_array_equal(count, [0, 0])
+    assert np.isnan(mean).all() and np.isnan(low).all() and np.isnan(first).all()
+
+
+def _record(path, compression="zlib"):
+    writer = RecordingWriter(str(path), {"/odom": "nav_msgs/Odometry"}, compression)
+    for i in range(5):
+        writer.append("/odom", {"x": float(i), "ranges": [i, None, 2 * i]}, t=100.0 + i)
+    writer.close()
+
+
+def test_query(tmp_path):
+    path = tmp_path / "run.rec"
+    _record(path)
+
+    result = query(str(path), ["/odom:x", "/odom:max(ranges)"], start=1.0, resample_hz=1.0)
+
+    assert result["complete"]
+    assert result["messages"] == {"/odom": 4}
+    assert result["fields"]["/odom:x"]["mean"] == 2.5
+    assert result["fields"]["/odom:max(ranges)"]["max"] == 8.0
+    assert result["columns"] == ["t", "/odom:x", "/odom:max(ranges)"]
+    assert result["rows"] == [[1.0, 1.0, 2.0], [2.0, 2.0, 4.0], [3.0, 3.0, 6.0], [4.0, 4.0, 8.0]]
+
+
+@pytest.mark.parametrize("compression", ["zlib", "none"])
+def test_query_reports_a_corrupt_record(tmp_path, compression):
+    path = tmp_path / "run.rec"
+    _record(path, compression)
+    with RecordingReader(str(path)) as reader:
+        payload = reader.data_start + _RECORD.size
+    with open(path, "r+b") as f:
+        f.seek(payload)
+        f.write(b"\xff\xff\xff")
+
+    with pytest.raises(RecordingFormatError):
+        query(str(path), ["/odom:x"])
@@ -0,0 +1,85 @@
+import pytest
+
+from utils.result_store import ResultStore
+
+
+def test_small_results_are_returned_unchanged():
+    result = {"topics": ["/a", "/b"]}
+
+    assert ResultStore().paginate("get_topics", result, ["topics"], 5, None) is result
+
+
+def test_pages_walk_parallel_lists():
+    store = ResultStore()
+    topics = [f"/topic_{i}" for i in range(7)]
+    types = [f"pkg/Type{i}" for i in range(7)]
+
+    first = store.paginate(
+        "get_topics", {"topics": topics, "types": types}, ["topics", "types"], 3, None
+    )
+    assert first["topics"] == topics[:3]
+    assert first["types"] == types[:3]
+    assert first["page"] == {
+        "offset": 0,
+        "items": 3,
+        "total_items": 7,
+        "next_cursor": first["page"]["next_cursor"],
+    }
+
+    pages = [first]
+    while pages[-1]["page"]["next_cursor"]:
+        page, error = store.fetch(pages[-1]["page"]["next_cursor"])
+        assert error is None
+        assert page["source"] == "get_topics"
+        pages.append(page)
+    assert [len(page["topics"]) for page in pages] == [3, 3, 1]
+    assert sum((page["types"] for page in pages), []) == types
+
+
+def test_dicts_are_paged_by_entry():
+    store = ResultStore()
+    params = {f"p{i}": i for i in range(5)}
+
+    first = store.paginate("get_parameters", {"parameters": params}, ["parameters"], 2, None)
+    page, _ = store.fetch(first["page"]["next_cursor"], max_items=10)
+
+    assert first["parameters"] == {"p0": 0, "p1": 1}
+    assert page["parameters"] == {"p2": 2, "p3": 3, "p4": 4}
+
+
+def test_byte_limit_keeps_at_least_one_item():
+    store = ResultStore()
+    items = ["x" * 100, "y", "z"]
+
+    first = store.paginate("tool", {"items": items}, ["items"], None, 10)
+
+    assert first["items"] == ["x" * 100]
+    page, _ = store.fetch(first["page"]["next_cursor"])
+    assert page["items"] == ["y", "z"]
+
+
+def test_bad_cursors_and_limits():
+    store = ResultStore()
+    first = store.paginate("tool", {"items": list(range(5))}, ["items"], 2, None)
+    result_id = first["page"]["next_cursor"].split(":")[0]
+
+    for cursor in ("nope:2", f"{result_id}:99", f"{result_id}:x"):
+        page, error = store.fetch(cursor)
+        assert page is None and "Unknown or expired cursor" in error
+    assert store.fetch(first["page"]["next_cursor"], max_items=0)[1] is not None
+    with pytest.raises(ValueError):
+        store.paginate("tool", {"items": [1, 2]}, ["items"], 0, None)
+    with pytest.raises(ValueError):
+        store.paginate("tool", {"a": [1, 2], "b": [1]}, ["a", "b"], 1, None)
+
+
+def test_least_recently_used_results_are_evicted():
+    store = ResultStore(max_results=2)
+    cursors = [
+        store.paginate("tool", {"items": list(range(4))}, ["items"], 1, None)["page"]["next_cursor"]
+        for _ in range(3)
+    ]
+
+    assert store.fetch(cursors[0])[0] is None
+    assert store.fetch(cursors[2])[0] is not None
+    assert store.stats()["evictions"] == 1
@@ -0,0 +1,114 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.mock_rosbridge import MockRosbridge
+from utils.websocket_manager import WebSocketManager, backoff_delay
+
+
+@pytest.fixture
+def manager(bridge):
+    manager = WebSocketManager(bridge.host, bridge.port, default_timeout=2.0)
+    yield manager
+    manager.close()
+
+
+def test_concurrent_requests_get_their_own_replies():
+    topics = {f"/topic_{i}": f"pkg/Type{i}" for i in range(20)}
+    # Replies are delayed, so the requests are all outstanding at once
+    with MockRosbridge(latency=0.05, topics=topics) as bridge:
+        manager = WebSocketManager(bridge.host, bridge.port)
+        try:
+
+            def topic_type(topic):
+                return manager.request(
+                    {
+                        "op": "call_service",
+                        "service": "/rosapi/topic_type",
+                        "args": {"topic": topic},
+                    }
+                )
+
+            with ThreadPoolExecutor(len(topics)) as pool:
+                replies = list(pool.map(topic_type, topics))
+        finally:
+            manager.close()
+
+    assert [reply["values"]["type"] for reply in replies] == list(topics.values())
+    assert len({reply["id"] for reply in replies}) == len(topics)
+
+
+def test_topic_frames_reach_their_handler(manager):
+    received = []
+    got_three = threading.Event()
+
+    def on_odom(frame):
+        received.append(frame)
+        if len(received) == 3:
+            got_three.set()
+
+    manager.add_topic_handler("/odom", on_odom)
+    assert manager.send({"op": "subscribe", "topic": "/odom", "id": "subscribe_odom"}) is None
+
+    assert got_three.wait(2.0)
+    assert all(frame["op"] == "publish" and frame["topic"] == "/odom" for frame in received)
+    assert manager.receive(timeout=0.2) is None  # nothing else was left over
+
+
+def test_unclaimed_frames_reach_receive(manager):
+    # Nobody registered this id: rosbridge's error status ends up in the inbox
+    manager.send({"op": "publish", "topic": "/nowhere", "id": "unclaimed", "msg": {}})
+
+    frame = json.loads(manager.receive(timeout=2.0))
+
+    assert frame["op"] == "status" and frame["id"] == "unclaimed"
+    assert "/nowhere" in frame["msg"]
+
+
+def test_dropped_connection_is_reopened_and_kept_ops_replayed(bridge):
+    manager = WebSocketManager(bridge.host, bridge.port, reconnect_initial_delay=0.05)
+    frames = []
+    after_gap = threading.Event()
+    failed = []
+
+    def on_subscription(frame):
+        frames.append(frame)
+        if frame.get("op") == "publish" and any(
+            f.get("op") == "gap" and f["until"] is not None for f in frames
+        ):
+            after_gap.set()
+
+    subscribe = {"op": "subscribe", "topic": "/odom", "id": "subscribe_odom"}
+    try:
+        manager.register_request("subscribe_odom", on_subscription)
+        manager.add_topic_handler("/odom", on_subscription)
+        assert manager.send(subscribe) is None
+        manager.add_replay(subscribe)
+        # A request still waiting for its reply when the connection drops
+        manager.register_request("call_service:1", failed.append)
+
+        bridge.drop_clients()
+
+        assert after_gap.wait(5.0)
+        received, failures = list(frames), list(failed)  # close() fails what is left
+    finally:
+        manager.close()
+
+    assert bridge.connections == 2
+    assert bridge.op_counts["subscribe"] == 2  # replayed on the new connection
+    assert manager.reconnects == 1
+    gaps = [frame for frame in received if frame.get("op") == "gap"]
+    assert [gap["until"] is None for gap in gaps] == [True, False]
+    assert gaps[0]["since"] == gaps[1]["since"] <= gaps[1]["until"]
+    # Only the request that isn't kept is failed
+    assert not [frame for frame in received if "error" in frame]
+    assert len(failures) == 1 and "error" in failures[0]
+
+
+def test_backoff_ceiling_doubles_up_to_the_maximum():
+    for attempt, ceiling in [(0, 0.1), (1, 0.2), (3, 0.8), (10, 5.0), (1000, 5.0)]:
+        delays = [backoff_delay(attempt, 0.1, 5.0) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling / 2  # jittered across the whole range
@@ -0,0 +1,220 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from utils.async_websocket_manager import AsyncWebSocketManager
+
+
+class Advertisement:
+    """
+    A topic advertised on rosbridge and kept open between publishes.
+
+    Status frames answering the advertise or the publishes sent through it arrive on the
+    connection's reader thread and are kept until the next caller collects them.
+    """
+
+    def __init__(self, topic: str, msg_type: str, advertise_id: str, publish_id: str):
+        self.topic = topic
+        self.msg_type = msg_type
+        self.advertise_id = advertise_id  # unadvertise must reuse this id
+        self.publish_id = publish_id
+        self.users = 0  # publishers currently holding it; it is never reaped while > 0
+        self.published = 0
+        self.error_count = 0
+        self.lost: Optional[str] = None  # why the advertisement stopped, if it did
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.lock = threading.Lock()
+        self.advertised = asyncio.Event()  # set once the advertise has been sent (or failed)
+        self._errors: deque = deque(maxlen=20)
+
+    def on_status(self, frame: dict):
+        """Handle a status frame (or a connection error) answering the advertise."""
+        with self.lock:
+            if frame.get("op") == "status" and frame.get("level") == "error":
+                self._errors.append(frame.get("msg", "Unknown error"))
+                self.error_count += 1
+            elif "error" in frame:
+                self.lost = frame["error"]
+
+    def on_publish_status(self, frame: dict):
+        """
+        Handle a status frame answering a publish.
+
+        A dropped connection is left to ``on_status``: the advertise is sent again when the
+        connection comes back, so the publish id failing doesn't mean the topic is lost.
+        """
+        if frame.get("op") == "status" and frame.get("level") == "error":
+            with self.lock:
+                self._errors.append(frame.get("msg", "Unknown error"))
+                self.error_count += 1
+
+    def take_errors(self) -> List[str]:
+        """Return the errors rosbridge reported since the last call, and forget them."""
+        with self.lock:
+            errors = list(self._errors)
+            self._errors.clear()
+        return errors
+
+    def info(self) -> dict:
+        now = time.monotonic()
+        with self.lock:
+            return {
+                "topic": self.topic,
+                "msg_type": self.msg_type,
+                "active": self.lost is None,
+                "users": self.users,
+                "published": self.published,
+                "error_count": self.error_count,
+                "pending_errors": list(self._errors),
+                "age_s": round(now - self.created_at, 3),
+                "idle_s": round(now - self.last_used, 3),
+                "error": self.lost,
+            }
+
+
+class AdvertisementRegistry:
+    """
+    Keeps topics advertised on the shared connection between publishes.
+
+    The first publish to a topic advertises it; later publishes with the same type reuse
+    the advertisement. Topics are unadvertised after ``idle_timeout`` seconds without a
+    publish and nobody holding them, or when ``unadvertise_all()`` is called at shutdown.
+    """
+
+    def __init__(self, ws_manager: AsyncWebSocketManager, idle_timeout: float = 30.0):
+        self.ws_manager = ws_manager
+        self.idle_timeout = idle_timeout
+        self.advertisements: Dict[str, Advertisement] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def acquire(
+        self, topic: str, msg_type: str
+    ) -> Tuple[Optional[Advertisement], Optional[str]]:
+        """
+        Return the advertisement for a topic, advertising it if needed, and hold it.
+
+        Every successful acquire must be paired with ``release()``. An idle advertisement
+        with a different type is replaced; one held by another publisher is not.
+
+        Returns:
+            (advertisement, None) on success, or (None, error message).
+        """
+        adv = self.advertisements.get(topic)
+        if adv is not None and adv.lost is None:
+            if adv.msg_type == msg_type:
+                adv.users += 1
+                adv.last_used = time.monotonic()
+                # Don't let a publish overtake the advertise another caller is sending
+                await adv.advertised.wait()
+                if adv.lost is not None:
+                    self.release(adv)
+                    return None, adv.lost
+                return adv, None
+            if adv.users:
+                return None, f"{topic} is advertised as {adv.msg_type} by an active publisher"
+        if adv is not None:
+            await self.unadvertise(topic)
+
+        adv = Advertisement(
+            topic,
+            msg_type,
+            self.ws_manager.next_id(f"advertise_{topic}"),
+            self.ws_manager.next_id(f"publish_{topic}"),
+        )
+        adv.users = 1
+        # Registered before sending, so concurrent publishers share this advertisement
+        self.advertisements[topic] = adv
+        self.ws_manager.register_request(adv.advertise_id, adv.on_status)
+        self.ws_manager.register_request(adv.publish_id, adv.on_publish_status)
+        advertise_msg = {
+            "op": "advertise",
+            "id": adv.advertise_id,
+            "topic": topic,
+            "type": msg_type,
+        }
+        send_error = await self.ws_manager.send(advertise_msg)
+        if send_error:
+            adv.lost = send_error
+            adv.advertised.set()
+            self._detach(adv)
+            if self.advertisements.get(topic) is adv:
+                del self.advertisements[topic]
+            return None, send_error
+
+        self.ws_manager.add_replay(advertise_msg)
+        adv.advertised.set()
+        self._ensure_reaper()
+        return adv, None
+
+    def release(self, adv: Advertisement):
+        adv.users = max(adv.users - 1, 0)
+        adv.last_used = time.monotonic()
+
+    async def publish(
+        self, topic: str, msg_type: str, msg: dict
+    ) -> Tuple[Optional[Advertisement], Optional[str]]:
+        """
+        Publish one message, advertising the topic first if it isn't already.
+
+        Doesn't wait for a reply: errors rosbridge reports for the publish are collected
+        on the advertisement (see ``Advertisement.take_errors()``).
+
+        Returns:
+            (advertisement, None) if the message was sent, or (advertisement or None, error message).
+        """
+        adv, error = await self.acquire(topic, msg_type)
+        if error:
+            return None, error
+        try:
+            send_error = await self.ws_manager.send(
+                {"op": "publish", "id": adv.publish_id, "topic": topic, "msg": msg}
+            )
+            if send_error:
+                return adv, send_error
+            adv.published += 1
+            return adv, None
+        finally:
+            self.release(adv)
+
+    async def unadvertise(self, topic: str) -> bool:
+        """Unadvertise and forget a topic, even if a publisher still holds it."""
+        adv = self.advertisements.pop(topic, None)
+        if adv is None:
+            return False
+        self._detach(adv)
+        if adv.lost is None:
+            await self.ws_manager.send(
+                {"op": "unadvertise", "id": adv.advertise_id, "topic": topic}
+            )
+        return True
+
+    async def unadvertise_all(self):
+        for topic in list(self.advertisements):
+            await self.unadvertise(topic)
+
+    def list(self) -> List[dict]:
+        return [adv.info() for adv in self.advertisements.values()]
+
+    def _detach(self, adv: Advertisement):
+        self.ws_manager.remove_replay(adv.advertise_id)
+        self.ws_manager.unregister_request(adv.advertise_id)
+        self.ws_manager.unregister_request(adv.publish_id)
+
+    def _ensure_reaper(self):
+        task = self._reaper
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._reaper = asyncio.ensure_future(self._reap())
+
+    async def _reap(self):
+        """Unadvertise topics nobody holds or has published to for ``idle_timeout`` seconds."""
+        while self.advertisements:
+            await asyncio.sleep(min(self.idle_timeout / 2, 5.0))
+            now = time.monotonic()
+            for topic, adv in list(self.advertisements.items()):
+                if adv.users:
+                    continue
+                if adv.lost is not None or now - adv.last_used > self.idle_timeout:
+                    await self.unadvertise(topic)
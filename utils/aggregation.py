@@ -0,0 +1,197 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _number(value: float) -> Optional[float]:
+    """JSON-safe float: NaN/inf (e.g. stats of an empty column) become None."""
+    return float(value) if math.isfinite(value) else None
+
+
+class RunningStats:
+    """
+    count/mean/min/max/variance of k columns, updated one chunk at a time.
+
+    Each chunk's statistics are computed with vectorized numpy and folded into the running
+    totals with Chan et al.'s pairwise update, which is numerically stable and needs only
+    five numbers per column regardless of how many values have been seen. Non-finite
+    values (NaN also marks a missing value) are left out.
+    """
+
+    def __init__(self, columns: int = 0):
+        self.count = np.zeros(columns)
+        self.mean = np.zeros(columns)
+        self.m2 = np.zeros(columns)
+        self.min = np.full(columns, np.inf)
+        self.max = np.full(columns, -np.inf)
+
+    def grow(self, columns: int):
+        extra = columns - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra)])
+            self.mean = np.concatenate([self.mean, np.zeros(extra)])
+            self.m2 = np.concatenate([self.m2, np.zeros(extra)])
+            self.min = np.concatenate([self.min, np.full(extra, np.inf)])
+            self.max = np.concatenate([self.max, np.full(extra, -np.inf)])
+
+    def update(self, values: np.ndarray):
+        """Fold a (rows, k) chunk of values into the running statistics."""
+        finite = np.isfinite(values)
+        count = finite.sum(axis=0).astype(float)
+        zeroed = np.where(finite, values, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, zeroed.sum(axis=0) / count, 0.0)
+        m2 = (np.where(finite, values - mean, 0.0) ** 2).sum(axis=0)
+        self.min = np.minimum(self.min, np.where(finite, values, np.inf).min(axis=0))
+        self.max = np.maximum(self.max, np.where(finite, values, -np.inf).max(axis=0))
+
+        total = self.count + count
+        safe_total = np.where(total > 0, total, 1.0)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / safe_total
+        self.count = total
+
+    def summary(self, column: int) -> dict:
+        count = int(self.count[column])
+        if count == 0:
+            return {"count": 0, "mean": None, "min": None, "max": None, "std": None}
+        return {
+            "count": count,
+            "mean": _number(self.mean[column]),
+            "min": _number(self.min[column]),
+            "max": _number(self.max[column]),
+            "std": _number(math.sqrt(max(self.m2[column], 0.0) / count)),
+        }
+
+
+class StreamAggregator:
+    """
+    Per-field statistics over a stream of ROS messages, in constant memory.
+
+    Every numeric leaf of a message (ints, floats, bools, and elements of numeric arrays)
+    becomes a column named by its path, e.g. ``twist.twist.linear.x`` or ``position[3]``.
+    Values are written into a fixed-size chunk of rows; when the chunk is full its
+    statistics are computed in one vectorized pass and merged into running totals, and
+    the chunk is reused. No message is kept.
+
+    Numeric arrays longer than ``max_elementwise`` (laser ranges, point data) are not
+    split per element: all their values are pooled into one ``path[*]`` column. Pooled
+    arrays wait to be folded in together, until the chunk is full or ``max_pending``
+    values are waiting, whichever comes first, so large arrays (images, point clouds)
+    don't pile up. Statistics skip non-finite values, so ``count`` is the number of
+    finite values seen.
+    """
+
+    def __init__(
+        self, chunk_size: int = 256, max_elementwise: int = 64, max_pending: int = 1 << 20
+    ):
+        self.chunk_size = chunk_size
+        self.max_elementwise = max_elementwise
+        self.max_pending = max_pending
+        self.messages = 0
+        self._columns: Dict[str, int] = {}
+        self._array_columns: Dict[Tuple[str, int], List[int]] = {}
+        self._chunk = np.full((chunk_size, 16), np.nan)
+        self._rows = 0
+        self._stats = RunningStats()
+        self._last = np.full(0, np.nan)
+        self._pooled: Dict[str, RunningStats] = {}
+        self._pooled_pending: Dict[str, List[np.ndarray]] = {}
+        self._pending_values = 0
+
+    def add(self, msg: dict):
+        """Add one message's numeric fields."""
+        self._flatten(msg, "")
+        self._rows += 1
+        self.messages += 1
+        if self._rows == self.chunk_size:
+            self._flush()
+
+    def result(self) -> Dict[str, dict]:
+        """Return {field path: {"count", "mean", "min", "max", "std", "last"}}."""
+        self._flush()
+        fields = {}
+        for path, column in self._columns.items():
+            fields[path] = {**self._stats.summary(column), "last": _number(self._last[column])}
+        for path, stats in self._pooled.items():
+            fields[path] = stats.summary(0)
+        return fields
+
+    def _column(self, path: str) -> int:
+        column = self._columns.get(path)
+        if column is None:
+            column = self._columns[path] = len(self._columns)
+            if column >= self._chunk.shape[1]:
+                wider = np.full((self.chunk_size, 2 * self._chunk.shape[1]), np.nan)
+                wider[:, : self._chunk.shape[1]] = self._chunk
+                self._chunk = wider
+        return column
+
+    def _flatten(self, value, path: str):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self._flatten(item, f"{path}.{key}" if path else key)
+        elif isinstance(value, (bool, int, float)):
+            column = self._column(path)  # may widen the chunk, so index it afterwards
+            self._chunk[self._rows, column] = value
+        elif isinstance(value, np.ndarray):
+            if value.dtype.kind in "biuf":
+                self._add_array(value.ravel(), path)
+        elif isinstance(value, (list, tuple)) and value:
+            if isinstance(value[0], (dict, list, tuple)):
+                for i, item in enumerate(value):
+                    self._flatten(item, f"{path}[{i}]")
+            elif isinstance(value[0], (bool, int, float)):
+                try:
+                    self._add_array(np.asarray(value, dtype=float), path)
+                except (TypeError, ValueError):
+                    pass  # mixed list, not a numeric ROS array
+
+    def _add_array(self, array: np.ndarray, path: str):
+        if len(array) <= self.max_elementwise:
+            columns = self._array_columns.get((path, len(array)))
+            if columns is None:
+                columns = [self._column(f"{path}[{i}]") for i in range(len(array))]
+                self._array_columns[(path, len(array))] = columns
+            self._chunk[self._rows, columns] = array
+            return
+        pooled = f"{path}[*]"
+        if pooled not in self._pooled:
+            self._pooled[pooled] = RunningStats(1)
+            self._pooled_pending[pooled] = []
+        self._pooled_pending[pooled].append(array.astype(float, copy=False))
+        self._pending_values += len(array)
+        if self._pending_values >= self.max_pending:
+            self._flush_pooled()
+
+    def _flush(self):
+        if self._rows:
+            columns = len(self._columns)
+            chunk = self._chunk[: self._rows, :columns]
+            self._stats.grow(columns)
+            self._stats.update(chunk)
+
+            # Last finite value of each column in this chunk
+            if len(self._last) < columns:
+                self._last = np.concatenate(
+                    [self._last, np.full(columns - len(self._last), np.nan)]
+                )
+            finite = np.isfinite(chunk)
+            seen = finite.any(axis=0)
+            last_row = self._rows - 1 - np.argmax(finite[::-1], axis=0)
+            self._last[:columns] = np.where(
+                seen, chunk[last_row, np.arange(columns)], self._last[:columns]
+            )
+
+            self._chunk[: self._rows] = np.nan
+            self._rows = 0
+        self._flush_pooled()
+
+    def _flush_pooled(self):
+        for path, arrays in self._pooled_pending.items():
+            if arrays:
+                self._pooled[path].update(np.concatenate(arrays)[:, None])
+                arrays.clear()
+        self._pending_values = 0
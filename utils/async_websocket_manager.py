@@ -0,0 +1,249 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional, Union
+
+from utils.metrics import ConnectionMetrics
+from utils.websocket_manager import WebSocketManager
+
+
+def _resolve(future: asyncio.Future, msg: dict):
+    if not future.done():
+        future.set_result(msg)
+
+
+class AsyncWebSocketManager:
+    """
+    asyncio interface to the shared rosbridge connection.
+
+    Wraps a WebSocketManager: its reader thread still owns the socket, but replies and
+    topic frames are handed to coroutines through futures and queues on the event loop,
+    so any number of tool calls can wait on the same connection at once instead of
+    queuing behind a lock.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        port: int,
+        default_timeout: float = 2.0,
+        idle_timeout: Optional[float] = 30.0,
+        reconnect_initial_delay: float = 0.1,
+        reconnect_max_delay: float = 5.0,
+        reconnect_timeout: Optional[float] = 60.0,
+    ):
+        self.manager = WebSocketManager(
+            ip,
+            port,
+            default_timeout,
+            idle_timeout,
+            reconnect_initial_delay=reconnect_initial_delay,
+            reconnect_max_delay=reconnect_max_delay,
+            reconnect_timeout=reconnect_timeout,
+        )
+
+    @property
+    def ip(self) -> str:
+        return self.manager.ip
+
+    @property
+    def port(self) -> int:
+        return self.manager.port
+
+    @property
+    def default_timeout(self) -> float:
+        return self.manager.default_timeout
+
+    @property
+    def connected(self) -> bool:
+        return self.manager.connected
+
+    @property
+    def metrics(self) -> ConnectionMetrics:
+        return self.manager.metrics
+
+    @property
+    def reconnecting(self) -> bool:
+        return self.manager.reconnecting
+
+    @property
+    def reconnects(self) -> int:
+        return self.manager.reconnects
+
+    @property
+    def gaps(self) -> List[dict]:
+        """Recent outages the connection recovered from: {"since", "until", "reason"}."""
+        return list(self.manager.gaps)
+
+    def set_ip(self, ip: str, port: int):
+        """
+        Set the IP and port for the WebSocket connection.
+        """
+        self.manager.set_ip(ip, port)
+
+    def next_id(self, prefix: str = "req") -> str:
+        """Return a rosbridge message id that is unique for this connection."""
+        return self.manager.next_id(prefix)
+
+    def register_request(self, request_id: str, handler: Callable[[dict], None]):
+        """Route the frame answering ``request_id`` to ``handler`` (runs on the reader thread)."""
+        self.manager.register_request(request_id, handler)
+
+    def unregister_request(self, request_id: str):
+        self.manager.unregister_request(request_id)
+
+    def add_replay(self, message: dict):
+        """Send a subscribe/advertise op again whenever the connection is reopened."""
+        self.manager.add_replay(message)
+
+    def remove_replay(self, op_id: str):
+        self.manager.remove_replay(op_id)
+
+    def add_topic_handler(self, topic: str, handler: Callable[[dict], None]):
+        """Route every ``publish`` frame for ``topic`` to ``handler`` (runs on the reader thread)."""
+        self.manager.add_topic_handler(topic, handler)
+
+    def remove_topic_handler(self, topic: str, handler: Callable[[dict], None]):
+        self.manager.remove_topic_handler(topic, handler)
+
+    async def connect(self) -> Optional[str]:
+        """
+        Establish the WebSocket connection without blocking the event loop.
+
+        Returns:
+            None if successful,
+            or an error message string if connection failed.
+        """
+        if self.manager.connected:
+            return None
+        return await asyncio.to_thread(self.manager.connect)
+
+    async def send(self, message: dict) -> Optional[str]:
+        """
+        Send a JSON-serializable message over WebSocket without blocking the event loop.
+
+        The write runs in a worker thread: it takes the connection's lock, which a reconnect
+        can hold for up to ``default_timeout``, and may block on a full socket buffer.
+
+        Returns:
+            None if successful,
+            or an error message string if send failed.
+        """
+        return await asyncio.to_thread(self.manager.send, message)
+
+    async def receive(self, timeout: Optional[float] = None) -> Optional[Union[str, bytes]]:
+        """
+        Receive the next frame that was not routed to a request or topic handler.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait before timing out.
+                                     If None, uses the default timeout.
+
+        Returns:
+            Optional[str]: JSON string received from rosbridge, or None if timeout/error.
+        """
+        return await asyncio.to_thread(self.manager.receive, timeout)
+
+    async def request(self, message: dict, timeout: Optional[float] = None) -> dict:
+        """
+        Send a request to Rosbridge and await the response matching its id.
+
+        Args:
+            message (dict): The Rosbridge message dictionary to send.
+            timeout (Optional[float]): Seconds to wait for a response.
+                                     If None, uses the default timeout.
+
+        Returns:
+            dict:
+                - Parsed JSON response if successful.
+                - {"error": "<error message>"} if connection/send/receive fails.
+        """
+        request_id = self.next_id(message.get("id") or message.get("op", "req"))
+        message = {**message, "id": request_id}
+
+        loop = asyncio.get_running_loop()
+        reply = loop.create_future()
+
+        def on_reply(msg: dict):
+            loop.call_soon_threadsafe(_resolve, reply, msg)
+
+        self.register_request(request_id, on_reply)
+        try:
+            send_error = await self.send(message)
+            if send_error:
+                return {"error": send_error}
+
+            actual_timeout = timeout if timeout is not None else self.default_timeout
+            try:
+                return await asyncio.wait_for(reply, actual_timeout)
+            except asyncio.TimeoutError:
+                self.manager.metrics.timeout(message.get("op", "request"))
+                return {"error": "no response or timeout from rosbridge"}
+        finally:
+            self.unregister_request(request_id)
+
+    async def request_many(
+        self, messages: List[dict], timeout: Optional[float] = None, max_in_flight: int = 64
+    ) -> List[dict]:
+        """
+        Pipeline several requests over the connection and return their responses.
+
+        Up to ``max_in_flight`` requests are outstanding at once; each is matched to its
+        reply by id, so rosbridge may answer them in any order.
+
+        Args:
+            messages (List[dict]): The Rosbridge message dictionaries to send.
+            timeout (Optional[float]): Seconds to wait for each response, counted from
+                                     when it is sent. If None, uses the default timeout.
+            max_in_flight (int): Maximum number of requests awaiting a reply at once.
+
+        Returns:
+            List[dict]: One response per message, in the same order as ``messages``,
+                each as returned by ``request()``.
+        """
+        conn_error = await self.connect()
+        if conn_error:
+            return [{"error": conn_error} for _ in messages]
+
+        slots = asyncio.Semaphore(max_in_flight)
+
+        async def limited(message: dict) -> dict:
+            async with slots:
+                return await self.request(message, timeout)
+
+        return list(await asyncio.gather(*(limited(message) for message in messages)))
+
+    @asynccontextmanager
+    async def subscription(self, subscribe_msg: dict):
+        """
+        Subscribe to a topic for the duration of an `async with` block.
+
+        The subscription gets its own id, so concurrent subscribers to the same topic don't
+        cancel each other. Yields an asyncio.Queue receiving the topic's `publish` frames,
+        any status frame rosbridge sends for this subscription and `gap` frames when the
+        connection drops and comes back, plus the send error (or None).
+        """
+        topic = subscribe_msg["topic"]
+        subscription_id = self.next_id(f"subscribe_{topic}")
+        subscribe_msg = {**subscribe_msg, "id": subscription_id}
+        frames: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def on_frame(msg: dict):
+            loop.call_soon_threadsafe(frames.put_nowait, msg)
+
+        self.register_request(subscription_id, on_frame)
+        self.add_topic_handler(topic, on_frame)
+        send_error = await self.send(subscribe_msg)
+        if not send_error:
+            self.add_replay(subscribe_msg)
+        try:
+            yield frames, send_error
+        finally:
+            self.remove_replay(subscription_id)
+            self.remove_topic_handler(topic, on_frame)
+            self.unregister_request(subscription_id)
+            if not send_error:
+                await self.send({"op": "unsubscribe", "topic": topic, "id": subscription_id})
+
+    async def close(self):
+        await asyncio.to_thread(self.manager.close)
@@ -0,0 +1,301 @@
+import base64
+import struct
+import sys
+from typing import Any, List
+
+# RFC 8746 typed arrays: tag -> numpy dtype. rosbridge sends numeric ROS arrays with the
+# little-endian tags (uint8[] goes out as a plain byte string instead).
+_TYPED_ARRAY_TAGS = {
+    64: "u1",
+    65: ">u2",
+    66: ">u4",
+    67: ">u8",
+    68: "u1",  # uint8, clamped arithmetic
+    69: "<u2",
+    70: "<u4",
+    71: "<u8",
+    72: "i1",
+    73: ">i2",
+    74: ">i4",
+    75: ">i8",
+    77: "<i2",
+    78: "<i4",
+    79: "<i8",
+    80: ">f2",
+    81: ">f4",
+    82: ">f8",
+    84: "<f2",
+    85: "<f4",
+    86: "<f8",
+}
+# Tags used for encoding, by numpy dtype.str (numpy itself is only imported once arrays
+# are decoded, so it costs nothing at startup)
+_TAGS_BY_DTYPE = {
+    "<u2": 69,
+    "<u4": 70,
+    "<u8": 71,
+    "|i1": 72,
+    "<i2": 77,
+    "<i4": 78,
+    "<i8": 79,
+    "<f2": 84,
+    "<f4": 85,
+    "<f8": 86,
+}
+
+_BREAK = object()
+
+
+class CBORDecodeError(ValueError):
+    pass
+
+
+class _Decoder:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def _take(self, n: int):
+        start = self.pos
+        self.pos += n
+        if self.pos > len(self.data):
+            raise CBORDecodeError("unexpected end of CBOR data")
+        return self.data[start : self.pos]
+
+    def _argument(self, info: int) -> int:
+        if info < 24:
+            return info
+        if info == 24:
+            return self._take(1)[0]
+        if info == 25:
+            return struct.unpack(">H", self._take(2))[0]
+        if info == 26:
+            return struct.unpack(">I", self._take(4))[0]
+        if info == 27:
+            return struct.unpack(">Q", self._take(8))[0]
+        raise CBORDecodeError(f"invalid additional information {info}")
+
+    def decode(self) -> Any:
+        initial = self._take(1)[0]
+        major, info = initial >> 5, initial & 0x1F
+
+        if major == 7:
+            return self._simple(info)
+        if info == 31:
+            return self._indefinite(major)
+        value = self._argument(info)
+
+        if major == 0:
+            return value
+        if major == 1:
+            return -1 - value
+        if major == 2:
+            return bytes(self._take(value))
+        if major == 3:
+            return bytes(self._take(value)).decode("utf-8")
+        if major == 4:
+            return [self.decode() for _ in range(value)]
+        if major == 5:
+            result = {}
+            for _ in range(value):
+                key = self.decode()
+                result[key] = self.decode()
+            return result
+        return self._tagged(value)
+
+    def _simple(self, info: int) -> Any:
+        if info == 20:
+            return False
+        if info == 21:
+            return True
+        if info in (22, 23):  # null, undefined
+            return None
+        if info == 25:
+            return struct.unpack(">e", self._take(2))[0]
+        if info == 26:
+            return struct.unpack(">f", self._take(4))[0]
+        if info == 27:
+            return struct.unpack(">d", self._take(8))[0]
+        if info == 31:
+            return _BREAK
+        if info < 24:
+            return info  # unassigned simple value
+        if info == 24:
+            return self._take(1)[0]
+        raise CBORDecodeError(f"invalid simple value {info}")
+
+    def _indefinite(self, major: int) -> Any:
+        items: List[Any] = []
+        while True:
+            item = self.decode()
+            if item is _BREAK:
+                break
+            items.append(item)
+        if major == 2:
+            return b"".join(items)
+        if major == 3:
+            return "".join(items)
+        if major == 4:
+            return items
+        if major == 5:
+            return dict(zip(items[::2], items[1::2]))
+        raise CBORDecodeError(f"major type {major} cannot be indefinite-length")
+
+    def _tagged(self, tag: int) -> Any:
+        dtype = _TYPED_ARRAY_TAGS.get(tag)
+        if dtype is None:
+            value = self.decode()
+            if tag in (2, 3) and isinstance(value, bytes):  # bignums
+                number = int.from_bytes(value, "big")
+                return number if tag == 2 else -1 - number
+            return value  # other tags (timestamps, ...) are returned untagged
+
+        # Typed array: view the frame's bytes in place instead of building a list
+        import numpy as np
+
+        initial = self._take(1)[0]
+        if initial >> 5 != 2 or initial & 0x1F == 31:
+            raise CBORDecodeError(f"typed array tag {tag} must wrap a byte string")
+        length = self._argument(initial & 0x1F)
+        start = self.pos
+        self.pos += length
+        if self.pos > len(self.data):
+            raise CBORDecodeError("unexpected end of CBOR data")
+        array = np.frombuffer(
+            self.data, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start
+        )
+        if not array.dtype.isnative:
+            array = array.astype(array.dtype.newbyteorder("="))
+        return array
+
+
+def loads(data: bytes) -> Any:
+    """
+    Decode one CBOR item (RFC 8949), as sent by rosbridge with ``compression="cbor"``.
+
+    Typed arrays (RFC 8746 tags 64-86) become read-only numpy arrays viewing ``data``,
+    so numeric ROS arrays cost no per-element work. Byte strings become ``bytes``.
+
+    Raises:
+        CBORDecodeError: If ``data`` is not a single well-formed CBOR item.
+    """
+    decoder = _Decoder(data)
+    try:
+        value = decoder.decode()
+    except CBORDecodeError:
+        raise
+    except (IndexError, struct.error, TypeError, ValueError, OverflowError, RecursionError) as e:
+        # e.g. a map with an array as key (unhashable), or nesting deeper than the stack
+        raise CBORDecodeError(f"malformed CBOR data: {e!r}") from e
+    if value is _BREAK or decoder.pos != len(data):
+        raise CBORDecodeError("malformed CBOR data: trailing bytes")
+    return value
+
+
+def _head(major: int, n: int) -> bytes:
+    if n < 24:
+        return bytes([major << 5 | n])
+    if n < 1 << 8:
+        return bytes([major << 5 | 24, n])
+    if n < 1 << 16:
+        return struct.pack(">BH", major << 5 | 25, n)
+    if n < 1 << 32:
+        return struct.pack(">BI", major << 5 | 26, n)
+    return struct.pack(">BQ", major << 5 | 27, n)
+
+
+def _encode(obj: Any, out: List[bytes]):
+    if obj is None:
+        out.append(b"\xf6")
+    elif obj is True:
+        out.append(b"\xf5")
+    elif obj is False:
+        out.append(b"\xf4")
+    elif isinstance(obj, int):
+        out.append(_head(0, obj) if obj >= 0 else _head(1, -1 - obj))
+    elif isinstance(obj, float):
+        out.append(struct.pack(">Bd", 0xFB, obj))
+    elif isinstance(obj, str):
+        encoded = obj.encode("utf-8")
+        out.append(_head(3, len(encoded)))
+        out.append(encoded)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        out.append(_head(2, len(obj)))
+        out.append(bytes(obj))
+    elif isinstance(obj, dict):
+        out.append(_head(5, len(obj)))
+        for key, value in obj.items():
+            _encode(key, out)
+            _encode(value, out)
+    elif isinstance(obj, (list, tuple)):
+        out.append(_head(4, len(obj)))
+        for item in obj:
+            _encode(item, out)
+    else:
+        _encode_numpy(obj, out)
+
+
+def _numpy():
+    """The numpy module if it has been imported; until then no value can be a numpy one."""
+    return sys.modules.get("numpy")
+
+
+def _encode_numpy(obj: Any, out: List[bytes]):
+    np = _numpy()
+    if np is not None and isinstance(obj, np.ndarray) and obj.ndim == 1:
+        if obj.dtype.kind in "uif":
+            if obj.dtype == np.uint8:
+                _encode(obj.tobytes(), out)
+                return
+            array = obj.astype(obj.dtype.newbyteorder("<"), copy=False)
+            tag = _TAGS_BY_DTYPE.get(array.dtype.str)
+            if tag is None:
+                _encode(obj.tolist(), out)
+                return
+            out.append(_head(6, tag))
+            _encode(array.tobytes(), out)
+            return
+    elif np is not None and isinstance(obj, np.generic):
+        _encode(obj.item(), out)
+        return
+    raise TypeError(f"Object of type {type(obj).__name__} is not CBOR serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode an object as CBOR, the way rosbridge does.
+
+    1-D numeric numpy arrays become little-endian RFC 8746 typed arrays, except uint8
+    arrays, which become byte strings.
+    """
+    out: List[bytes] = []
+    _encode(obj, out)
+    return b"".join(out)
+
+
+def to_jsonable(obj: Any) -> Any:
+    """
+    Make a decoded message JSON-serializable the way rosbridge's JSON encoding would be.
+
+    numpy arrays become lists and byte strings become base64 text. Lists of plain values
+    are returned as they are.
+    """
+    if isinstance(obj, dict):
+        return {key: to_jsonable(value) for key, value in obj.items()}
+    np = _numpy()
+    if isinstance(obj, list):
+        # ROS arrays are homogeneous, so the first element tells whether to descend
+        if obj and (
+            isinstance(obj[0], (dict, list, bytes, bytearray, memoryview))
+            or (np is not None and isinstance(obj[0], np.ndarray))
+        ):
+            return [to_jsonable(item) for item in obj]
+        return obj
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    if np is not None:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+    return obj
@@ -0,0 +1,141 @@
+"""
+JSON codec for rosbridge frames.
+
+Uses orjson or msgspec when one is installed and the standard library otherwise. Every
+backend encodes to UTF-8 bytes (sent as-is in a text frame), decodes str or bytes, and
+serializes numpy arrays and scalars and byte strings the way rosbridge's JSON encoding
+would (lists and base64 text).
+
+rosbridge writes non-finite floats as ``NaN``/``Infinity`` (Python's json does), which
+orjson and msgspec reject; frames containing them are decoded again with the standard
+library. Those frames are parsed twice, but the fast parse stops at the first non-finite
+token, so they cost at most about 10% more than json alone (see bench_codec's "inf"
+row); scanning every frame for the tokens up front would cost about as much as an orjson
+parse on the frames that have none. On the way out, orjson and msgspec write non-finite
+floats as ``null``.
+"""
+
+import base64
+import importlib.util
+import json
+import sys
+from typing import Any, Callable, Dict, NamedTuple, Tuple, Union
+
+
+class Codec(NamedTuple):
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[Union[str, bytes]], Any]
+
+
+def _default(obj: Any) -> Any:
+    """Encode the values rosbridge messages hold that JSON has no type for."""
+    np = sys.modules.get("numpy")  # not imported yet: no value can be a numpy one
+    if np is not None:
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_codec() -> Codec:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+    return Codec("json", dumps, json.loads)
+
+
+def _msgspec_codec() -> Codec:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any) -> bytes:
+        try:
+            return encoder.encode(obj)
+        except (msgspec.EncodeError, OverflowError) as e:
+            raise TypeError(str(e)) from e
+
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError:
+            return json.loads(data)  # NaN/Infinity, or not JSON at all
+
+    return Codec("msgspec", dumps, loads)
+
+
+def _orjson_codec() -> Codec:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return json.loads(data)  # NaN/Infinity, or not JSON at all
+
+    return Codec("orjson", dumps, loads)
+
+
+_FACTORIES: Dict[str, Callable[[], Codec]] = {
+    "json": _json_codec,
+    "msgspec": _msgspec_codec,
+    "orjson": _orjson_codec,
+}
+
+# Installed backends. They are only imported when first used, which keeps them out of
+# the server's startup time.
+AVAILABLE: Tuple[str, ...] = tuple(
+    name for name in _FACTORIES if name == "json" or importlib.util.find_spec(name) is not None
+)
+CODECS: Dict[str, Codec] = {}  # backends loaded so far
+
+
+def get(name: str) -> Codec:
+    """
+    Return an installed backend, importing it on first use.
+
+    Raises:
+        ValueError: If the backend isn't installed.
+    """
+    if name not in AVAILABLE:
+        raise ValueError(f"JSON codec {name!r} is not available; installed: {list(AVAILABLE)}")
+    if name not in CODECS:
+        CODECS[name] = _FACTORIES[name]()
+    return CODECS[name]
+
+
+def use(name: str) -> Codec:
+    """
+    Switch the module-level ``dumps``/``loads`` to another installed backend.
+
+    Raises:
+        ValueError: If the backend isn't installed.
+    """
+    global BACKEND, dumps, loads
+    backend = get(name)
+    BACKEND, dumps, loads = backend
+    return backend
+
+
+def _load_default_dumps(obj: Any) -> bytes:
+    return use(BACKEND).dumps(obj)
+
+
+def _load_default_loads(data: Union[str, bytes]) -> Any:
+    return use(BACKEND).loads(data)
+
+
+# The fastest installed backend, imported by the first dumps() or loads() call. dumps()
+# raises TypeError for values it can't encode and loads() raises ValueError for invalid
+# JSON, whichever backend is in use.
+BACKEND: str = next(name for name in ("orjson", "msgspec", "json") if name in AVAILABLE)
+dumps: Callable[[Any], bytes] = _load_default_dumps
+loads: Callable[[Union[str, bytes]], Any] = _load_default_loads
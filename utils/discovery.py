@@ -0,0 +1,102 @@
+import asyncio
+import ipaddress
+import time
+from typing import Dict, List
+
+from utils.network_utils import probe_rosbridge
+
+MAX_TARGETS = 65536  # host x port combinations one scan may cover
+
+
+def scan_targets(cidr: str, ports: List[int]) -> List[tuple]:
+    """
+    Expand a CIDR range (or a single address) and a port list into (ip, port) pairs.
+
+    Raises:
+        ValueError: If the range or a port is invalid, or there are too many pairs.
+    """
+    network = ipaddress.ip_network(cidr.strip(), strict=False)
+    if not ports:
+        raise ValueError("At least one port is required")
+    for port in ports:
+        if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+            raise ValueError(f"Invalid port: {port!r}")
+    # hosts() leaves out the network and broadcast addresses, except for /31 and /32
+    host_count = network.num_addresses if network.num_addresses <= 2 else network.num_addresses - 2
+    if host_count * len(ports) > MAX_TARGETS:
+        raise ValueError(
+            f"{cidr} x {len(ports)} port(s) is {host_count * len(ports)} targets; "
+            f"the limit is {MAX_TARGETS}"
+        )
+    hosts = list(network.hosts()) or [network.network_address]
+    return [(str(host), port) for host in hosts for port in ports]
+
+
+async def discover_rosbridge(
+    cidr: str,
+    ports: List[int],
+    max_concurrency: int = 256,
+    connect_timeout: float = 0.5,
+    confirm_timeout: float = 2.0,
+    time_budget: float = 10.0,
+) -> Dict:
+    """
+    Find rosbridge servers in an address range.
+
+    Every (host, port) is probed with an asyncio TCP connect, at most ``max_concurrency``
+    at once. Open ports are confirmed on the same connection with a WebSocket handshake
+    and a /rosapi/get_time call. Probes still running when ``time_budget`` runs out are
+    cancelled and counted as unfinished.
+
+    Returns:
+        dict: "endpoints" (confirmed rosbridge servers, fastest rosapi round trip first),
+            "open_ports" (open but not confirmed as rosbridge, with the reason), and scan
+            counts and timing.
+
+    Raises:
+        ValueError: If the range or ports are invalid.
+    """
+    targets = scan_targets(cidr, ports)
+    slots = asyncio.Semaphore(max(1, max_concurrency))
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + time_budget
+
+    async def probe(ip: str, port: int) -> Dict:
+        async with slots:
+            # Probes queued behind the cap get only what is left of the budget to connect
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            return await probe_rosbridge(
+                ip, port, timeout=confirm_timeout, connect_timeout=min(connect_timeout, remaining)
+            )
+
+    start = time.monotonic()
+    tasks = [asyncio.ensure_future(probe(ip, port)) for ip, port in targets]
+    done, pending = await asyncio.wait(tasks, timeout=time_budget) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    finished = [task for task in done if task.exception() is None]
+    endpoints, open_ports = [], []
+    for task in finished:
+        result = task.result()
+        if result["rosbridge"]:
+            endpoints.append(result)
+        elif result["open"]:
+            open_ports.append(result)
+    endpoints.sort(key=lambda r: (not r["rosapi"], r["rosapi_ms"], r["tcp_connect_ms"]))
+
+    return {
+        "cidr": cidr,
+        "ports": ports,
+        "endpoints": endpoints,
+        "open_ports": open_ports,
+        "targets": len(targets),
+        "probed": len(finished),
+        "unfinished": len(tasks) - len(finished),
+        "complete": len(finished) == len(tasks),
+        "elapsed_s": round(time.monotonic() - start, 3),
+    }
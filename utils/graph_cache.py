@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional
+
+from utils.async_websocket_manager import AsyncWebSocketManager
+
+
+def _rosapi_call(service: str, service_type: str, args: dict, request_id: str) -> dict:
+    return {
+        "op": "call_service",
+        "service": service,
+        "type": service_type,
+        "args": args,
+        "id": request_id,
+    }
+
+
+def graph_hash(graph: dict) -> str:
+    """Short fingerprint of a ROS graph snapshot, independent of the order rosapi lists things in."""
+    canonical = json.dumps(graph, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+
+def _sorted(items: Optional[list]) -> Optional[list]:
+    return sorted(items) if items is not None else None
+
+
+class GraphCache:
+    """
+    In-memory snapshot of the ROS graph: topics with their types, and services.
+
+    A snapshot takes two rosapi calls and is served for ``ttl`` seconds. While the cache
+    keeps being read, a background task refreshes it every ``ttl`` seconds so readers rarely
+    wait; after ``keepalive`` seconds without reads the task stops.
+
+    The connections (publishers and subscribers of every topic, providers of every service)
+    cost one more call per topic and service, so they are only fetched for readers that ask
+    for them (``get(details=True)``), at most once per ``ttl``, and never in the background.
+    Single-topic lookups are cheaper as live calls and fall back to them when the snapshot
+    has no connections.
+
+    Each snapshot carries ``hash``, a hash of the topics, types and services, and with the
+    connections ``connections_hash`` over all of it, so callers can tell whether anything
+    changed without comparing the full lists.
+    """
+
+    def __init__(
+        self,
+        ws_manager: AsyncWebSocketManager,
+        ttl: float = 5.0,
+        keepalive: float = 60.0,
+        max_in_flight: int = 64,
+    ):
+        self.ws_manager = ws_manager
+        self.ttl = ttl
+        self.keepalive = keepalive
+        self.max_in_flight = max_in_flight
+        self.snapshot: Optional[dict] = None
+        self.last_error: Optional[str] = None
+        self._last_access = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._refresh_details = False  # whether _refresh_task fetches the connections
+        self._background_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def age(self) -> Optional[float]:
+        if self.snapshot is None:
+            return None
+        return time.monotonic() - self.snapshot["fetched_at"]
+
+    def _fresh(self, details: bool) -> bool:
+        age = self.age()
+        return age is not None and age <= self.ttl and (not details or self.snapshot["details"])
+
+    async def get(self, details: bool = False) -> Optional[dict]:
+        """
+        Return a snapshot no older than ``ttl``, fetching one first if needed.
+
+        Args:
+            details: Also need the publishers, subscribers and providers.
+
+        Returns:
+            The snapshot dict, or None if caching is disabled or the fetch failed
+            (``last_error`` says why).
+        """
+        if not self.enabled:
+            return None
+        self._last_access = time.monotonic()
+        self._ensure_background_refresh()
+
+        if not self._fresh(details):
+            await self.refresh(details)
+        if not self._fresh(details):
+            return None  # fetch failed, don't serve an outdated graph
+        return self.snapshot
+
+    def invalidate(self):
+        """Forget the current snapshot, e.g. after switching to another robot."""
+        self.snapshot = None
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        self._refresh_task = None
+
+    async def refresh(self, details: bool = False) -> Optional[dict]:
+        """Fetch a new snapshot, sharing the fetch with any refresh already in progress."""
+        task = self._refresh_task
+        running = (
+            task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop()
+        )
+        if running and (self._refresh_details or not details):
+            await self._wait(task)
+            return self.snapshot
+        if running:
+            await self._wait(task)  # it won't fetch the connections; don't race it
+        task = self._refresh_task = asyncio.ensure_future(self._fetch(details))
+        self._refresh_details = details
+        await self._wait(task)
+        return self.snapshot
+
+    @staticmethod
+    async def _wait(task: asyncio.Task):
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # we were cancelled, not the fetch
+
+    def _ensure_background_refresh(self):
+        task = self._background_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._background_task = asyncio.ensure_future(self._background_refresh())
+
+    async def _background_refresh(self):
+        while time.monotonic() - self._last_access < self.keepalive:
+            await asyncio.sleep(self.ttl)
+            await self.refresh()
+
+    async def _fetch(self, details: bool):
+        topics_response, services_response = await asyncio.gather(
+            self.ws_manager.request(
+                _rosapi_call("/rosapi/topics", "rosapi/Topics", {}, "graph_cache_topics")
+            ),
+            self.ws_manager.request(
+                _rosapi_call("/rosapi/services", "rosapi/Services", {}, "graph_cache_services")
+            ),
+        )
+        for response in (topics_response, services_response):
+            if "values" not in response or not response.get("result", True):
+                self.last_error = response.get("error") or "rosapi call failed"
+                return
+
+        topic_names = topics_response["values"].get("topics", [])
+        topic_types = topics_response["values"].get("types", [])
+        service_names = services_response["values"].get("services", [])
+        topics = {
+            topic: {"type": topic_types[i] if i < len(topic_types) else ""}
+            for i, topic in enumerate(topic_names)
+        }
+        services: dict = {service: {} for service in service_names}
+        snapshot = {
+            "topics": topics,
+            "services": services,
+            "hash": graph_hash({"topics": topics, "services": sorted(services)}),
+            "details": details,
+        }
+        if details:
+            await self._fetch_connections(topics, services)
+            snapshot["connections_hash"] = graph_hash({"topics": topics, "services": services})
+        self.snapshot = {**snapshot, "fetched_at": time.monotonic()}
+        self.last_error = None
+
+    async def _fetch_connections(self, topics: dict, services: dict):
+        """Add publishers, subscribers and providers (sorted) to the snapshot's entries."""
+        requests = []
+        for topic in topics:
+            suffix = topic.replace("/", "_")
+            requests.append(
+                _rosapi_call(
+                    "/rosapi/publishers",
+                    "rosapi/Publishers",
+                    {"topic": topic},
+                    f"graph_cache_publishers{suffix}",
+                )
+            )
+            requests.append(
+                _rosapi_call(
+                    "/rosapi/subscribers",
+                    "rosapi/Subscribers",
+                    {"topic": topic},
+                    f"graph_cache_subscribers{suffix}",
+                )
+            )
+        for service in services:
+            requests.append(
+                _rosapi_call(
+                    "/rosapi/service_providers",
+                    "rosapi/ServiceProviders",
+                    {"service": service},
+                    f"graph_cache_providers{service.replace('/', '_')}",
+                )
+            )
+        responses = await self.ws_manager.request_many(requests, max_in_flight=self.max_in_flight)
+
+        def values(response: dict, key: str) -> Optional[list]:
+            # None marks a failed lookup, so readers fall back to a live call
+            if "values" in response and response.get("result", True):
+                return response["values"].get(key, [])
+            return None
+
+        for i, entry in enumerate(topics.values()):
+            entry["publishers"] = _sorted(values(responses[2 * i], "publishers"))
+            entry["subscribers"] = _sorted(values(responses[2 * i + 1], "subscribers"))
+        offset = 2 * len(topics)
+        for i, entry in enumerate(services.values()):
+            entry["providers"] = _sorted(values(responses[offset + i], "providers"))
@@ -0,0 +1,286 @@
+import base64
+import sys
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+# sensor_msgs/Image encodings: (dtype, channels)
+_ENCODINGS = {
+    "mono8": (np.uint8, 1),
+    "8UC1": (np.uint8, 1),
+    "bgr8": (np.uint8, 3),
+    "rgb8": (np.uint8, 3),
+    "8UC3": (np.uint8, 3),
+    "bgra8": (np.uint8, 4),
+    "rgba8": (np.uint8, 4),
+    "8UC4": (np.uint8, 4),
+    "mono16": (np.uint16, 1),
+    "16UC1": (np.uint16, 1),
+    "32FC1": (np.float32, 1),
+    "bayer_rggb8": (np.uint8, 1),
+    "bayer_bggr8": (np.uint8, 1),
+    "bayer_gbrg8": (np.uint8, 1),
+    "bayer_grbg8": (np.uint8, 1),
+    "yuv422": (np.uint8, 2),
+    "uyvy": (np.uint8, 2),
+    "yuv422_yuy2": (np.uint8, 2),
+    "yuyv": (np.uint8, 2),
+}
+
+# Conversions that must happen at full resolution, before downscaling.
+# OpenCV names Bayer patterns by the second row, hence the offset (same mapping as cv_bridge).
+_FULL_RES_CONVERSIONS = {
+    "bayer_rggb8": cv2.COLOR_BayerBG2BGR,
+    "bayer_bggr8": cv2.COLOR_BayerRG2BGR,
+    "bayer_gbrg8": cv2.COLOR_BayerGR2BGR,
+    "bayer_grbg8": cv2.COLOR_BayerGB2BGR,
+    "yuv422": cv2.COLOR_YUV2BGR_UYVY,
+    "uyvy": cv2.COLOR_YUV2BGR_UYVY,
+    "yuv422_yuy2": cv2.COLOR_YUV2BGR_YUY2,
+    "yuyv": cv2.COLOR_YUV2BGR_YUY2,
+}
+
+# Depth images are scaled to their own value range so they are visible as 8-bit
+_DEPTH_ENCODINGS = {"16UC1", "32FC1"}
+
+# compressed_depth_image_transport prepends a 12-byte config header to the PNG
+_COMPRESSED_DEPTH_HEADER = 12
+
+
+def _data_buffer(data) -> Union[bytes, np.ndarray]:
+    """The bytes of a uint8[] field: rosbridge sends base64, some bridges send a list."""
+    if isinstance(data, str):
+        return base64.b64decode(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    return np.asarray(data, dtype=np.uint8)
+
+
+def fit_size(
+    width: int, height: int, max_width: Optional[int], max_height: Optional[int]
+) -> Tuple[int, int]:
+    """Largest size within max_width x max_height with the same aspect ratio. Never upscales."""
+    scale = 1.0
+    if max_width:
+        scale = min(scale, max_width / width)
+    if max_height:
+        scale = min(scale, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def resize_to_fit(
+    image: np.ndarray,
+    max_width: Optional[int],
+    max_height: Optional[int],
+    interpolation: int = cv2.INTER_AREA,
+) -> np.ndarray:
+    """Downscale an image to fit max_width x max_height. Returns it unchanged if it fits."""
+    height, width = image.shape[:2]
+    size = fit_size(width, height, max_width, max_height)
+    if size == (width, height):
+        return image
+    return cv2.resize(image, size, interpolation=interpolation)
+
+
+def _depth_to_8bit(image: np.ndarray) -> np.ndarray:
+    """Scale valid depth values (finite, > 0) to 1..255; invalid pixels become 0."""
+    valid = image > 0
+    if image.dtype.kind == "f":
+        valid &= np.isfinite(image)
+    if not valid.any():
+        return np.zeros(image.shape, dtype=np.uint8)
+    low, high = image[valid].min(), image[valid].max()
+    scale = 254.0 / (high - low) if high > low else 0.0
+    scaled = (image.astype(np.float32) - low) * scale + 1.0
+    scaled[~valid] = 0.0
+    return scaled.astype(np.uint8)
+
+
+def decode_image(
+    msg: dict, max_width: Optional[int] = None, max_height: Optional[int] = None
+) -> np.ndarray:
+    """
+    Decode a sensor_msgs/Image message into an 8-bit BGR, BGRA or grayscale array.
+
+    The pixel data is viewed in place (honouring ``step`` row padding) and downscaled
+    before any colour or depth conversion, so full-resolution copies are only made for
+    encodings that cannot be resized as-is (Bayer, YUV 4:2:2).
+
+    Args:
+        msg (dict): The sensor_msgs/Image message as received from rosbridge.
+        max_width (Optional[int]): Maximum width of the result. None for no limit.
+        max_height (Optional[int]): Maximum height of the result. None for no limit.
+
+    Returns:
+        np.ndarray: The decoded image.
+
+    Raises:
+        ValueError: If the encoding is unsupported or the data doesn't match the header.
+    """
+    encoding = msg.get("encoding", "")
+    if encoding not in _ENCODINGS:
+        raise ValueError(f"Unsupported image encoding: {encoding!r}")
+    dtype, channels = _ENCODINGS[encoding]
+    dtype = np.dtype(dtype)
+    if dtype.itemsize > 1 and bool(msg.get("is_bigendian")) != (sys.byteorder == "big"):
+        dtype = dtype.newbyteorder()
+
+    width, height = int(msg.get("width", 0)), int(msg.get("height", 0))
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid image size {width}x{height}")
+    row_bytes = width * channels * dtype.itemsize
+    step = int(msg.get("step") or row_bytes)
+    data = _data_buffer(msg.get("data", ""))
+    if step < row_bytes or len(data) < step * (height - 1) + row_bytes:
+        raise ValueError(
+            f"Image data ({len(data)} bytes, step {step}) too short for {width}x{height} {encoding}"
+        )
+
+    shape = (height, width, channels) if channels > 1 else (height, width)
+    strides = (step, channels * dtype.itemsize, dtype.itemsize)[: len(shape)]
+    image = np.ndarray(shape, dtype=dtype, buffer=data, strides=strides)
+    if not dtype.isnative:
+        image = image.astype(dtype.newbyteorder())
+
+    if encoding in _FULL_RES_CONVERSIONS:
+        image = cv2.cvtColor(np.ascontiguousarray(image), _FULL_RES_CONVERSIONS[encoding])
+    interpolation = cv2.INTER_NEAREST if encoding in _DEPTH_ENCODINGS else cv2.INTER_AREA
+    image = resize_to_fit(image, max_width, max_height, interpolation)
+
+    if encoding == "rgb8":
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    if encoding == "rgba8":
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+    if encoding == "mono16":
+        return (image >> 8).astype(np.uint8)
+    if encoding in _DEPTH_ENCODINGS:
+        return _depth_to_8bit(image)
+    return np.ascontiguousarray(image)
+
+
+def _jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG's frame header without decoding it."""
+    if bytes(data[:2]) != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        # SOF0..SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[i + 5 : i + 7], "big")
+            width = int.from_bytes(data[i + 7 : i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2 : i + 4], "big")
+    return None
+
+
+def decode_compressed_image(
+    msg: dict, max_width: Optional[int] = None, max_height: Optional[int] = None
+) -> np.ndarray:
+    """
+    Decode a sensor_msgs/CompressedImage message into an 8-bit BGR, BGRA or grayscale array.
+
+    JPEG frames that are much larger than the requested size are decoded at 1/2, 1/4 or
+    1/8 scale directly by libjpeg, which is several times faster than decoding the full
+    frame and resizing it. compressedDepth PNGs are decoded as depth images.
+
+    Args:
+        msg (dict): The sensor_msgs/CompressedImage message as received from rosbridge.
+        max_width (Optional[int]): Maximum width of the result. None for no limit.
+        max_height (Optional[int]): Maximum height of the result. None for no limit.
+
+    Returns:
+        np.ndarray: The decoded image.
+
+    Raises:
+        ValueError: If the data cannot be decoded.
+    """
+    fmt = msg.get("format", "")
+    buffer = np.frombuffer(_data_buffer(msg.get("data", "")), dtype=np.uint8)
+
+    if "compressedDepth" in fmt:
+        image = cv2.imdecode(buffer[_COMPRESSED_DEPTH_HEADER:], cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"Could not decode compressed depth image ({fmt!r})")
+        return _depth_to_8bit(resize_to_fit(image, max_width, max_height, cv2.INTER_NEAREST))
+
+    flags = cv2.IMREAD_UNCHANGED
+    size = _jpeg_size(buffer)
+    if size is not None:
+        width, height = size
+        target_width, target_height = fit_size(width, height, max_width, max_height)
+        for factor, reduced_flag in (
+            (8, cv2.IMREAD_REDUCED_COLOR_8),
+            (4, cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_COLOR_2),
+        ):
+            if -(-width // factor) >= target_width and -(-height // factor) >= target_height:
+                flags = reduced_flag
+                break
+
+    image = cv2.imdecode(buffer, flags)
+    if image is None:
+        raise ValueError(f"Could not decode compressed image ({fmt!r})")
+    image = resize_to_fit(image, max_width, max_height)
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    return image
+
+
+def decode_png_payload(data: str) -> bytes:
+    """
+    Recover the text rosbridge packed into a PNG for ``compression="png"``.
+
+    rosbridge writes the JSON message as the bytes of an RGB image, padded with newlines
+    to fill it. OpenCV decodes pixels as BGR, so the channels are swapped back.
+
+    Raises:
+        ValueError: If the data is not a PNG.
+    """
+    try:
+        image = cv2.imdecode(
+            np.frombuffer(_data_buffer(data), dtype=np.uint8), cv2.IMREAD_UNCHANGED
+        )
+    except (cv2.error, TypeError):
+        image = None  # e.g. empty data, or not bytes at all
+    if image is None:
+        raise ValueError("Could not decode PNG-compressed message")
+    if image.ndim == 3:
+        image = image[:, :, 2::-1]
+    return image.tobytes().rstrip(b"\n")
+
+
+def encode_image(image: np.ndarray, fmt: str = "jpeg", quality: int = 80) -> bytes:
+    """
+    Encode an 8-bit image as JPEG or PNG.
+
+    Args:
+        image (np.ndarray): BGR, BGRA or grayscale image.
+        fmt (str): "jpeg" or "png".
+        quality (int): JPEG quality, 1-100. PNG is lossless and ignores it.
+
+    Returns:
+        bytes: The encoded image.
+
+    Raises:
+        ValueError: If the format is unsupported or encoding fails.
+    """
+    fmt = fmt.lower()
+    if fmt in ("jpeg", "jpg"):
+        if image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # JPEG has no alpha channel
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    elif fmt == "png":
+        # Low zlib effort: previews are small and latency matters more than bytes here
+        ok, encoded = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    else:
+        raise ValueError(f"Unsupported image format: {fmt!r}. Use 'jpeg' or 'png'.")
+    if not ok:
+        raise ValueError(f"Failed to encode image as {fmt}")
+    return encoded.tobytes()
@@ -0,0 +1,247 @@
+"""
+Logging for the server and its rosbridge connections.
+
+The server speaks MCP over stdout, so nothing may be logged there. Records are put on a
+queue by the logging thread (no I/O on the caller's thread) and written to stderr or a
+file by a listener thread, which also keeps the most recent ones in memory for
+``get_recent_logs``. Repeats of the same message are rate-limited before they are queued.
+
+Every component logs under the ``ros_mcp`` logger (``ros_mcp.websocket``, ...), with
+structured fields passed as ``extra``.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+LOGGER_NAME = "ros_mcp"
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Logger for one component of the server, e.g. get_logger("websocket")."""
+    return logging.getLogger(f"{LOGGER_NAME}.{component}")
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    """The structured fields a record was logged with."""
+    return {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRS}
+
+
+def record_to_dict(record: logging.LogRecord) -> dict:
+    entry = {
+        "time": round(record.created, 3),
+        "level": record.levelname,
+        "logger": record.name,
+        "message": record.getMessage(),
+        **record_fields(record),
+    }
+    if record.exc_info and not record.exc_text:
+        record.exc_text = logging.Formatter().formatException(record.exc_info)
+    if record.exc_text:
+        entry["exception"] = record.exc_text
+    return entry
+
+
+class TextFormatter(logging.Formatter):
+    """``time LEVEL logger: message key=value ...``"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the record's fields as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record_to_dict(record), default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most ``burst`` records with the same logger, level and message template
+    per ``interval`` seconds.
+
+    The first record let through after some were dropped carries their number in its
+    ``suppressed`` field. Messages must be logged with %-style arguments for repeats to be
+    recognized (an f-string makes every message distinct).
+    """
+
+    def __init__(self, burst: int = 5, interval: float = 10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.suppressed_total = 0
+        self._windows: Dict[Tuple[str, int, str], List[float]] = {}  # key -> [start, n, dropped]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                dropped = int(window[2]) if window is not None else 0
+                if len(self._windows) > 1000:
+                    self._windows.clear()  # bound memory if templates aren't constant
+                self._windows[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed_total += 1
+            return False
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last ``capacity`` records in memory, as dicts."""
+
+    def __init__(self, capacity: int = 500):
+        super().__init__()
+        self.entries: deque = deque(maxlen=capacity)
+        self.emitted = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            entry = record_to_dict(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self.entries.append(entry)
+            self.emitted += 1
+
+    def recent(
+        self,
+        limit: int = 50,
+        level: Optional[str] = None,
+        logger: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        The newest ``limit`` entries (oldest first) at or above ``level``, from loggers
+        whose name starts with ``logger``, logged after wall time ``since``.
+        """
+        levelno = logging.getLevelName(level.upper()) if level else logging.NOTSET
+        if not isinstance(levelno, int):
+            raise ValueError(f"Unknown log level {level!r}")
+        with self.lock:
+            entries = list(self.entries)
+        selected = [
+            entry
+            for entry in entries
+            if logging.getLevelName(entry["level"]) >= levelno
+            and (logger is None or entry["logger"].startswith(logger))
+            and (since is None or entry["time"] > since)
+        ]
+        return selected[-limit:] if limit > 0 else []
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # prepare() (inherited) formats the message and traceback on the caller's thread and
+    # keeps the record's fields
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # the writer can't keep up; dropping beats blocking the caller
+
+
+class LoggingSetup:
+    """What ``setup_logging`` installed, so it can be inspected and torn down."""
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        listener: logging.handlers.QueueListener,
+        ring: RingBufferHandler,
+        rate_limit: Optional[RateLimitFilter],
+    ):
+        self.handler = handler
+        self.listener = listener
+        self.ring = ring
+        self.rate_limit = rate_limit
+        self.stopped = False
+
+    def stop(self):
+        """Flush queued records and detach the handlers. Safe to call more than once."""
+        logging.getLogger(LOGGER_NAME).removeHandler(self.handler)
+        if not self.stopped:
+            self.stopped = True
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+
+
+_active: Optional[LoggingSetup] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    file: Optional[str] = None,
+    fmt: str = "text",
+    buffer_size: int = 500,
+    rate_limit_burst: Optional[int] = 5,
+    rate_limit_interval: float = 10.0,
+    queue_size: int = 10000,
+) -> LoggingSetup:
+    """
+    Send the ``ros_mcp`` loggers' records through a queue to stderr (or ``file``) and an
+    in-memory ring buffer. Replaces an earlier setup.
+
+    Args:
+        level: Lowest level logged.
+        file: Append to this file instead of writing to stderr.
+        fmt: "text" or "json" (one object per line).
+        buffer_size: Records kept in memory for get_recent_logs.
+        rate_limit_burst: Repeats of one message let through per interval; None disables.
+        rate_limit_interval: Seconds of a rate limit window.
+        queue_size: Records waiting to be written before new ones are dropped.
+    """
+    formatters = {"text": TextFormatter, "json": JsonFormatter}
+    if fmt not in formatters:
+        raise ValueError(f"Unknown log format {fmt!r}; expected one of {list(formatters)}")
+
+    global _active
+    if _active is not None:
+        _active.stop()
+
+    output = logging.FileHandler(file) if file else logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatters[fmt]())
+    ring = RingBufferHandler(buffer_size)
+    records: queue.Queue = queue.Queue(maxsize=queue_size)
+    listener = logging.handlers.QueueListener(records, output, ring)
+    handler = _QueueHandler(records)
+    rate_limit = None
+    if rate_limit_burst is not None:
+        rate_limit = RateLimitFilter(rate_limit_burst, rate_limit_interval)
+        handler.addFilter(rate_limit)
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper())
+    logger.addHandler(handler)
+    logger.propagate = False  # the root logger's handlers may write to stdout
+    listener.start()
+    _active = LoggingSetup(handler, listener, ring, rate_limit)
+    atexit.register(_active.stop)
+    return _active
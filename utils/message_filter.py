@@ -0,0 +1,254 @@
+import ast
+import operator
+import re
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+Step = Union[str, int]
+
+# A field path: names separated by dots, with optional [index] parts, e.g. "status[0].values[-1].key"
+_PATH_TOKEN = re.compile(r"(?:^|\.)([A-Za-z_][A-Za-z0-9_]*)|\[(-?\d+)\]")
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+
+def _multiply(a, b):
+    # Numbers only: "'x' * 10**9" would build a huge string
+    if isinstance(a, (str, tuple, list)) or isinstance(b, (str, tuple, list)):
+        raise TypeError("only numbers can be multiplied")
+    return a * b
+
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _multiply,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+_FUNCTIONS = {"abs": abs, "len": len, "min": min, "max": max, "round": round}
+
+MAX_EXPRESSION_LENGTH = 1000
+
+
+class FieldPathError(ValueError):
+    pass
+
+
+class _Missing(Exception):
+    """A field named in a filter is absent from the message."""
+
+
+def parse_path(path: str) -> Tuple[Step, ...]:
+    """
+    Split a field path such as ``pose.pose.position`` or ``name[3]`` into its steps.
+
+    Raises:
+        FieldPathError: If the path is malformed.
+    """
+    steps: List[Step] = []
+    position = 0
+    for match in _PATH_TOKEN.finditer(path):
+        if match.start() != position:
+            break
+        steps.append(match.group(1) if match.group(1) is not None else int(match.group(2)))
+        position = match.end()
+    if not steps or position != len(path) or path.startswith(".") or isinstance(steps[0], int):
+        raise FieldPathError(f"Invalid field path: {path!r}")
+    return tuple(steps)
+
+
+def get_field(msg: Any, steps: Sequence[Step]) -> Any:
+    """
+    Follow a parsed path into a message.
+
+    Raises:
+        KeyError, IndexError, TypeError: If the field doesn't exist.
+    """
+    value = msg
+    for step in steps:
+        value = value[step]
+    return value
+
+
+def compile_projection(paths: List[str]) -> Callable[[dict], dict]:
+    """
+    Compile field paths into a function returning ``{path: value}`` for a message.
+
+    Fields missing from a message come back as None.
+
+    Raises:
+        FieldPathError: If a path is malformed.
+    """
+    compiled = [(path, parse_path(path)) for path in paths]
+
+    def project(msg: dict) -> dict:
+        result = {}
+        for path, steps in compiled:
+            try:
+                result[path] = get_field(msg, steps)
+            except (KeyError, IndexError, TypeError):
+                result[path] = None
+        return result
+
+    return project
+
+
+def _path_steps(node: ast.AST) -> Optional[List[Step]]:
+    """Steps of a field reference (name, attribute and constant-subscript chain), or None."""
+    if isinstance(node, ast.Name):
+        return [node.id]
+    if isinstance(node, ast.Attribute):
+        steps = _path_steps(node.value)
+        return steps + [node.attr] if steps is not None else None
+    if isinstance(node, ast.Subscript):
+        steps = _path_steps(node.value)
+        index = node.slice
+        if isinstance(index, ast.UnaryOp) and isinstance(index.op, ast.USub):
+            if isinstance(index.operand, ast.Constant) and isinstance(index.operand.value, int):
+                return steps + [-index.operand.value] if steps is not None else None
+        if isinstance(index, ast.Constant) and isinstance(index.value, (int, str)):
+            return steps + [index.value] if steps is not None else None
+    return None
+
+
+def _compile_node(node: ast.AST) -> Callable[[dict], Any]:
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if not isinstance(value, (bool, int, float, str, type(None))):
+            raise FieldPathError(f"Unsupported constant: {value!r}")
+        return lambda msg: value
+
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_compile_node(item) for item in node.elts]
+        return lambda msg: tuple(item(msg) for item in items)
+
+    steps = _path_steps(node)
+    if steps is not None:
+
+        def field(msg: dict) -> Any:
+            try:
+                return get_field(msg, steps)
+            except (KeyError, IndexError, TypeError):
+                raise _Missing(".".join(map(str, steps))) from None
+
+        return field
+
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile_node(value) for value in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda msg: all(operand(msg) for operand in operands)
+        return lambda msg: any(operand(msg) for operand in operands)
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda msg: not operand(msg)
+        if isinstance(node.op, ast.USub):
+            return lambda msg: -operand(msg)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        op = _BINARY_OPS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        return lambda msg: op(left(msg), right(msg))
+
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPS for op in node.ops):
+        first = _compile_node(node.left)
+        chain = [
+            (_COMPARE_OPS[type(op)], _compile_node(comparator))
+            for op, comparator in zip(node.ops, node.comparators)
+        ]
+
+        def compare(msg: dict) -> bool:
+            left = first(msg)
+            for op, comparator in chain:
+                right = comparator(msg)
+                if not op(left, right):
+                    return False
+                left = right
+            return True
+
+        return compare
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in _FUNCTIONS
+        and not node.keywords
+    ):
+        function = _FUNCTIONS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+        return lambda msg: function(*(arg(msg) for arg in args))
+
+    raise FieldPathError(f"Unsupported syntax in filter: {ast.dump(node)[:80]}")
+
+
+def compile_filter(expression: str) -> Callable[[dict], bool]:
+    """
+    Compile a filter expression over message fields into a predicate.
+
+    Expressions use Python syntax restricted to field paths (``pose.pose.position.x``,
+    ``name[0]``), literals, comparisons (including ``in``), ``and``/``or``/``not``,
+    arithmetic and the functions abs, len, min, max and round. Nothing is evaluated with
+    ``eval``: the parsed tree is turned into closures once, up front.
+
+    The predicate is False for messages lacking a referenced field, or where the
+    expression can't be evaluated (e.g. comparing a string with a number).
+
+    Raises:
+        FieldPathError: If the expression is invalid or uses unsupported syntax.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise FieldPathError(f"Filter longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise FieldPathError(f"Invalid filter {expression!r}: {e.msg}") from None
+    evaluate = _compile_node(tree.body)
+
+    def predicate(msg: dict) -> bool:
+        try:
+            return bool(evaluate(msg))
+        except (_Missing, TypeError, ValueError, ZeroDivisionError, OverflowError):
+            return False
+
+    return predicate
+
+
+def compile_selection(
+    fields: Optional[List[str]] = None, where: Optional[str] = None
+) -> Optional[Callable[[dict], Optional[dict]]]:
+    """
+    Compile a projection and a filter into one per-message transform.
+
+    The transform returns None for messages rejected by ``where``, otherwise the
+    projected message (or the message itself when no fields are given).
+
+    Returns:
+        The transform, or None when neither fields nor where is given.
+
+    Raises:
+        FieldPathError: If a path or the filter is invalid.
+    """
+    if not fields and not where:
+        return None
+    predicate = compile_filter(where) if where else None
+    project = compile_projection(fields) if fields else None
+
+    def transform(msg: dict) -> Optional[dict]:
+        if predicate is not None and not predicate(msg):
+            return None
+        return project(msg) if project is not None else msg
+
+    return transform
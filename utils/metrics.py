@@ -0,0 +1,259 @@
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus-style
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)  # fmt: skip
+
+# A topic's rate is measured over windows of at least this many seconds
+RATE_WINDOW = 1.0
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram: O(log buckets) to record, constant memory.
+
+    Percentiles are estimated by linear interpolation inside the bucket they fall in, so
+    they are exact to within a bucket's width.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one counts values above all bounds
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimated ``q``-quantile (0..1) in seconds, or None if nothing was recorded."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> dict:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean_ms": ms(self.sum / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(0.50)),
+            "p95_ms": ms(self.percentile(0.95)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "max_ms": ms(self.max) if self.count else None,
+        }
+
+
+class ToolMetrics:
+    """Latency histogram and error count per MCP tool."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, tool: str, seconds: float, ok: bool):
+        with self.lock:
+            self.latency[tool].record(seconds)
+            if not ok:
+                self.errors[tool] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self.lock:
+            return {
+                tool: {**histogram.summary(), "errors": self.errors.get(tool, 0)}
+                for tool, histogram in sorted(self.latency.items())
+            }
+
+
+class _TopicStats:
+    __slots__ = ("messages", "bytes", "last_at", "window_start", "window_count", "rate_hz")
+
+    def __init__(self, now: float):
+        self.messages = 0
+        self.bytes = 0
+        self.last_at = now
+        self.window_start = now
+        self.window_count = 0
+        self.rate_hz = 0.0
+
+    def add(self, nbytes: int, now: float):
+        self.messages += 1
+        self.bytes += nbytes
+        self.last_at = now
+        if now - self.window_start >= RATE_WINDOW:
+            self.rate_hz = self.window_count / (now - self.window_start)
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+
+    def current_rate(self, now: float) -> float:
+        """Rate over the last full window, or over the one in progress once it is long enough."""
+        elapsed = now - self.window_start
+        if elapsed >= RATE_WINDOW:
+            return self.window_count / elapsed
+        return self.rate_hz
+
+
+class ConnectionMetrics:
+    """
+    Traffic counters for one rosbridge connection: frames and bytes per op in each
+    direction, timeouts per op, and message count, bytes and rate per subscribed topic.
+
+    Updated from the reader thread and the event loop; one uncontended lock per update.
+    """
+
+    def __init__(self):
+        self.frames: Dict[Tuple[str, str], int] = defaultdict(int)  # (direction, op) -> frames
+        self.bytes: Dict[Tuple[str, str], int] = defaultdict(int)  # (direction, op) -> bytes
+        self.timeouts: Dict[str, int] = defaultdict(int)
+        self.topics: Dict[str, _TopicStats] = {}
+        self.lock = threading.Lock()
+
+    def sent(self, op: Optional[str], nbytes: int):
+        key = ("out", op or "unknown")
+        with self.lock:
+            self.frames[key] += 1
+            self.bytes[key] += nbytes
+
+    def received(self, op: Optional[str], nbytes: int, topic: Optional[str] = None):
+        key = ("in", op or "unknown")
+        now = time.monotonic()
+        with self.lock:
+            self.frames[key] += 1
+            self.bytes[key] += nbytes
+            if topic is not None:
+                stats = self.topics.get(topic)
+                if stats is None:
+                    stats = self.topics[topic] = _TopicStats(now)
+                stats.add(nbytes, now)
+
+    def timeout(self, op: str):
+        with self.lock:
+            self.timeouts[op] += 1
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self.lock:
+            traffic: Dict[str, Dict[str, dict]] = {"in": {}, "out": {}}
+            for (direction, op), frames in sorted(self.frames.items()):
+                traffic[direction][op] = {"frames": frames, "bytes": self.bytes[direction, op]}
+            return {
+                "traffic": traffic,
+                "timeouts": dict(self.timeouts),
+                "topics": {
+                    topic: {
+                        "messages": stats.messages,
+                        "bytes": stats.bytes,
+                        "rate_hz": round(stats.current_rate(now), 3),
+                        "last_message_age_s": round(now - stats.last_at, 3),
+                    }
+                    for topic, stats in sorted(self.topics.items())
+                },
+            }
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name: str, value, **labels) -> str:
+    label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f"{name}{{{label_text}}} {value}"
+
+
+def prometheus_text(
+    tools: ToolMetrics, connections: Dict[str, Tuple[ConnectionMetrics, int]]
+) -> str:
+    """
+    Render metrics in the Prometheus text exposition format.
+
+    Args:
+        tools: The server's tool metrics.
+        connections: Robot name -> (its connection metrics, its reconnect count).
+    """
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    name = "ros_mcp_tool_duration_seconds"
+    family(name, "histogram", "MCP tool call latency.")
+    with tools.lock:
+        histograms = sorted(tools.latency.items())
+        errors = dict(tools.errors)
+        for tool, histogram in histograms:
+            cumulative = 0
+            for bound, n in zip(histogram.buckets, histogram.counts):
+                cumulative += n
+                lines.append(_sample(f"{name}_bucket", cumulative, tool=tool, le=bound))
+            lines.append(_sample(f"{name}_bucket", histogram.count, tool=tool, le="+Inf"))
+            lines.append(_sample(f"{name}_sum", histogram.sum, tool=tool))
+            lines.append(_sample(f"{name}_count", histogram.count, tool=tool))
+    family(
+        "ros_mcp_tool_errors_total", "counter", "MCP tool calls that failed or returned an error."
+    )
+    for tool, _ in histograms:
+        lines.append(_sample("ros_mcp_tool_errors_total", errors.get(tool, 0), tool=tool))
+
+    snapshots = {robot: (metrics.snapshot(), n) for robot, (metrics, n) in connections.items()}
+    for key, help_text in (
+        ("frames", "rosbridge frames by direction and op."),
+        ("bytes", "rosbridge frame bytes by direction and op."),
+    ):
+        name = f"ros_mcp_rosbridge_{key}_total"
+        family(name, "counter", help_text)
+        for robot, (snapshot, _) in snapshots.items():
+            for direction, ops in snapshot["traffic"].items():
+                for op, traffic in ops.items():
+                    lines.append(
+                        _sample(name, traffic[key], robot=robot, direction=direction, op=op)
+                    )
+    name = "ros_mcp_rosbridge_timeouts_total"
+    family(name, "counter", "rosbridge waits that timed out, by op.")
+    for robot, (snapshot, _) in snapshots.items():
+        for op, count in snapshot["timeouts"].items():
+            lines.append(_sample(name, count, robot=robot, op=op))
+    name = "ros_mcp_rosbridge_reconnects_total"
+    family(name, "counter", "Connections reopened after a drop.")
+    for robot, (_, reconnects) in snapshots.items():
+        lines.append(_sample(name, reconnects, robot=robot))
+    for key, name, kind, help_text in (
+        ("messages", "ros_mcp_topic_messages_total", "counter", "Messages received per topic."),
+        ("rate_hz", "ros_mcp_topic_rate_hz", "gauge", "Recent message rate per topic."),
+    ):
+        family(name, kind, help_text)
+        for robot, (snapshot, _) in snapshots.items():
+            for topic, stats in snapshot["topics"].items():
+                lines.append(_sample(name, stats[key], robot=robot, topic=topic))
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str, text: str):
+    """Replace ``path`` atomically, so a scraper (e.g. node_exporter) never reads half a file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -1,102 +1,299 @@
-import socket
-import subprocess
-import platform
-from typing import Dict, Optional
+import asyncio
+import base64
+import hashlib
+import os
+import statistics
+import struct
+import time
+from typing import Dict, List, Optional
 
+from utils import codec
 
-def ping_ip_and_port(
-    ip: str, port: int, ping_timeout: float = 2.0, port_timeout: float = 2.0
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_MAX_PAYLOAD = 1 << 20  # a probe reply is tiny; don't buffer whatever a non-rosbridge port sends
+
+
+class ProbeError(Exception):
+    """A rosbridge probe step failed; the message says which and why."""
+
+
+def _client_frame(payload: bytes, opcode: int = 0x1) -> bytes:
+    """Build a single masked client-to-server WebSocket frame."""
+    mask = os.urandom(4)
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, 0x80 | length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, length)
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return header + mask + masked
+
+
+async def _ws_handshake(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, port: int
+):
+    """
+    Upgrade an open TCP connection to a WebSocket.
+
+    Raises:
+        ProbeError: If the server doesn't answer with a valid 101 Switching Protocols.
+    """
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        (
+            f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode()
+    )
+    await writer.drain()
+    try:
+        response = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+        raise ProbeError(f"no WebSocket handshake response ({type(e).__name__})") from None
+    lines = response.decode("latin-1").split("\r\n")
+    if len(lines[0].split()) < 2 or lines[0].split()[1] != "101":
+        raise ProbeError(f"not a WebSocket endpoint: {lines[0][:80]!r}")
+    expected = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "sec-websocket-accept" and value.strip() == expected:
+            return
+    raise ProbeError("WebSocket handshake with an invalid Sec-WebSocket-Accept")
+
+
+async def _ws_read_text(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> str:
+    """
+    Read the next text message, answering pings and joining fragments.
+
+    Raises:
+        ProbeError: If the server closes the connection or sends something unexpected.
+    """
+    fragments = []
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await reader.readexactly(8))
+        if length > _WS_MAX_PAYLOAD:
+            raise ProbeError(f"unexpected {length}-byte frame")
+        payload = await reader.readexactly(length)
+        if opcode == 0x8:
+            raise ProbeError("connection closed by server")
+        if opcode == 0x9:
+            writer.write(_client_frame(payload, opcode=0xA))
+            continue
+        if opcode in (0x1, 0x2, 0x0):
+            fragments.append(payload)
+            if first & 0x80:
+                return b"".join(fragments).decode("utf-8", errors="replace")
+
+
+async def _rosbridge_call(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    service: str = "/rosapi/get_time",
+    service_type: str = "rosapi/GetTime",
+) -> dict:
+    """
+    Call a rosapi service over an open WebSocket and return the matching service_response.
+
+    Raises:
+        ProbeError: If the reply isn't a rosbridge service_response.
+    """
+    request_id = f"probe_{os.urandom(4).hex()}"
+    message = {
+        "op": "call_service",
+        "service": service,
+        "type": service_type,
+        "args": {},
+        "id": request_id,
+    }
+    writer.write(_client_frame(codec.dumps(message)))
+    await writer.drain()
+    while True:
+        text = await _ws_read_text(reader, writer)
+        try:
+            reply = codec.loads(text)
+        except ValueError:
+            raise ProbeError("reply is not JSON, not a rosbridge server") from None
+        if isinstance(reply, dict) and reply.get("id") == request_id:
+            if reply.get("op") != "service_response":
+                raise ProbeError(f"unexpected reply op {reply.get('op')!r}")
+            return reply
+
+
+async def _close_quietly(writer: asyncio.StreamWriter):
+    try:
+        writer.write(_client_frame(b"\x03\xe8", opcode=0x8))
+        writer.close()
+        await asyncio.wait_for(writer.wait_closed(), 0.5)
+    except Exception:
+        pass
+
+
+async def probe_rosbridge(
+    ip: str,
+    port: int,
+    timeout: float = 2.0,
+    confirm: bool = True,
+    connect_timeout: Optional[float] = None,
 ) -> Dict:
     """
-    Ping an IP address and check if a specific port is open.
+    Check one address for a rosbridge server, timing each step in-process.
+
+    Opens a TCP connection, then (with ``confirm``) upgrades it to a WebSocket and calls
+    /rosapi/get_time on the same connection.
 
     Args:
-        ip (str): The IP address to ping (e.g., '192.168.1.100')
-        port (int): The port number to check (e.g., 9090)
-        ping_timeout (float): Timeout for ping in seconds. Default = 2.0.
-        port_timeout (float): Timeout for port check in seconds. Default = 2.0.
+        ip (str): The IP address or host name.
+        port (int): The port number.
+        timeout (float): Seconds allowed for each step.
+        confirm (bool): False to stop after the TCP connect.
+        connect_timeout (Optional[float]): Seconds allowed for the TCP connect, if not ``timeout``.
 
     Returns:
-        dict: Contains ping and port check results with detailed status information.
+        dict: {"ip", "port", "open", "refused", "rosbridge", "rosapi", "tcp_connect_ms",
+            "handshake_ms", "rosapi_ms", "error"}. Times are None for steps that didn't
+            complete; "refused" means the host answered but nothing listens on the port.
     """
     result = {
         "ip": ip,
         "port": port,
-        "ping": {"success": False, "error": None, "response_time_ms": None},
-        "port": {"open": False, "error": None},
-        "overall_status": "unknown",
+        "open": False,
+        "refused": False,
+        "rosbridge": False,
+        "rosapi": False,
+        "tcp_connect_ms": None,
+        "handshake_ms": None,
+        "rosapi_ms": None,
+        "error": None,
     }
-
-    # Step 1: Ping the IP address
+    connect_timeout = connect_timeout if connect_timeout is not None else timeout
+    start = time.perf_counter()
     try:
-        # Use platform-specific ping command
-        if platform.system().lower() == "windows":
-            ping_cmd = ["ping", "-n", "1", "-w", str(int(ping_timeout * 1000)), ip]
-        else:  # Linux, macOS, etc.
-            ping_cmd = ["ping", "-c", "1", "-W", str(int(ping_timeout)), ip]
-
-        ping_result = subprocess.run(
-            ping_cmd, capture_output=True, text=True, timeout=ping_timeout + 1.0
-        )
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), connect_timeout)
+    except asyncio.TimeoutError:
+        result["error"] = f"TCP connect timeout after {connect_timeout} seconds"
+        return result
+    except ConnectionRefusedError:
+        result["refused"] = True
+        result["error"] = f"TCP connect refused: nothing is listening on port {port}"
+        return result
+    except OSError as e:
+        result["error"] = f"TCP connect failed: {e.strerror or e}"
+        return result
+    result["open"] = True
+    result["tcp_connect_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    if not confirm:
+        writer.close()
+        return result
 
-        if ping_result.returncode == 0:
-            # Extract response time from ping output
-            output_lines = ping_result.stdout.split("\n")
-            for line in output_lines:
-                if "time=" in line or "time<" in line:
-                    # Extract time value (format varies by OS)
-                    if "time=" in line:
-                        time_part = line.split("time=")[1].split()[0]
-                        try:
-                            result["ping"]["response_time_ms"] = float(time_part)
-                        except ValueError:
-                            result["ping"]["response_time_ms"] = None
-                    break
-
-            result["ping"]["success"] = True
-        else:
-            result["ping"]["error"] = f"Ping failed with return code {ping_result.returncode}"
-
-    except subprocess.TimeoutExpired:
-        result["ping"]["error"] = f"Ping timeout after {ping_timeout} seconds"
-    except FileNotFoundError:
-        result["ping"]["error"] = "Ping command not found on this system"
-    except Exception as e:
-        result["ping"]["error"] = f"Ping error: {str(e)}"
-
-    # Step 2: Check if port is open
+    step = "WebSocket handshake"
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(port_timeout)
-
-        port_result = sock.connect_ex((ip, port))
-        sock.close()
-
-        if port_result == 0:
-            result["port"]["open"] = True
-        else:
-            result["port"]["error"] = (
-                f"Port {port} is closed or unreachable (error code: {port_result})"
-            )
-
-    except socket.timeout:
-        result["port"]["error"] = f"Port {port} connection timeout after {port_timeout} seconds"
-    except socket.gaierror as e:
-        result["port"]["error"] = f"DNS resolution error: {str(e)}"
-    except Exception as e:
-        result["port"]["error"] = f"Port check error: {str(e)}"
-
-    # Step 3: Determine overall status
-    ping_success = result["ping"]["success"]
-    port_open = result["port"]["open"]
-
-    if ping_success and port_open:
-        result["overall_status"] = "Fully_accessible. The robot is reachable and the port is open, indicating that we are likely able to connect to ROS"
-    elif ping_success and not port_open:
-        result["overall_status"] = "IP_reachable_port_closed. The robot is reachable but ROS_bridge is unreachable. Check if ROS_bridge is running as well as firewall settings."
-    elif not ping_success and port_open:
-        result["overall_status"] = "IP_unreachable_port_open. This is unusual."  # Unusual but possible
-    else:
-        result["overall_status"] = "IP_unreachable. Check if the IP address is correct, the robot is powered on & connected to the network. Also check network and firewall settings."
+        start = time.perf_counter()
+        await asyncio.wait_for(_ws_handshake(reader, writer, ip, port), timeout)
+        result["handshake_ms"] = round((time.perf_counter() - start) * 1000, 3)
 
+        step = "rosapi call"
+        start = time.perf_counter()
+        reply = await asyncio.wait_for(_rosbridge_call(reader, writer), timeout)
+        result["rosapi_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        result["rosbridge"] = True
+        result["rosapi"] = bool(reply.get("result", True))
+        if not result["rosapi"]:
+            result["error"] = "rosbridge is running but /rosapi/get_time failed (is rosapi up?)"
+    except asyncio.TimeoutError:
+        result["error"] = f"{step} timeout after {timeout} seconds"
+    except ProbeError as e:
+        result["error"] = f"{step} failed: {e}"
+    except (asyncio.IncompleteReadError, OSError) as e:
+        result["error"] = f"{step} failed: connection lost ({type(e).__name__})"
+    finally:
+        await _close_quietly(writer)
     return result
+
+
+def latency_summary(samples_ms: List[float]) -> Optional[Dict]:
+    """
+    Summarize latency samples: p50, p95, min, max and jitter.
+
+    Jitter is the mean absolute difference between consecutive samples (as in RFC 3550),
+    so a steady but slow link has low jitter. Returns None for no samples.
+    """
+    if not samples_ms:
+        return None
+    ordered = sorted(samples_ms)
+    jitter = (
+        statistics.fmean(abs(b - a) for a, b in zip(samples_ms, samples_ms[1:]))
+        if len(samples_ms) > 1
+        else 0.0
+    )
+    return {
+        "samples": len(samples_ms),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))], 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+        "jitter_ms": round(jitter, 3),
+    }
+
+
+def _overall_status(port: int, probes: List[Dict]) -> str:
+    if any(probe["rosapi"] for probe in probes):
+        return (
+            "Fully_accessible. rosbridge answered a rosapi call, so we are able to connect to ROS"
+        )
+    if any(probe["rosbridge"] for probe in probes):
+        return "Rosbridge_without_rosapi. rosbridge is running but /rosapi/get_time failed. Check that the rosapi node is running."
+    if any(probe["open"] for probe in probes):
+        return f"Port_open_not_rosbridge. Something listens on port {port} but did not behave like rosbridge. Check the port number."
+    if any(probe["refused"] for probe in probes):
+        return "IP_reachable_port_closed. The robot is reachable but ROS_bridge is unreachable. Check if ROS_bridge is running as well as firewall settings."
+    return "IP_unreachable. Check if the IP address is correct, the robot is powered on & connected to the network. Also check network and firewall settings."
+
+
+async def measure_latency(ip: str, port: int, samples: int = 5, timeout: float = 2.0) -> Dict:
+    """
+    Measure the latency of the path to a rosbridge server, step by step, in-process.
+
+    Runs ``samples`` probes one after another, each opening a TCP connection, upgrading it
+    to a WebSocket and making one /rosapi/get_time call, and summarizes each step
+    separately. Unlike ICMP ping this needs no external binary or raw-socket privilege,
+    and it measures the path the server actually uses.
+
+    Args:
+        ip (str): The IP address or host name (e.g., '192.168.1.100')
+        port (int): The rosbridge port (e.g., 9090)
+        samples (int): Number of probes.
+        timeout (float): Seconds allowed for each step of a probe.
+
+    Returns:
+        dict: {"ip", "port", "tcp_connect", "ws_handshake", "rosbridge_rtt", "failures",
+            "errors", "overall_status"}, where each of the three steps is a
+            latency_summary() (or None if it never succeeded).
+    """
+    probes = []
+    for _ in range(max(1, samples)):
+        probe = await probe_rosbridge(ip, port, timeout=timeout)
+        probes.append(probe)
+        if not probe["open"] and len(probes) == 1:
+            break  # nothing to time beyond the failed connect; retrying would just wait again
+
+    def step(key: str) -> Optional[Dict]:
+        return latency_summary([probe[key] for probe in probes if probe[key] is not None])
+
+    return {
+        "ip": ip,
+        "port": port,
+        "tcp_connect": step("tcp_connect_ms"),
+        "ws_handshake": step("handshake_ms"),
+        "rosbridge_rtt": step("rosapi_ms"),
+        "failures": sum(1 for probe in probes if not probe["rosapi"]),
+        "errors": sorted({probe["error"] for probe in probes if probe["error"]}),
+        "overall_status": _overall_status(port, probes),
+    }
@@ -0,0 +1,316 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.advertisement_registry import Advertisement, AdvertisementRegistry
+from utils.async_websocket_manager import AsyncWebSocketManager
+
+INTERPOLATIONS = ("step", "linear")
+
+
+def interpolate(a: Any, b: Any, alpha: float) -> Any:
+    """
+    Blend two messages field by field: numbers linearly, everything else from ``a``.
+
+    Integer fields stay integers (rounded). Fields missing from ``b`` and lists of
+    different lengths are taken from ``a`` unchanged.
+    """
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        value = a + (b - a) * alpha
+        return round(value) if isinstance(a, int) and isinstance(b, int) else value
+    if isinstance(a, dict) and isinstance(b, dict):
+        return {
+            key: interpolate(value, b[key], alpha) if key in b else value
+            for key, value in a.items()
+        }
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [interpolate(x, y, alpha) for x, y in zip(a, b)]
+    return a
+
+
+def parse_keyframes(keyframes: List[dict]) -> List[dict]:
+    """
+    Validate a keyframe list of ``{"t": seconds, "msg": {...}}`` and sort it by time.
+
+    Raises:
+        ValueError: If the list is empty or a keyframe is malformed.
+    """
+    if not keyframes:
+        raise ValueError("keyframes must not be empty")
+    parsed = []
+    for i, frame in enumerate(keyframes):
+        if not isinstance(frame, dict) or not isinstance(frame.get("msg"), dict):
+            raise ValueError(f"keyframes[{i}] must be a dict with a 'msg' dict")
+        t = frame.get("t", 0.0)
+        if isinstance(t, bool) or not isinstance(t, (int, float)) or t < 0:
+            raise ValueError(f"keyframes[{i}]['t'] must be a number ≥ 0")
+        parsed.append({"t": float(t), "msg": frame["msg"]})
+    return sorted(parsed, key=lambda frame: frame["t"])
+
+
+class PublisherSession:
+    """
+    Publishes a message on one topic at a fixed rate from a background task.
+
+    The message is either constant or follows a keyframe timeline, held ("step") or
+    blended ("linear") between keyframes. Sends are scheduled on absolute deadlines of the
+    monotonic clock; when the task falls more than a period behind, the skipped slots
+    are counted as missed deadlines instead of being sent in a burst.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        topic: str,
+        msg_type: str,
+        rate_hz: float,
+        keyframes: List[dict],
+        interpolation: str = "step",
+        loop: bool = False,
+        duration: Optional[float] = None,
+        stop_msg: Optional[dict] = None,
+    ):
+        self.session_id = session_id
+        self.topic = topic
+        self.msg_type = msg_type
+        self.rate_hz = rate_hz
+        self.keyframes = keyframes
+        self.interpolation = interpolation
+        self.loop = loop
+        self.duration = duration
+        self.stop_msg = stop_msg
+        self.advertisement: Optional[Advertisement] = None
+        self.publish_id: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stopped_reason: Optional[str] = None
+        self.errors: deque = deque(maxlen=10)
+        self.started_at = time.monotonic()
+        self.stopped_at: Optional[float] = None
+        self._timeline_start = self.started_at
+        self._rescheduled = True
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.published = 0
+        self.missed_deadlines = 0
+        self.max_jitter = 0.0
+        self.total_jitter = 0.0
+        self.stats_since = time.monotonic()
+
+    def update(
+        self,
+        rate_hz: Optional[float] = None,
+        keyframes: Optional[List[dict]] = None,
+        interpolation: Optional[str] = None,
+        loop: Optional[bool] = None,
+    ):
+        """Change the rate and/or message. A new timeline starts from its first keyframe."""
+        if interpolation is not None:
+            self.interpolation = interpolation
+        if loop is not None:
+            self.loop = loop
+        if keyframes is not None:
+            self.keyframes = keyframes
+            self._timeline_start = time.monotonic()
+        if rate_hz is not None and rate_hz != self.rate_hz:
+            self.rate_hz = rate_hz
+            self._rescheduled = True
+            # Achieved rate and jitter are measured against the current target
+            self._reset_stats()
+
+    def message_at(self, t: float) -> dict:
+        """The message to publish ``t`` seconds into the keyframe timeline."""
+        frames = self.keyframes
+        end = frames[-1]["t"]
+        if self.loop and end > 0:
+            t %= end
+        if t <= frames[0]["t"]:
+            return frames[0]["msg"]
+        if t >= end:
+            return frames[-1]["msg"]
+        for before, after in zip(frames, frames[1:]):
+            if t < after["t"]:
+                if self.interpolation == "linear" and after["t"] > before["t"]:
+                    alpha = (t - before["t"]) / (after["t"] - before["t"])
+                    return interpolate(before["msg"], after["msg"], alpha)
+                return before["msg"]
+        return frames[-1]["msg"]
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def info(self) -> dict:
+        end = self.stopped_at if self.stopped_at is not None else time.monotonic()
+        elapsed = end - self.stats_since
+        sends = self.published or 1
+        return {
+            "session_id": self.session_id,
+            "topic": self.topic,
+            "msg_type": self.msg_type,
+            "running": self.running,
+            "rate_hz": self.rate_hz,
+            "achieved_rate_hz": round(self.published / elapsed, 3) if elapsed > 0 else None,
+            "published": self.published,
+            "missed_deadlines": self.missed_deadlines,
+            "max_jitter_ms": round(self.max_jitter * 1000, 3),
+            "mean_jitter_ms": round(self.total_jitter / sends * 1000, 3),
+            "keyframes": len(self.keyframes),
+            "interpolation": self.interpolation,
+            "loop": self.loop,
+            "uptime_s": round(end - self.started_at, 3),
+            "stopped_reason": self.stopped_reason,
+            "errors": list(self.errors),
+        }
+
+
+class PublisherManager:
+    """
+    Starts, updates and stops background publisher sessions on the shared connection.
+
+    Sessions hold their topic's advertisement in the registry while running, so it is
+    shared with other publishers of the same topic and outlives the session until idle.
+    """
+
+    def __init__(self, ws_manager: AsyncWebSocketManager, advertisements: AdvertisementRegistry):
+        self.ws_manager = ws_manager
+        self.advertisements = advertisements
+        self.sessions: Dict[str, PublisherSession] = {}
+        self._ids = itertools.count(1)
+
+    async def start(
+        self,
+        topic: str,
+        msg_type: str,
+        rate_hz: float,
+        keyframes: List[dict],
+        interpolation: str = "step",
+        loop: bool = False,
+        duration: Optional[float] = None,
+        stop_msg: Optional[dict] = None,
+    ) -> Tuple[Optional[PublisherSession], Optional[str]]:
+        """
+        Advertise the topic (or reuse its advertisement) and start publishing in the background.
+
+        Returns:
+            (session, None) on success, or (None, error message).
+        """
+        session = PublisherSession(
+            f"pub-{next(self._ids)}",
+            topic,
+            msg_type,
+            rate_hz,
+            keyframes,
+            interpolation,
+            loop,
+            duration,
+            stop_msg,
+        )
+        adv, error = await self.advertisements.acquire(topic, msg_type)
+        if error:
+            return None, error
+        session.advertisement = adv
+        session.publish_id = self.ws_manager.next_id(f"publish_{topic}")
+
+        def on_status(frame: dict):
+            if "error" in frame:
+                session.errors.append(frame["error"])
+            elif frame.get("op") == "status" and frame.get("level") == "error":
+                session.errors.append(frame.get("msg", "Unknown error"))
+
+        # Every publish of the session reuses one id, so status frames need one route
+        self.ws_manager.register_request(session.publish_id, on_status)
+        self.sessions[session.session_id] = session
+        session.task = asyncio.ensure_future(self._run(session))
+        return session, None
+
+    async def stop(self, session_id: str, reason: str = "stopped") -> Optional[PublisherSession]:
+        """
+        Stop a session, publish its stop message if it has one, and release its advertisement.
+
+        Sessions whose duration has elapsed have already done this and are just removed.
+        """
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return None
+        if session.running:
+            session.task.cancel()
+            try:
+                await session.task
+            except asyncio.CancelledError:
+                pass
+        await self._finish(session, reason)
+        return session
+
+    async def stop_all(self, reason: str = "stopped"):
+        for session_id in list(self.sessions):
+            await self.stop(session_id, reason)
+
+    def list(self) -> List[dict]:
+        return [session.info() for session in self.sessions.values()]
+
+    async def _finish(self, session: PublisherSession, reason: str):
+        if session.stopped_reason is not None:
+            return
+        session.stopped_reason = reason
+        session.stopped_at = time.monotonic()
+        if session.stop_msg is not None:
+            await self._publish(session, session.stop_msg)
+        self.ws_manager.unregister_request(session.publish_id)
+        self.advertisements.release(session.advertisement)
+        session.errors.extend(session.advertisement.take_errors())
+
+    async def _publish(self, session: PublisherSession, msg: dict) -> bool:
+        send_error = await self.ws_manager.send(
+            {"op": "publish", "id": session.publish_id, "topic": session.topic, "msg": msg}
+        )
+        if send_error:
+            session.errors.append(send_error)
+            return False
+        return True
+
+    async def _run(self, session: PublisherSession):
+        try:
+            await self._publish_loop(session)
+        except Exception as e:
+            # Stop visibly rather than leave a session that looks healthy but sends nothing
+            reason = f"crashed: {e!r}"
+        else:
+            # Duration elapsed: the session stays listed with its final stats until stopped
+            reason = "duration elapsed"
+        await self._finish(session, reason)
+
+    async def _publish_loop(self, session: PublisherSession):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            period = 1.0 / session.rate_hz
+            if session._rescheduled:
+                session._rescheduled = False
+                deadline = loop.time()
+
+            now = loop.time()
+            if now - deadline >= period:
+                # Too late for one or more slots: skip them rather than sending a burst
+                skipped = int((now - deadline) // period)
+                session.missed_deadlines += skipped
+                deadline += skipped * period
+
+            running_for = time.monotonic() - session.started_at
+            if session.duration is not None and running_for >= session.duration:
+                return
+            msg = session.message_at(time.monotonic() - session._timeline_start)
+            if await self._publish(session, msg):
+                session.published += 1
+            jitter = loop.time() - deadline
+            session.max_jitter = max(session.max_jitter, jitter)
+            session.total_jitter += jitter
+
+            deadline += period
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
@@ -0,0 +1,559 @@
+"""
+Topic recordings: an append-only file of timestamped messages, and its reader.
+
+File layout (little-endian)::
+
+    b"RMCPREC\\x01"  u32 n  header JSON (n bytes: version, topics, compression, ...)
+    record*          u32 length  f64 time  u16 topic  u8 flags  payload (length bytes)
+    index            (f64 time, u64 offset) * count, one entry per INDEX_INTERVAL seconds
+    summary JSON     message counts, gaps, drops
+    trailer          u64 index offset  u32 count  u64 summary offset  u32 length  b"RMCPIDX\\x01"
+
+A payload is the message as JSON, zlib-compressed when flags has FLAG_ZLIB. Record
+times are the wall-clock arrival times and never decrease. The index, summary and
+trailer are written when the recording stops. A file without them (a recording still
+running, or cut short by a crash) is still readable: the reader rebuilds the index by
+skipping from record header to record header, and ignores a truncated last record.
+"""
+
+import asyncio
+import bisect
+import itertools
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils import codec
+from utils.logging_utils import get_logger
+from utils.subscription_manager import ManagedSubscription, SubscriptionManager
+
+logger = get_logger("recorder")
+
+MAGIC = b"RMCPREC\x01"
+TRAILER_MAGIC = b"RMCPIDX\x01"
+FORMAT_VERSION = 1
+FLAG_ZLIB = 1
+COMPRESSIONS = ("zlib", "none")
+INDEX_INTERVAL = 1.0  # seconds of recording between index entries
+EXTENSION = ".rec"
+
+_HEADER_LENGTH = struct.Struct("<I")
+_RECORD = struct.Struct("<IdHB")  # payload length, time, topic number, flags
+_INDEX_ENTRY = struct.Struct("<dQ")  # time, file offset of the record
+_TRAILER = struct.Struct("<QIQI8s")
+
+
+class RecordingFormatError(ValueError):
+    pass
+
+
+def recording_path(directory: str, name: str) -> str:
+    """
+    The file a recording name (with or without ".rec") refers to, inside ``directory``.
+
+    Raises:
+        ValueError: If the name contains anything but letters, digits, '-', '_' and '.'.
+    """
+    base = name[: -len(EXTENSION)] if name.endswith(EXTENSION) else name
+    if not base or base.startswith(".") or not all(c.isalnum() or c in "-_." for c in base):
+        raise ValueError("name may only contain letters, digits, '-', '_' and '.'")
+    return os.path.join(directory, base + EXTENSION)
+
+
+class RecordingWriter:
+    """
+    Appends messages to a recording file from a background thread.
+
+    ``append()`` only queues the message, so it is safe and cheap to call from the
+    connection's reader thread; encoding, compression and writes happen on the writer
+    thread. When the queue is full (the disk can't keep up) messages are dropped and
+    counted rather than blocking the reader.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        topics: Dict[str, str],
+        compression: str = "zlib",
+        compression_level: int = 1,
+        queue_size: int = 10000,
+        metadata: Optional[dict] = None,
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"compression must be one of {', '.join(COMPRESSIONS)}")
+        self.path = path
+        self.topics = list(topics)
+        self._topic_numbers = {topic: i for i, topic in enumerate(self.topics)}
+        self.compression = compression
+        self.compression_level = compression_level
+        self.started_at = time.time()
+        self.counts: Counter = Counter({topic: 0 for topic in topics})  # keys fixed
+        self.raw_bytes = 0  # JSON bytes before compression
+        self.bytes_written = 0
+        self.dropped = 0
+        self.gaps: List[dict] = []
+        self.error: Optional[str] = None
+        self.summary: Optional[dict] = None
+        self._index: List[Tuple[float, int]] = []
+        self._last_time = 0.0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        header = {
+            "version": FORMAT_VERSION,
+            "created": self.started_at,
+            "compression": compression,
+            "topics": [{"topic": topic, "type": topics[topic]} for topic in self.topics],
+            **(metadata or {}),
+        }
+        header_json = json.dumps(header).encode()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "xb")  # never overwrite a recording
+        self._file.write(MAGIC + _HEADER_LENGTH.pack(len(header_json)) + header_json)
+        self._offset = len(MAGIC) + _HEADER_LENGTH.size + len(header_json)
+        self.bytes_written = self._offset
+        self._thread = threading.Thread(
+            target=self._run, name=f"recorder-{os.path.basename(path)}", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, topic: str, msg: dict, t: Optional[float] = None):
+        """Queue a message for writing, stamped with ``t`` (default: now)."""
+        if self.summary is not None:
+            return
+        try:
+            self._queue.put_nowait((time.time() if t is None else t, topic, msg))
+        except queue.Full:
+            self.dropped += 1
+
+    def note_gap(self, since: float, until: float, reason: str):
+        """Record a connection outage (messages published during it are missing)."""
+        self.gaps.append({"since": since, "until": until, "reason": reason})
+
+    def close(self) -> dict:
+        """Write what is queued, then the index and summary, and close the file."""
+        if self.summary is not None:
+            return self.summary
+        self._queue.put(None)
+        self._thread.join()
+        self.summary = {
+            "messages": dict(self.counts),
+            "start": self._index[0][0] if self._index else None,
+            "end": self._last_time or None,
+            "raw_bytes": self.raw_bytes,
+            "dropped": self.dropped,
+            "gaps": self.gaps,
+            "error": self.error,
+        }
+        try:
+            index = b"".join(_INDEX_ENTRY.pack(t, offset) for t, offset in self._index)
+            summary = json.dumps(self.summary).encode()
+            index_offset = self._offset
+            summary_offset = index_offset + len(index)
+            self._file.write(index)
+            self._file.write(summary)
+            self._file.write(
+                _TRAILER.pack(
+                    index_offset, len(self._index), summary_offset, len(summary), TRAILER_MAGIC
+                )
+            )
+            self.bytes_written = summary_offset + len(summary) + _TRAILER.size
+        except OSError as e:
+            self.error = self.summary["error"] = f"Failed to write index: {e}"
+        finally:
+            self._file.close()
+        return self.summary
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item and self.error is None:
+                try:
+                    self._write(*item)
+                except (TypeError, ValueError) as e:
+                    self.dropped += 1  # a message that can't be encoded; keep recording
+                    logger.warning("Dropped a message of %s: %s", item[1], e)
+                except OSError as e:
+                    self.error = f"OSError: {e}"
+                    logger.error("Recording to %s failed: %s", self.path, e)
+            # Readers of a running recording see data at most about a second old
+            if time.monotonic() - last_flush >= 1.0 and self.error is None:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush()
+
+    def _flush(self):
+        try:
+            self._file.flush()
+        except OSError as e:
+            self.error = f"OSError: {e}"
+
+    def _write(self, t: float, topic: str, msg: Any):
+        payload = codec.dumps(msg)
+        self.raw_bytes += len(payload)
+        flags = 0
+        if self.compression == "zlib":
+            payload = zlib.compress(payload, self.compression_level)
+            flags |= FLAG_ZLIB
+        t = max(t, self._last_time)  # keep times sorted for seeking
+        if not self._index or t - self._index[-1][0] >= INDEX_INTERVAL:
+            self._index.append((t, self._offset))
+        self._file.write(_RECORD.pack(len(payload), t, self._topic_numbers[topic], flags) + payload)
+        self._offset += _RECORD.size + len(payload)
+        self.bytes_written = self._offset
+        self._last_time = t
+        self.counts[topic] += 1
+
+
+class RecordingReader:
+    """
+    Reads a recording through a read-only memory map.
+
+    Only the index is held in memory; seeking to a time is a binary search over it and
+    iterating decodes just the records in range on the requested topics (records of other
+    topics are skipped by their header, without decompressing them).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < len(MAGIC) + _HEADER_LENGTH.size:
+                raise RecordingFormatError(f"{path} is not a recording (too short)")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        try:
+            self._open(size)
+        except Exception:
+            self.close()
+            raise
+
+    def _open(self, size: int):
+        mm = self._map
+        if mm[: len(MAGIC)] != MAGIC:
+            raise RecordingFormatError(f"{self.path} is not a recording (bad magic)")
+        (header_length,) = _HEADER_LENGTH.unpack_from(mm, len(MAGIC))
+        self.data_start = len(MAGIC) + _HEADER_LENGTH.size + header_length
+        try:
+            self.header = json.loads(mm[len(MAGIC) + _HEADER_LENGTH.size : self.data_start])
+        except ValueError as e:
+            raise RecordingFormatError(f"{self.path} has a corrupt header: {e}") from None
+        self.topics: Dict[str, str] = {t["topic"]: t["type"] for t in self.header["topics"]}
+        self._topic_names = list(self.topics)
+
+        self.summary: Optional[dict] = None
+        if size >= self.data_start + _TRAILER.size and mm[size - 8 :] == TRAILER_MAGIC:
+            index_offset, count, summary_offset, summary_length, _ = _TRAILER.unpack_from(
+                mm, size - _TRAILER.size
+            )
+            self.data_end = index_offset
+            entries = [_INDEX_ENTRY.unpack_from(mm, index_offset + i * _INDEX_ENTRY.size)
+                       for i in range(count)]  # fmt: skip
+            self.summary = json.loads(mm[summary_offset : summary_offset + summary_length])
+            self.complete = True
+        else:
+            entries, self.data_end = self._scan(size)
+            self.complete = False
+        self._index_times = [t for t, _ in entries]
+        self._index_offsets = [offset for _, offset in entries]
+
+    def _scan(self, size: int) -> Tuple[List[Tuple[float, int]], int]:
+        """Rebuild the index of a file without a trailer; returns (entries, end of data)."""
+        entries: List[Tuple[float, int]] = []
+        self._scanned_counts: Counter = Counter()
+        self._scanned_end: Optional[float] = None
+        pos = self.data_start
+        while pos + _RECORD.size <= size:
+            length, t, topic, _ = _RECORD.unpack_from(self._map, pos)
+            if pos + _RECORD.size + length > size or topic >= len(self._topic_names):
+                break  # truncated (still being written, or cut short)
+            if not entries or t - entries[-1][0] >= INDEX_INTERVAL:
+                entries.append((t, pos))
+            self._scanned_counts[self._topic_names[topic]] += 1
+            self._scanned_end = t
+            pos += _RECORD.size + length
+        return entries, pos
+
+    @property
+    def start_time(self) -> Optional[float]:
+        """Time of the first record, or None if there are none."""
+        return self._index_times[0] if self._index_times else None
+
+    @property
+    def end_time(self) -> Optional[float]:
+        if self.summary is not None:
+            return self.summary["end"]
+        return self._scanned_end
+
+    def counts(self) -> Dict[str, int]:
+        """Messages per topic."""
+        if self.summary is not None:
+            return dict(self.summary["messages"])
+        return dict(self._scanned_counts)
+
+    def info(self) -> dict:
+        start, end = self.start_time, self.end_time
+        return {
+            "path": self.path,
+            "topics": self.topics,
+            "compression": self.header.get("compression"),
+            "robot": self.header.get("robot"),
+            "complete": self.complete,
+            "start": start,
+            "duration_s": round(end - start, 3) if start is not None and end else 0.0,
+            "messages": self.counts(),
+            "bytes": len(self._map),
+            "dropped": self.summary["dropped"] if self.summary else None,
+            "gaps": self.summary["gaps"] if self.summary else None,
+        }
+
+    def seek(self, t: Optional[float]) -> int:
+        """File offset of a record at or before the first one at time ``t``."""
+        if t is None:
+            return self.data_start
+        i = bisect.bisect_right(self._index_times, t) - 1
+        return self._index_offsets[i] if i >= 0 else self.data_start
+
+    def payloads(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        topics: Optional[Sequence[str]] = None,
+    ) -> Iterator[Tuple[float, str, bytes]]:
+        """
+        Yield (time, topic, JSON payload) for records with start ≤ time ≤ end (absolute
+        times; None is unbounded) on the given topics (None: all), in time order.
+
+        Raises:
+            RecordingFormatError: If a record in range can't be decompressed.
+        """
+        wanted = None
+        if topics is not None:
+            wanted = {self._topic_names.index(t) for t in topics if t in self.topics}
+        mm = self._map
+        pos = self.seek(start)
+        while pos + _RECORD.size <= self.data_end:
+            length, t, topic, flags = _RECORD.unpack_from(mm, pos)
+            body = pos + _RECORD.size
+            pos = body + length
+            if pos > self.data_end:
+                break
+            if end is not None and t > end:
+                break
+            if (start is not None and t < start) or (wanted is not None and topic not in wanted):
+                continue
+            payload = mm[body:pos]
+            if flags & FLAG_ZLIB:
+                try:
+                    payload = zlib.decompress(payload)
+                except zlib.error as e:
+                    raise RecordingFormatError(
+                        f"{self.path} has a corrupt record at offset {body - _RECORD.size}: {e}"
+                    ) from None
+            yield t, self._topic_names[topic], payload
+
+    def messages(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        topics: Optional[Sequence[str]] = None,
+    ) -> Iterator[Tuple[float, str, dict]]:
+        """
+        Like ``payloads()``, with each message decoded.
+
+        Raises:
+            RecordingFormatError: If a record in range can't be decompressed or decoded.
+        """
+        for t, topic, payload in self.payloads(start, end, topics):
+            try:
+                msg = codec.loads(payload)
+            except (ValueError, RecursionError) as e:
+                raise RecordingFormatError(f"{self.path} has a corrupt record: {e}") from None
+            yield t, topic, msg
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """A recording in progress: a writer fed by managed subscriptions' listeners."""
+
+    def __init__(self, recording_id: str, writer: RecordingWriter, duration: Optional[float]):
+        self.recording_id = recording_id
+        self.writer = writer
+        self.duration = duration
+        self.started_at = time.monotonic()
+        self.stopped_at: Optional[float] = None
+        self.stopped_reason: Optional[str] = None
+        self.subscriptions: Dict[str, ManagedSubscription] = {}
+        self.lost: Dict[str, str] = {}  # topic -> why its subscription stopped
+        self.listeners: Dict[str, Any] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.errors: deque = deque(maxlen=10)
+
+    def listener(self, topic: str):
+        def on_frame(frame: dict):
+            op = frame.get("op")
+            if op == "publish":
+                self.writer.append(topic, frame.get("msg", {}))
+            elif op == "gap" and frame.get("until") is not None:
+                self.writer.note_gap(frame["since"], frame["until"], frame.get("reason", ""))
+            elif op == "status" and frame.get("level") == "error":
+                self.errors.append(f"{topic}: {frame.get('msg', 'Unknown error')}")
+            elif "error" in frame:
+                self.lost[topic] = frame["error"]
+
+        return on_frame
+
+    @property
+    def running(self) -> bool:
+        return self.stopped_reason is None
+
+    def info(self) -> dict:
+        writer = self.writer
+        end = self.stopped_at if self.stopped_at is not None else time.monotonic()
+        return {
+            "recording_id": self.recording_id,
+            "path": writer.path,
+            "running": self.running,
+            "topics": {topic: sub.msg_type for topic, sub in self.subscriptions.items()},
+            "compression": writer.compression,
+            "messages": dict(writer.counts),
+            "bytes": writer.bytes_written,
+            "compression_ratio": (
+                round(writer.raw_bytes / (writer.bytes_written or 1), 2)
+                if writer.compression != "none"
+                else None
+            ),
+            "dropped": writer.dropped,
+            "gaps": len(writer.gaps),
+            "lost_topics": dict(self.lost),
+            "elapsed_s": round(end - self.started_at, 3),
+            "duration": self.duration,
+            "stopped_reason": self.stopped_reason,
+            "errors": list(self.errors) + ([writer.error] if writer.error else []),
+        }
+
+
+class RecordingManager:
+    """
+    Starts and stops recordings of topics on one robot.
+
+    Each recorded topic is read from its managed background subscription (started if
+    needed), which isn't reaped while the recording listens to it. If the subscription is
+    dropped or replaced anyway, the topic is reported in the recording's ``lost_topics``.
+    """
+
+    def __init__(self, subscriptions: SubscriptionManager, directory: str, prefix: str = ""):
+        self.subscriptions = subscriptions
+        self.directory = directory
+        self.prefix = prefix
+        self.recordings: Dict[str, Recording] = {}
+        self._ids = itertools.count(1)
+
+    def path_for(self, name: str) -> str:
+        """The file a recording name refers to, inside the recording directory."""
+        return recording_path(self.directory, name)
+
+    async def start(
+        self,
+        topics: Dict[str, str],
+        name: Optional[str] = None,
+        compression: str = "zlib",
+        duration: Optional[float] = None,
+        metadata: Optional[dict] = None,
+    ) -> Tuple[Optional[Recording], Optional[str]]:
+        """
+        Subscribe to ``topics`` ({topic: msg_type}) and write their messages to a new file.
+
+        Returns:
+            (recording, None) on success, or (None, error message).
+        """
+        number = next(self._ids)
+        if name is None:
+            name = f"{self.prefix}{time.strftime('%Y%m%d-%H%M%S')}-{number}"
+        try:
+            path = self.path_for(name)
+            writer = RecordingWriter(path, topics, compression, metadata=metadata)
+        except FileExistsError:
+            return None, f"Recording {name!r} already exists"
+        except (OSError, ValueError) as e:
+            return None, str(e)
+
+        recording = Recording(f"rec-{number}", writer, duration)
+        for topic, msg_type in topics.items():
+            sub, error = await self.subscriptions.ensure(topic, msg_type)
+            if error:
+                await self._finish(recording, f"failed to subscribe to {topic}")
+                os.remove(path)
+                return None, f"Failed to subscribe to {topic}: {error}"
+            listener = recording.listener(topic)
+            sub.add_listener(listener)
+            recording.subscriptions[topic] = sub
+            recording.listeners[topic] = listener
+
+        self.recordings[recording.recording_id] = recording
+        if duration is not None:
+            recording.task = asyncio.ensure_future(self._stop_after(recording, duration))
+        logger.info("Recording %s to %s", ", ".join(topics), path)
+        return recording, None
+
+    async def stop(self, recording_id: str, reason: str = "stopped") -> Optional[Recording]:
+        """Stop a recording and finish its file. Finished recordings are just removed."""
+        recording = self.recordings.pop(recording_id, None)
+        if recording is None:
+            return None
+        if recording.task is not None and not recording.task.done():
+            recording.task.cancel()
+        await self._finish(recording, reason)
+        return recording
+
+    async def stop_all(self, reason: str = "stopped"):
+        for recording_id in list(self.recordings):
+            await self.stop(recording_id, reason)
+
+    def list(self) -> List[dict]:
+        return [recording.info() for recording in self.recordings.values()]
+
+    async def _stop_after(self, recording: Recording, duration: float):
+        await asyncio.sleep(duration)
+        await self._finish(recording, "duration elapsed")
+
+    async def _finish(self, recording: Recording, reason: str):
+        if recording.stopped_reason is not None:
+            return
+        recording.stopped_reason = reason
+        recording.stopped_at = time.monotonic()
+        for topic, sub in recording.subscriptions.items():
+            sub.remove_listener(recording.listeners[topic])
+        summary = await asyncio.to_thread(recording.writer.close)
+        logger.info(
+            "Recording %s stopped (%s): %d message(s)",
+            recording.writer.path,
+            reason,
+            sum(summary["messages"].values()),
+        )
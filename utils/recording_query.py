@@ -0,0 +1,409 @@
+"""
+Columnar queries over a recording (see utils.recorder).
+
+Fields are named ``<topic>:<path>``, e.g. ``/odom:twist.twist.linear.x``. An array field
+is reduced to one number per message with ``min()``, ``max()``, ``mean()``, ``sum()`` or
+``len()``, e.g. ``/scan:min(ranges)``. Only records of the named topics inside the time
+range are decoded, and of each message only the named values are kept: one float64
+column per field plus one time column per topic. Memory grows with the samples and fields
+asked for, not with the size of the messages or of the recording.
+
+Times are seconds since the recording's first message. Missing and non-finite values are
+NaN in the columns and are left out of every statistic.
+"""
+
+import math
+import re
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.message_filter import FieldPathError, Step, get_field, parse_path
+from utils.recorder import RecordingReader
+
+REDUCTIONS = ("min", "max", "mean", "sum", "len")
+STATS = ("count", "mean", "std", "min", "max", "sum", "median", "first", "last", "t_min", "t_max")
+WINDOW_STATS = ("count", "mean", "std", "min", "max", "sum", "first", "last")
+DEFAULT_STATS = ("count", "mean", "std", "min", "max")
+MAX_ROWS = 100_000  # resampled points or windows in one query
+MAX_EPISODE_STARTS = 20  # start times listed per threshold side
+
+_REDUCED = re.compile(r"([a-z]+)\((.*)\)")
+_PERCENTILE = re.compile(r"p(\d{1,2}(?:\.\d+)?|100)")
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Field:
+    __slots__ = ("name", "topic", "steps", "reduction")
+
+    def __init__(self, name: str, topic: str, steps: Tuple[Step, ...], reduction: Optional[str]):
+        self.name = name
+        self.topic = topic
+        self.steps = steps
+        self.reduction = reduction
+
+
+def parse_field(name: str) -> Field:
+    """
+    Parse ``<topic>:<path>`` or ``<topic>:<reduction>(<path>)``.
+
+    Raises:
+        QueryError: If the field is malformed.
+    """
+    topic, sep, expression = name.partition(":")
+    if not sep or not topic.startswith("/"):
+        raise QueryError(
+            f"Field {name!r} must be '<topic>:<path>', e.g. '/odom:twist.twist.linear.x'"
+        )
+    reduction = None
+    match = _REDUCED.fullmatch(expression)
+    if match:
+        reduction, expression = match.groups()
+        if reduction not in REDUCTIONS:
+            raise QueryError(
+                f"Unknown reduction {reduction!r} in {name!r}; use one of {', '.join(REDUCTIONS)}"
+            )
+    try:
+        steps = parse_path(expression)
+    except FieldPathError as e:
+        raise QueryError(f"{name}: {e}") from None
+    return Field(name, topic, steps, reduction)
+
+
+def check_stats(stats: Sequence[str], allowed: Sequence[str] = STATS) -> None:
+    """
+    Raises:
+        QueryError: If a statistic is neither in ``allowed`` nor a percentile ("p95")
+            where percentiles are allowed.
+    """
+    for stat in stats:
+        if stat in allowed or (allowed is STATS and _PERCENTILE.fullmatch(stat)):
+            continue
+        extra = ", p<N> (percentile)" if allowed is STATS else ""
+        raise QueryError(f"Unknown statistic {stat!r}; use {', '.join(allowed)}{extra}")
+
+
+def _reduce(field: Field, value) -> float:
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        raise QueryError(f"{field.name}: {field.reduction}() needs an array field")
+    if field.reduction == "len":
+        return len(value)
+    try:
+        values = np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        try:  # JSON null stands for NaN in float arrays
+            values = np.asarray([math.nan if v is None else v for v in value], dtype=float)
+        except (TypeError, ValueError):
+            raise QueryError(f"{field.name}: not a numeric array") from None
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return math.nan
+    if field.reduction == "min":
+        return values.min()
+    if field.reduction == "max":
+        return values.max()
+    if field.reduction == "mean":
+        return values.mean()
+    return values.sum()
+
+
+def _value(field: Field, msg) -> float:
+    try:
+        value = get_field(msg, field.steps)
+    except (KeyError, IndexError, TypeError):
+        return math.nan
+    if field.reduction is not None:
+        return _reduce(field, value)
+    if isinstance(value, (bool, int, float)):
+        return value
+    if value is None:
+        return math.nan
+    raise QueryError(
+        f"{field.name} is not a number ({type(value).__name__}); reduce arrays with "
+        f"{', '.join(r + '()' for r in REDUCTIONS)}"
+    )
+
+
+def load_columns(
+    reader: RecordingReader,
+    fields: Sequence[Field],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Read the fields' values between ``start`` and ``end`` (seconds since the first message).
+
+    Returns:
+        ({topic: times}, {field name: values}); a field's values line up with its topic's
+        times.
+
+    Raises:
+        QueryError: If a topic isn't recorded or a value isn't numeric.
+        RecordingFormatError: If a record in range is corrupt.
+    """
+    by_topic: Dict[str, List[Field]] = {}
+    for field in fields:
+        if field.topic not in reader.topics:
+            raise QueryError(
+                f"{field.topic} is not in this recording (topics: {', '.join(reader.topics)})"
+            )
+        by_topic.setdefault(field.topic, []).append(field)
+
+    times = {topic: array("d") for topic in by_topic}
+    values = {field.name: array("d") for field in fields}
+    origin = reader.start_time
+    if origin is not None:
+        records = reader.messages(
+            origin + start if start is not None else None,
+            origin + end if end is not None else None,
+            list(by_topic),
+        )
+        for t, topic, msg in records:
+            times[topic].append(t - origin)
+            for field in by_topic[topic]:
+                values[field.name].append(_value(field, msg))
+    return (
+        {topic: np.frombuffer(column, dtype=float) for topic, column in times.items()},
+        {name: np.frombuffer(column, dtype=float) for name, column in values.items()},
+    )
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def summarize(t: np.ndarray, v: np.ndarray, stats: Sequence[str]) -> dict:
+    """The statistics named in ``stats`` over the finite values of one column."""
+    finite = np.isfinite(v)
+    t, v = t[finite], v[finite]
+    summary: dict = {}
+    for stat in stats:
+        if stat == "count":
+            summary[stat] = int(v.size)
+        elif not v.size:
+            summary[stat] = None
+        elif stat == "mean":
+            summary[stat] = _number(v.mean())
+        elif stat == "std":
+            summary[stat] = _number(v.std())
+        elif stat == "min":
+            summary[stat] = _number(v.min())
+        elif stat == "max":
+            summary[stat] = _number(v.max())
+        elif stat == "sum":
+            summary[stat] = _number(v.sum())
+        elif stat == "median":
+            summary[stat] = _number(np.median(v))
+        elif stat == "first":
+            summary[stat] = _number(v[0])
+        elif stat == "last":
+            summary[stat] = _number(v[-1])
+        elif stat == "t_min":
+            summary[stat] = round(float(t[np.argmin(v)]), 6)
+        elif stat == "t_max":
+            summary[stat] = round(float(t[np.argmax(v)]), 6)
+        else:  # p<N>
+            summary[stat] = _number(np.percentile(v, float(stat[1:])))
+    return summary
+
+
+def threshold_episodes(t: np.ndarray, v: np.ndarray, threshold: float) -> dict:
+    """
+    Runs of consecutive samples below ``threshold`` and at or above it.
+
+    For each side: "episodes" (runs, including one already under way at the first sample),
+    "samples", "time_s" (each sample lasts until the next one), "longest_s" and the
+    "starts" of the first MAX_EPISODE_STARTS runs.
+    """
+    finite = np.isfinite(v)
+    t, v = t[finite], v[finite]
+    held = np.diff(t, append=t[-1:]) if t.size else t
+    below = v < threshold
+    result = {}
+    for side, inside in (("below", below), ("above", ~below)):
+        previous = np.concatenate(([False], inside[:-1]))
+        following = np.concatenate((inside[1:], [False]))
+        starts = np.flatnonzero(inside & ~previous)
+        ends = np.flatnonzero(inside & ~following)  # last sample of each run
+        # A run lasts until the sample that ends it (or the last sample)
+        durations = t[np.minimum(ends + 1, t.size - 1)] - t[starts] if starts.size else starts
+        result[side] = {
+            "episodes": int(starts.size),
+            "samples": int(inside.sum()),
+            "time_s": round(float(held[inside].sum()), 6),
+            "longest_s": round(float(durations.max()), 6) if starts.size else 0.0,
+            "starts": [round(float(s), 6) for s in t[starts[:MAX_EPISODE_STARTS]]],
+        }
+    return result
+
+
+def _row_count(start: float, end: float, step: float) -> int:
+    count = int(math.floor((end - start) / step + 1e-9)) + 1
+    if count > MAX_ROWS:
+        raise QueryError(
+            f"{count} rows from {start:g} s to {end:g} s; the limit is {MAX_ROWS}: narrow the "
+            "time range or use a coarser rate or window"
+        )
+    return count
+
+
+def resample(
+    t: Dict[str, np.ndarray],
+    v: Dict[str, np.ndarray],
+    fields: Sequence[Field],
+    start: float,
+    end: float,
+    rate_hz: float,
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Linearly interpolate every field onto one grid of ``rate_hz`` points per second.
+
+    Grid points before a field's first or after its last finite sample are NaN.
+    """
+    grid = start + np.arange(_row_count(start, end, 1.0 / rate_hz)) / rate_hz
+    columns = []
+    for field in fields:
+        times, values = t[field.topic], v[field.name]
+        finite = np.isfinite(values)
+        if finite.any():
+            column = np.interp(grid, times[finite], values[finite], left=math.nan, right=math.nan)
+        else:
+            column = np.full(grid.size, math.nan)
+        columns.append(column)
+    return grid, columns
+
+
+def windows(
+    t: Dict[str, np.ndarray],
+    v: Dict[str, np.ndarray],
+    fields: Sequence[Field],
+    start: float,
+    end: float,
+    width: float,
+    stats: Sequence[str],
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Statistics of every field over consecutive windows of ``width`` seconds from ``start``.
+
+    Returns the windows' start times and one column per (field, stat), fields outer.
+    Windows without a finite sample have count 0 and NaN for everything else.
+    """
+    count = _row_count(start, end, width)
+    edges = start + width * np.arange(count + 1)
+    columns = []
+    for field in fields:
+        times, values = t[field.topic], v[field.name]
+        finite = np.isfinite(values)
+        times, values = times[finite], values[finite]
+        # Times are sorted, so each window's samples are the slice bounds[i]:bounds[i + 1]
+        bounds = np.searchsorted(times, edges, side="left")
+        bounds[-1] = times.size
+        lo, hi = bounds[:-1], bounds[1:]
+        n = hi - lo
+        filled = n > 0
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        total = sums[hi] - sums[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / n
+        computed = {"count": n, "sum": np.where(filled, total, math.nan), "mean": mean}
+        if "std" in stats:
+            window_of = np.repeat(np.arange(count), n)
+            squares = np.bincount(window_of, (values - mean[window_of]) ** 2, minlength=count)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                computed["std"] = np.sqrt(squares / n)
+        for stat, reduce in (("min", np.minimum), ("max", np.maximum)):
+            if stat in stats:
+                column = np.full(count, math.nan)
+                if filled.any():
+                    column[filled] = reduce.reduceat(values, lo[filled])
+                computed[stat] = column
+        last = np.maximum(hi - 1, 0)
+        if values.size:
+            computed["first"] = np.where(filled, values[np.minimum(lo, values.size - 1)], math.nan)
+            computed["last"] = np.where(filled, values[last], math.nan)
+        else:
+            computed["first"] = computed["last"] = np.full(count, math.nan)
+        columns.extend(computed[stat] for stat in stats)
+    return edges[:-1], columns
+
+
+def _rows(columns: Sequence[np.ndarray]) -> list:
+    """Row-major lists with NaN/inf as None."""
+    table = np.column_stack(columns)
+    return np.where(np.isfinite(table), table, None).tolist()
+
+
+def query(
+    path: str,
+    fields: Sequence[str],
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    stats: Optional[Sequence[str]] = None,
+    threshold: Optional[float] = None,
+    resample_hz: Optional[float] = None,
+    window: Optional[float] = None,
+) -> dict:
+    """
+    Load ``fields`` from the recording at ``path`` and compute what was asked for.
+
+    Every field gets its sample count and ``stats`` over the range, plus "below"/"above"
+    threshold episodes when ``threshold`` is given. With ``resample_hz`` or ``window`` the
+    result also has "columns" and "rows": the fields interpolated onto a uniform grid, or
+    the window statistics ("<field>.<stat>") of each window, keyed by its start "t".
+
+    Raises:
+        QueryError: If the query is invalid.
+        RecordingFormatError: If the file isn't a recording, or a record in range is corrupt.
+        OSError: If it can't be read.
+    """
+    if not fields:
+        raise QueryError("Give at least one field, e.g. '/odom:twist.twist.linear.x'")
+    if len(set(fields)) != len(fields):
+        raise QueryError("fields must be distinct")
+    parsed = [parse_field(name) for name in fields]
+    if start is not None and end is not None and end < start:
+        raise QueryError("end must be ≥ start")
+    if resample_hz is not None and window is not None:
+        raise QueryError("Give either resample_hz or window, not both")
+    if resample_hz is not None and resample_hz <= 0:
+        raise QueryError("resample_hz must be > 0")
+    if window is not None and window <= 0:
+        raise QueryError("window must be > 0")
+    if stats is None:
+        stats = DEFAULT_STATS
+    check_stats(stats, WINDOW_STATS if window is not None else STATS)
+
+    with RecordingReader(path) as reader:
+        t, v = load_columns(reader, parsed, start, end)
+        complete = reader.complete
+        duration = reader.end_time - reader.start_time if reader.start_time is not None else 0.0
+
+    first = max(start, 0.0) if start is not None else 0.0
+    last = max(min(end, duration) if end is not None else duration, first)
+    result = {
+        "complete": complete,
+        "start": round(first, 6),
+        "end": round(last, 6),
+        "messages": {topic: int(times.size) for topic, times in t.items()},
+        "fields": {},
+    }
+    for field in parsed:
+        entry = {"topic": field.topic, **summarize(t[field.topic], v[field.name], stats)}
+        if threshold is not None:
+            entry.update(threshold_episodes(t[field.topic], v[field.name], threshold))
+        result["fields"][field.name] = entry
+
+    if resample_hz is not None:
+        grid, columns = resample(t, v, parsed, first, last, resample_hz)
+        result["columns"] = ["t"] + list(fields)
+        result["rows"] = _rows([np.round(grid, 6)] + columns)
+    elif window is not None:
+        grid, columns = windows(t, v, parsed, first, last, window, stats)
+        result["columns"] = ["t"] + [f"{name}.{stat}" for name in fields for stat in stats]
+        result["rows"] = _rows([np.round(grid, 6)] + columns)
+    return result
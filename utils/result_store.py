@@ -0,0 +1,174 @@
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils import codec
+
+
+class _StoredResult:
+    __slots__ = ("source", "columns", "mapped", "sizes", "nbytes", "max_items", "max_bytes")
+
+    def __init__(
+        self,
+        source: str,
+        columns: Dict[str, list],
+        mapped: Sequence[str],
+        sizes: List[int],
+        max_items: Optional[int],
+        max_bytes: Optional[int],
+    ):
+        self.source = source
+        self.columns = columns  # key -> items, all the same length
+        self.mapped = mapped  # keys whose items are (name, value) pairs of a dict
+        self.sizes = sizes  # encoded bytes of each item (all columns)
+        self.nbytes = sum(sizes)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+
+def _page_end(
+    sizes: List[int], offset: int, max_items: Optional[int], max_bytes: Optional[int]
+) -> int:
+    """End of the page starting at ``offset``: at least one item, then within both limits."""
+    end = len(sizes) if max_items is None else min(len(sizes), offset + max(max_items, 1))
+    if max_bytes is None:
+        return end
+    used = sizes[offset] if offset < len(sizes) else 0
+    stop = offset + 1
+    while stop < end and used + sizes[stop] <= max_bytes:
+        used += sizes[stop]
+        stop += 1
+    return min(stop, end)
+
+
+class ResultStore:
+    """
+    Keeps the rest of large tool results server-side and hands them out a page at a time.
+
+    A result's collection (one list, a dict, or several parallel lists such as topics and
+    types) is cut into pages of at most ``max_items`` items and ``max_bytes`` encoded bytes.
+    The first page is returned in place with a cursor; ``fetch`` serves the pages after it.
+    Stored results are evicted least recently used first once there are more than
+    ``max_results`` of them or they hold more than ``max_memory`` bytes.
+    """
+
+    def __init__(self, max_results: int = 32, max_memory: int = 64 * 1024 * 1024):
+        self.max_results = max_results
+        self.max_memory = max_memory
+        self._results: "OrderedDict[str, _StoredResult]" = OrderedDict()
+        self._memory = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def paginate(
+        self,
+        source: str,
+        result: dict,
+        keys: Sequence[str],
+        max_items: Optional[int],
+        max_bytes: Optional[int],
+    ) -> dict:
+        """
+        Cut ``result[key]`` for each of ``keys`` down to its first page.
+
+        A result that fits in one page is returned unchanged. Otherwise the first page
+        replaces the collections and a "page" entry is added with the page's "offset",
+        "items", the "total_items" and the "next_cursor" (None on the last page).
+
+        Raises:
+            ValueError: If a limit is < 1 or the collections' lengths differ.
+        """
+        for limit in (max_items, max_bytes):
+            if limit is not None and (not isinstance(limit, int) or limit < 1):
+                raise ValueError("max_items and max_bytes must be integers ≥ 1")
+        columns: Dict[str, list] = {}
+        mapped = []
+        for key in keys:
+            items = result.get(key)
+            if isinstance(items, dict):
+                items = list(items.items())
+                mapped.append(key)
+            columns[key] = items if items is not None else []
+        total = len(next(iter(columns.values()), []))
+        if any(len(items) != total for items in columns.values()):
+            raise ValueError(f"{', '.join(keys)} must have the same length to be paginated")
+        if total == 0 or (max_bytes is None and (max_items is None or total <= max_items)):
+            return result
+
+        sizes = [sum(len(codec.dumps(columns[key][i])) for key in keys) for i in range(total)]
+        end = _page_end(sizes, 0, max_items, max_bytes)
+        if end == total:
+            return result
+
+        stored = _StoredResult(source, columns, mapped, sizes, max_items, max_bytes)
+        result_id = secrets.token_urlsafe(8)
+        with self.lock:
+            self._results[result_id] = stored
+            self._memory += stored.nbytes
+            self._evict(keep=result_id)
+        return {**result, **self._page(result_id, stored, 0, end)}
+
+    def fetch(
+        self, cursor: str, max_items: Optional[int] = None, max_bytes: Optional[int] = None
+    ) -> Tuple[Optional[dict], Optional[str]]:
+        """
+        Return the page a cursor points at. Limits not given are those of the first page.
+
+        Returns:
+            (page, None) on success, or (None, error message).
+        """
+        result_id, _, offset_text = cursor.rpartition(":")
+        with self.lock:
+            stored = self._results.get(result_id)
+            if stored is not None:
+                self._results.move_to_end(result_id)
+        if stored is None or not offset_text.isdigit() or int(offset_text) >= len(stored):
+            return None, f"Unknown or expired cursor {cursor!r}; call the tool again"
+        for limit in (max_items, max_bytes):
+            if limit is not None and (not isinstance(limit, int) or limit < 1):
+                return None, "max_items and max_bytes must be integers ≥ 1"
+
+        offset = int(offset_text)
+        end = _page_end(
+            stored.sizes,
+            offset,
+            max_items if max_items is not None else stored.max_items,
+            max_bytes if max_bytes is not None else stored.max_bytes,
+        )
+        return {"source": stored.source, **self._page(result_id, stored, offset, end)}, None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "results": len(self._results),
+                "max_results": self.max_results,
+                "memory_bytes": self._memory,
+                "max_memory_bytes": self.max_memory,
+                "evictions": self.evictions,
+            }
+
+    def _page(self, result_id: str, stored: _StoredResult, offset: int, end: int) -> dict:
+        page: dict = {}
+        for key, items in stored.columns.items():
+            page[key] = dict(items[offset:end]) if key in stored.mapped else items[offset:end]
+        page["page"] = {
+            "offset": offset,
+            "items": end - offset,
+            "total_items": len(stored),
+            "next_cursor": f"{result_id}:{end}" if end < len(stored) else None,
+        }
+        return page
+
+    def _evict(self, keep: str):
+        while len(self._results) > 1 and (
+            len(self._results) > self.max_results or self._memory > self.max_memory
+        ):
+            result_id = next(iter(self._results))
+            if result_id == keep:
+                break
+            self._memory -= self._results.pop(result_id).nbytes
+            self.evictions += 1
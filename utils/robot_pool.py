@@ -0,0 +1,172 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from utils.advertisement_registry import AdvertisementRegistry
+from utils.async_websocket_manager import AsyncWebSocketManager
+from utils.graph_cache import GraphCache
+from utils.publisher_sessions import PublisherManager
+from utils.recorder import RecordingManager
+from utils.schema_cache import SchemaCache
+from utils.subscription_manager import SubscriptionManager
+
+# robot name that runs a tool call against every robot in the pool
+ALL_ROBOTS = "all"
+
+
+class RobotConnection:
+    """
+    One rosbridge target and everything kept for it: the connection, the schema and graph
+    caches, background subscriptions, advertisements, publisher sessions and recordings.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ip: str,
+        port: int,
+        default_timeout: float = 5.0,
+        schema_cache_size: int = 1024,
+        schema_cache_file: Optional[str] = None,
+        graph_cache_ttl: float = 5.0,
+        subscription_buffer_size: int = 100,
+        subscription_expiry: float = 60.0,
+        advertisement_idle_timeout: float = 30.0,
+        reconnect_initial_delay: float = 0.1,
+        reconnect_max_delay: float = 5.0,
+        reconnect_timeout: Optional[float] = 60.0,
+        recording_dir: str = "recordings",
+    ):
+        self.name = name
+        self.ws_manager = AsyncWebSocketManager(
+            ip,
+            port,
+            default_timeout=default_timeout,
+            reconnect_initial_delay=reconnect_initial_delay,
+            reconnect_max_delay=reconnect_max_delay,
+            reconnect_timeout=reconnect_timeout,
+        )
+        self.schema_cache = SchemaCache(schema_cache_size, schema_cache_file, target=f"{ip}:{port}")
+        self.graph_cache = GraphCache(self.ws_manager, ttl=graph_cache_ttl)
+        self.subscriptions = SubscriptionManager(
+            self.ws_manager, buffer_size=subscription_buffer_size, expiry=subscription_expiry
+        )
+        self.advertisements = AdvertisementRegistry(
+            self.ws_manager, idle_timeout=advertisement_idle_timeout
+        )
+        self.publishers = PublisherManager(self.ws_manager, self.advertisements)
+        self.recordings = RecordingManager(self.subscriptions, recording_dir, prefix=f"{name}-")
+
+    async def retarget(self, ip: str, port: int):
+        """Point this robot at another rosbridge, dropping everything kept for the old one."""
+        if (ip, port) != (self.ws_manager.ip, self.ws_manager.port):
+            self.graph_cache.invalidate()
+            await self.release()
+        self.ws_manager.set_ip(ip, port)
+        self.schema_cache.set_target(f"{ip}:{port}")
+
+    async def release(self, reason: str = "robot changed"):
+        """Stop recordings and publishers, unadvertise and unsubscribe everything on this robot."""
+        await self.recordings.stop_all(reason)
+        await self.publishers.stop_all(reason)
+        await self.advertisements.unadvertise_all()
+        await self.subscriptions.drop_all()
+
+    def info(self) -> dict:
+        return {
+            "ip": self.ws_manager.ip,
+            "port": self.ws_manager.port,
+            "connected": self.ws_manager.connected,
+            "reconnecting": self.ws_manager.reconnecting,
+            "reconnects": self.ws_manager.reconnects,
+            "subscriptions": len(self.subscriptions.subscriptions),
+            "advertisements": len(self.advertisements.advertisements),
+            "publishers": len(self.publishers.sessions),
+            "recordings": len(self.recordings.recordings),
+        }
+
+
+class RobotPool:
+    """
+    Named RobotConnections. The default robot always exists; others are added by name.
+
+    ``settings`` are passed on to every RobotConnection. A schema cache file, if set, is
+    shared by name: robots other than the default get ``<file>.<name><ext>``.
+    """
+
+    def __init__(
+        self, default_ip: str, default_port: int, default_name: str = "default", **settings
+    ):
+        self.default_name = default_name
+        self.settings = settings
+        self.robots: Dict[str, RobotConnection] = {}
+        self.default = self.add(default_name, default_ip, default_port)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.robots
+
+    def names(self) -> List[str]:
+        return list(self.robots)
+
+    def get(self, name: Optional[str] = None) -> RobotConnection:
+        """
+        Return the named robot, or the default robot for None.
+
+        Raises:
+            KeyError: If there is no robot with that name.
+        """
+        if name is None:
+            return self.default
+        try:
+            return self.robots[name]
+        except KeyError:
+            raise KeyError(f"Unknown robot {name!r}; known robots: {self.names()}") from None
+
+    def add(self, name: str, ip: str, port: int) -> RobotConnection:
+        """
+        Add a robot to the pool.
+
+        Raises:
+            ValueError: If the name is taken or reserved.
+        """
+        if name == ALL_ROBOTS:
+            raise ValueError(f"{ALL_ROBOTS!r} is reserved for running a tool on every robot")
+        if name in self.robots:
+            raise ValueError(f"Robot {name!r} already exists")
+        settings = dict(self.settings)
+        path = settings.get("schema_cache_file")
+        if path and name != self.default_name:
+            root, ext = os.path.splitext(path)
+            settings["schema_cache_file"] = f"{root}.{name}{ext}"
+        robot = RobotConnection(name, ip, port, **settings)
+        self.robots[name] = robot
+        return robot
+
+    async def remove(self, name: str) -> bool:
+        """Release and close a robot's connection and forget it. The default robot stays."""
+        if name == self.default_name or name not in self.robots:
+            return False
+        robot = self.robots.pop(name)
+        await robot.release("robot removed")
+        await robot.ws_manager.close()
+        return True
+
+    async def release_all(self, reason: str):
+        for robot in list(self.robots.values()):
+            await robot.release(reason)
+
+    async def fan_out(self, call: Callable[[str], Awaitable[Any]]) -> Dict[str, Any]:
+        """
+        Await ``call(name)`` for every robot concurrently.
+
+        Returns:
+            {name: result} in pool order; a call that raised gives {"error": "<message>"}.
+        """
+        names = self.names()
+        results = await asyncio.gather(*(call(name) for name in names), return_exceptions=True)
+        return {
+            name: {"error": f"{type(result).__name__}: {result}"}
+            if isinstance(result, Exception)
+            else result
+            for name, result in zip(names, results)
+        }
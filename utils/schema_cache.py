@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from utils.logging_utils import get_logger
+
+logger = get_logger("schema_cache")
+
+
+class SchemaCache:
+    """
+    LRU cache of rosapi type definitions, keyed by type name.
+
+    Every typedef returned by a rosapi details call is stored under its own ``type``, so a
+    nested type such as ``geometry_msgs/Vector3`` is served from the cache once any message
+    containing it has been fetched. The list a lookup returned is remembered under the
+    lookup key, so a cached answer has the same typedefs in the same order as rosapi's.
+
+    Type definitions don't change while a robot is running, so entries never expire; the
+    cache is only cleared when it is pointed at another robot with ``set_target()``. The
+    optional cache file records its target, so a file written for one robot is ignored
+    when the server starts up against another.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None, target: str = ""):
+        self.max_entries = max_entries
+        self.path = path
+        self.target = target
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._typedefs: "OrderedDict[str, dict]" = OrderedDict()
+        self._lookups: Dict[str, List[str]] = {}
+        self._loaded = not path  # the cache file is read on first use, not at startup
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """
+        Return the typedefs for a lookup key or type name, or None on a miss.
+
+        A hit requires every typedef involved to still be cached.
+        """
+        with self.lock:
+            self._ensure_loaded()
+            names = self._lookups.get(key)
+            if names is None:
+                names = self._resolve(key)
+            if names is None or any(name not in self._typedefs for name in names):
+                self.misses += 1
+                return None
+            for name in names:
+                self._typedefs.move_to_end(name)
+            self.hits += 1
+            return [self._typedefs[name] for name in names]
+
+    def put(self, key: str, typedefs: List[dict]):
+        """Cache the typedefs returned for a lookup key, and each typedef by its own type."""
+        names = [typedef["type"] for typedef in typedefs if typedef.get("type")]
+        if not names:
+            return
+        with self.lock:
+            self._ensure_loaded()
+            for typedef in typedefs:
+                if typedef.get("type"):
+                    self._typedefs[typedef["type"]] = typedef
+                    self._typedefs.move_to_end(typedef["type"])
+            self._lookups[key] = names
+            evicted = set()
+            while len(self._typedefs) > self.max_entries:
+                evicted.add(self._typedefs.popitem(last=False)[0])
+            if evicted:
+                self._lookups = {
+                    lookup: lookup_names
+                    for lookup, lookup_names in self._lookups.items()
+                    if evicted.isdisjoint(lookup_names)
+                }
+            self._save()
+
+    def set_target(self, target: str):
+        """Point the cache at another robot, dropping everything cached for the old one."""
+        if target != self.target:
+            self.target = target
+            self.clear()
+
+    def clear(self):
+        """Drop every entry (and the persisted copy). Hit/miss counters are kept."""
+        with self.lock:
+            self._loaded = True  # whatever the file holds is dropped too
+            self._typedefs.clear()
+            self._lookups.clear()
+            self._save()
+
+    def stats(self) -> dict:
+        with self.lock:
+            self._ensure_loaded()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._typedefs),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "path": self.path,
+                "target": self.target,
+            }
+
+    def _resolve(self, type_name: str) -> Optional[List[str]]:
+        """Collect a cached type and the cached types of its fields, root first."""
+        names: List[str] = []
+        pending = [type_name]
+        while pending:
+            name = pending.pop(0)
+            if name in names:
+                continue
+            typedef = self._typedefs.get(name)
+            if typedef is None:
+                return None
+            names.append(name)
+            # Primitive field types (int32, string, ...) have no package prefix
+            pending.extend(ftype for ftype in typedef.get("fieldtypes", []) if "/" in ftype)
+        return names
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("target") != self.target:
+                return
+            self._typedefs.update(data.get("typedefs", {}))
+            self._lookups.update(data.get("lookups", {}))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("Ignoring unreadable cache file %s: %s", self.path, e)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {"target": self.target, "typedefs": self._typedefs, "lookups": self._lookups},
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Failed to write cache file %s: %s", self.path, e)
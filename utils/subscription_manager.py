@@ -0,0 +1,312 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.async_websocket_manager import AsyncWebSocketManager
+
+# Values of rosbridge's subscribe "compression" field
+COMPRESSIONS = ("none", "png", "cbor", "cbor-raw")
+
+
+class ManagedSubscription:
+    """
+    A rosbridge subscription kept alive in the background.
+
+    Incoming messages are stored with their arrival time in a bounded ring buffer, so the
+    latest value is always at hand. Frames are delivered on the connection's reader thread.
+
+    The buffer holds the messages as received: callers reading the same topic may ask for
+    different fields and filters, so projections and filters are applied per reader (to
+    the frames queued for a ``listen()`` caller, and by ``latest()`` when it reads the
+    buffer) rather than once on the way in. Projecting therefore shrinks what reaches the
+    caller, not what is kept in memory; for heavy topics, bound the latter with
+    ``buffer_size`` (see ``SubscriptionManager.ensure()``).
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        msg_type: str,
+        subscription_id: str,
+        buffer_size: int,
+        compression: str = "none",
+    ):
+        self.topic = topic
+        self.msg_type = msg_type
+        self.compression = compression
+        self.subscription_id = subscription_id
+        self.buffer: deque = deque(maxlen=buffer_size)  # (arrival monotonic time, msg)
+        self.status_errors: deque = deque(maxlen=10)
+        self.pinned = False
+        self.lost: Optional[str] = None  # why the subscription stopped, if it did
+        self.gap_since: Optional[float] = None  # wall time the connection dropped, while it is down
+        self.gaps: deque = deque(maxlen=10)  # recent connection gaps: {"since", "until", "reason"}
+        self.gap_count = 0
+        self.gap_s = 0.0
+        self.received = 0
+        self.created_at = time.monotonic()
+        self.last_read = self.created_at
+        self.lock = threading.Lock()
+        self.subscribe_msg: dict = {}  # the subscribe op sent for this subscription
+        self._listeners: List[Callable[[dict], None]] = []
+
+    def on_frame(self, frame: dict):
+        """Handle a publish/status/gap frame (or a connection error) for this subscription."""
+        with self.lock:
+            if frame.get("op") == "publish":
+                self.buffer.append((time.monotonic(), frame.get("msg", {})))
+                self.received += 1
+            elif frame.get("op") == "status" and frame.get("level") == "error":
+                self.status_errors.append(frame.get("msg", "Unknown error"))
+            elif frame.get("op") == "gap":
+                if frame.get("until") is None:
+                    self.gap_since = frame["since"]
+                else:
+                    self.gap_since = None
+                    self.gaps.append({k: frame[k] for k in ("since", "until", "reason")})
+                    self.gap_count += 1
+                    self.gap_s += frame["until"] - frame["since"]
+            elif "error" in frame:
+                self.lost = frame["error"]
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(frame)
+
+    def shrink_buffer(self, size: int):
+        """Keep at most the newest ``size`` messages from now on."""
+        with self.lock:
+            if size < self.buffer.maxlen:
+                self.buffer = deque(self.buffer, maxlen=size)
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """Call ``listener`` with every frame for this subscription, on the reader thread."""
+        with self.lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]):
+        with self.lock:
+            self._listeners.remove(listener)
+            self.last_read = time.monotonic()
+
+    @property
+    def listening(self) -> bool:
+        """True while a caller is waiting on frames from this subscription."""
+        with self.lock:
+            return bool(self._listeners)
+
+    def latest(
+        self, transform: Optional[Callable[[dict], Optional[dict]]] = None
+    ) -> Optional[Tuple[float, dict]]:
+        """
+        Return (age in seconds, message) for the newest buffered message, or None.
+
+        With a ``transform`` (see ``listen()``), returns the newest buffered message it
+        accepts, transformed. The transform runs on every call, from the newest message
+        back until one is accepted, so a filter rejecting most messages costs up to one
+        evaluation per buffered message.
+        """
+        with self.lock:
+            self.last_read = time.monotonic()
+            buffered = list(self.buffer) if transform is not None else self.buffer
+            if not buffered:
+                return None
+            if transform is None:
+                arrived, msg = buffered[-1]
+                return time.monotonic() - arrived, msg
+        for arrived, msg in reversed(buffered):
+            msg = transform(msg)
+            if msg is not None:
+                return time.monotonic() - arrived, msg
+        return None
+
+    @asynccontextmanager
+    async def listen(self, transform: Optional[Callable[[dict], Optional[dict]]] = None):
+        """
+        Yield an asyncio.Queue receiving every frame for this subscription from now on.
+
+        ``transform`` is applied to each published message on the reader thread before it
+        is queued; messages it maps to None are not queued at all.
+        """
+        frames: asyncio.Queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def on_frame(frame: dict):
+            if transform is not None and frame.get("op") == "publish":
+                msg = transform(frame.get("msg", {}))
+                if msg is None:
+                    return
+                frame = {**frame, "msg": msg}
+            loop.call_soon_threadsafe(frames.put_nowait, frame)
+
+        self.add_listener(on_frame)
+        try:
+            yield frames
+        finally:
+            self.remove_listener(on_frame)
+
+    def info(self) -> dict:
+        now = time.monotonic()
+        with self.lock:
+            return {
+                "topic": self.topic,
+                "msg_type": self.msg_type,
+                "compression": self.compression,
+                "pinned": self.pinned,
+                "active": self.lost is None,
+                "buffered": len(self.buffer),
+                "buffer_size": self.buffer.maxlen,
+                "received": self.received,
+                "last_message_age_s": round(now - self.buffer[-1][0], 3) if self.buffer else None,
+                "idle_s": round(now - self.last_read, 3),
+                "status_errors": list(self.status_errors),
+                "reconnecting": self.gap_since is not None,
+                "gaps": self.gap_count,
+                "gap_s": round(self.gap_s, 3),
+                "error": self.lost,
+            }
+
+
+class SubscriptionManager:
+    """
+    Keeps one background subscription per topic on the shared connection.
+
+    Subscriptions are created on first use and unsubscribed after ``expiry`` seconds
+    without being read, unless pinned.
+    """
+
+    def __init__(
+        self, ws_manager: AsyncWebSocketManager, buffer_size: int = 100, expiry: float = 60.0
+    ):
+        self.ws_manager = ws_manager
+        self.buffer_size = buffer_size
+        self.expiry = expiry
+        self.subscriptions: Dict[str, ManagedSubscription] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def ensure(
+        self,
+        topic: str,
+        msg_type: str,
+        queue_length: Optional[int] = None,
+        throttle_rate_ms: Optional[int] = None,
+        buffer_size: Optional[int] = None,
+        compression: Optional[str] = None,
+    ) -> Tuple[Optional[ManagedSubscription], Optional[str]]:
+        """
+        Return the managed subscription for a topic, subscribing if there is none yet.
+
+        throttle_rate_ms only applies when a new subscription is created. An existing
+        subscription is shrunk to a smaller buffer_size or queue_length when one is asked
+        for (the queue by subscribing again under the same id, which rosbridge treats as an
+        update), so a caller wanting few large messages (images, point clouds) isn't stuck
+        with a deep buffer another caller created. One with a different msg_type, or a
+        different compression when one is given, is replaced.
+
+        Returns:
+            (subscription, None) on success, or (None, error message).
+        """
+        sub = self.subscriptions.get(topic)
+        if (
+            sub is not None
+            and sub.msg_type == msg_type
+            and sub.lost is None
+            and compression in (None, sub.compression)
+        ):
+            if buffer_size is not None:
+                sub.shrink_buffer(buffer_size)
+            current = sub.subscribe_msg.get("queue_length")
+            if queue_length is not None and (current is None or queue_length < current):
+                update = {**sub.subscribe_msg, "queue_length": queue_length}
+                send_error = await self.ws_manager.send(update)
+                if send_error:
+                    return None, send_error
+                sub.subscribe_msg = update
+                self.ws_manager.add_replay(update)  # replaces the op kept under this id
+            return sub, None
+        if sub is not None:
+            await self.drop(topic, "replaced by one with another type or compression")
+
+        sub = ManagedSubscription(
+            topic,
+            msg_type,
+            self.ws_manager.next_id(f"subscribe_{topic}"),
+            buffer_size or self.buffer_size,
+            compression or "none",
+        )
+        subscribe_msg: dict = {
+            "op": "subscribe",
+            "topic": topic,
+            "type": msg_type,
+            "id": sub.subscription_id,
+        }
+        if queue_length is not None:
+            subscribe_msg["queue_length"] = queue_length
+        if throttle_rate_ms is not None:
+            subscribe_msg["throttle_rate"] = throttle_rate_ms
+        if sub.compression != "none":
+            subscribe_msg["compression"] = sub.compression
+        sub.subscribe_msg = subscribe_msg
+
+        # Registered before sending, so concurrent callers share this subscription
+        self.subscriptions[topic] = sub
+        self.ws_manager.register_request(sub.subscription_id, sub.on_frame)
+        self.ws_manager.add_topic_handler(topic, sub.on_frame)
+        send_error = await self.ws_manager.send(subscribe_msg)
+        if send_error:
+            self._detach(sub)
+            if self.subscriptions.get(topic) is sub:
+                del self.subscriptions[topic]
+            return None, send_error
+
+        self.ws_manager.add_replay(subscribe_msg)
+        self._ensure_reaper()
+        return sub, None
+
+    async def drop(self, topic: str, reason: str = "unsubscribed") -> bool:
+        """
+        Unsubscribe and forget the managed subscription for a topic.
+
+        Its listeners (recordings, waiting callers) get ``{"error": ...}`` with ``reason``,
+        as when the connection is lost, since no more frames will reach them.
+        """
+        sub = self.subscriptions.pop(topic, None)
+        if sub is None:
+            return False
+        self._detach(sub)
+        if sub.lost is None:
+            await self.ws_manager.send(
+                {"op": "unsubscribe", "topic": topic, "id": sub.subscription_id}
+            )
+            sub.on_frame({"error": f"Subscription to {topic} was {reason}"})
+        return True
+
+    async def drop_all(self):
+        for topic in list(self.subscriptions):
+            await self.drop(topic)
+
+    def list(self) -> List[dict]:
+        return [sub.info() for sub in self.subscriptions.values()]
+
+    def _detach(self, sub: ManagedSubscription):
+        self.ws_manager.remove_replay(sub.subscription_id)
+        self.ws_manager.remove_topic_handler(sub.topic, sub.on_frame)
+        self.ws_manager.unregister_request(sub.subscription_id)
+
+    def _ensure_reaper(self):
+        task = self._reaper
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            self._reaper = asyncio.ensure_future(self._reap())
+
+    async def _reap(self):
+        """Unsubscribe unpinned subscriptions nobody has read for ``expiry`` seconds."""
+        while self.subscriptions:
+            await asyncio.sleep(min(self.expiry / 2, 5.0))
+            now = time.monotonic()
+            for topic, sub in list(self.subscriptions.items()):
+                if sub.pinned or sub.listening:
+                    continue
+                if now - sub.last_read > self.expiry:
+                    await self.drop(topic, f"unread for {self.expiry}s")
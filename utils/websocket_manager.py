@@ -1,8 +1,16 @@
-import json
+import itertools
+import random
+import socket
 import threading
-from typing import Optional, Union
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence, Union
 
-import websocket
+from utils import cbor, codec
+from utils.logging_utils import get_logger
+from utils.metrics import ConnectionMetrics
+
+logger = get_logger("websocket")
 
 
 def parse_json(raw: Optional[Union[str, bytes]]) -> Optional[dict]:
@@ -17,53 +25,200 @@ def parse_json(raw: Optional[Union[str, bytes]]) -> Optional[dict]:
     """
     if raw is None:
         return None
-    if isinstance(raw, bytes):
-        raw = raw.decode("utf-8", errors="replace")
     try:
-        result = json.loads(raw)
+        result = codec.loads(raw)
         return result if isinstance(result, dict) else None
-    except (json.JSONDecodeError, TypeError):
+    except (ValueError, TypeError, RecursionError):
         return None
 
 
+def decode_text(data: Union[str, bytes]) -> Optional[dict]:
+    """
+    Parse a rosbridge text frame (str, or its undecoded UTF-8 bytes) into a message dict.
+
+    A ``{"op": "png"}`` frame wraps a PNG-compressed JSON message, which is unpacked.
+
+    Returns:
+        The message dict, or None if the frame cannot be parsed.
+    """
+    msg = parse_json(data)
+    if msg is not None and msg.get("op") == "png":
+        # Imported here so OpenCV is only loaded once a png frame shows up
+        from utils.image_utils import decode_png_payload
+
+        try:
+            return parse_json(decode_png_payload(msg.get("data", "")))
+        except ValueError:
+            return None
+    return msg
+
+
+def decode_frame(raw: Optional[Union[str, bytes]]) -> Optional[dict]:
+    """
+    Parse a rosbridge frame into a message dict.
+
+    Text frames (str) are JSON, see ``decode_text()``. Binary frames (bytes) are CBOR
+    (``compression="cbor"`` / ``"cbor-raw"``), with numeric arrays decoded to numpy arrays.
+
+    Returns:
+        The message dict, or None if the frame cannot be parsed.
+    """
+    if isinstance(raw, (bytes, bytearray)):
+        try:
+            msg = cbor.loads(raw)
+        except cbor.CBORDecodeError:
+            msg = None
+        return msg if isinstance(msg, dict) else parse_json(raw)
+    return decode_text(raw)
+
+
+def backoff_delay(attempt: int, initial: float, maximum: float) -> float:
+    """
+    Seconds to wait before reconnect attempt ``attempt`` (counted from 0).
+
+    Exponential backoff with full jitter: the ceiling doubles from ``initial`` up to
+    ``maximum`` and the delay is drawn uniformly below it, so clients that lost the same
+    access point don't all retry in lockstep.
+    """
+    return random.uniform(0, min(maximum, initial * 2 ** min(attempt, 32)))
+
+
 class WebSocketManager:
-    def __init__(self, ip: str, port: int, default_timeout: float = 2.0):
+    """
+    Long-lived, multiplexed connection to rosbridge.
+
+    One socket is shared by every caller. A background reader thread receives all frames
+    and routes them: frames carrying an ``id`` go to the handler registered for that id
+    (see ``request()``), ``publish`` frames go to the handlers registered for their topic,
+    and anything else is queued for ``receive()``. The connection is torn down after
+    ``idle_timeout`` seconds without traffic, pending requests or topic handlers.
+
+    If the connection drops while subscribe or advertise ops are kept (see
+    ``add_replay()``), it is reopened with jittered exponential backoff for up to
+    ``reconnect_timeout`` seconds and the kept ops are sent again. Their handlers get a
+    ``{"op": "gap", "since", "until", "reason"}`` frame when the connection drops (with
+    ``until`` None) and another once it is back, so messages lost in between are known.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        port: int,
+        default_timeout: float = 2.0,
+        idle_timeout: Optional[float] = 30.0,
+        reconnect_initial_delay: float = 0.1,
+        reconnect_max_delay: float = 5.0,
+        reconnect_timeout: Optional[float] = 60.0,
+    ):
         self.ip = ip
         self.port = port
         self.default_timeout = default_timeout
+        self.idle_timeout = idle_timeout
+        self.reconnect_initial_delay = reconnect_initial_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnect_timeout = reconnect_timeout
         self.ws = None
         self.lock = threading.RLock()
+        self.metrics = ConnectionMetrics()
+
+        # Reconnect state, guarded by lock
+        self.reconnects = 0
+        self.gaps: deque = deque(maxlen=20)  # recent outages: {"since", "until", "reason"}
+        self._outage: Optional[dict] = None  # {"since", "reason"} while reconnecting
+        self._closed_ws = None  # the connection close() tore down on purpose
+        self._stop_reconnect = threading.Event()
+
+        self._reader: Optional[threading.Thread] = None
+        self._last_activity = time.monotonic()
+        self._ids = itertools.count(1)
+
+        # Routing tables, guarded by _routes_lock (never held while calling a handler)
+        self._routes_lock = threading.Lock()
+        self._pending: Dict[str, Callable[[dict], None]] = {}
+        self._topic_handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self._replay: Dict[str, dict] = {}  # op id -> op re-sent after a reconnect
+
+        # Frames nobody claimed, served by receive()
+        self._inbox: deque = deque(maxlen=1000)
+        self._inbox_ready = threading.Condition()
 
     def set_ip(self, ip: str, port: int):
         """
         Set the IP and port for the WebSocket connection.
+
+        An open connection to the previous target is closed.
         """
+        if (ip, port) != (self.ip, self.port):
+            self.close()
         self.ip = ip
         self.port = port
-        print(f"[WebSocket] IP set to {self.ip}:{self.port}")
+        logger.info("Target set to %s:%s", ip, port, extra=self._log_fields)
+
+    @property
+    def _log_fields(self) -> dict:
+        return {"target": f"{self.ip}:{self.port}"}
+
+    @property
+    def connected(self) -> bool:
+        """True while a connection is open and its reader thread is running."""
+        return self.ws is not None and self.ws.connected
+
+    @property
+    def reconnecting(self) -> bool:
+        """True while a dropped connection is being reopened."""
+        return self._outage is not None
 
     def connect(self) -> Optional[str]:
         """
-        Attempt to establish a WebSocket connection.
+        Attempt to establish a WebSocket connection and start the reader thread.
+
+        While a dropped connection is being reopened, fails right away instead of racing
+        the backoff.
 
         Returns:
             None if successful,
             or an error message string if connection failed.
         """
+        with self.lock:
+            if self._outage is not None:
+                return f"[WebSocket] Connection lost ({self._outage['reason']}), reconnecting"
+            return self._connect()
+
+    def _connect(self) -> Optional[str]:
         with self.lock:
             if self.ws is None or not self.ws.connected:
                 try:
+                    import websocket  # imported on the first connection, not at startup
+
                     url = f"ws://{self.ip}:{self.port}"
-                    self.ws = websocket.create_connection(url, timeout=self.default_timeout)
-                    print(f"[WebSocket] Connected ({self.default_timeout}s timeout)")
+                    # Frames are parsed as JSON anyway; websocket-client's pure-Python UTF-8
+                    # check would otherwise dominate the cost of large (image) frames
+                    self.ws = websocket.create_connection(
+                        url, timeout=self.default_timeout, skip_utf8_validation=True
+                    )
+                    self._last_activity = time.monotonic()
+                    self._reader = threading.Thread(
+                        target=self._read_loop,
+                        args=(self.ws,),
+                        name=f"rosbridge-reader-{self.ip}:{self.port}",
+                        daemon=True,
+                    )
+                    self._reader.start()
+                    logger.info(
+                        "Connected (%ss timeout)", self.default_timeout, extra=self._log_fields
+                    )
                     return None  # no error
                 except Exception as e:
                     error_msg = f"[WebSocket] Connection error: {e}"
-                    print(error_msg)
+                    logger.warning("Connection error: %s", e, extra=self._log_fields)
                     self.ws = None
                     return error_msg
             return None  # already connected, no error
 
+    def next_id(self, prefix: str = "req") -> str:
+        """Return a rosbridge message id that is unique for this manager."""
+        return f"{prefix}:{next(self._ids)}"
+
     def send(self, message: dict) -> Optional[str]:
         """
         Send a JSON-serializable message over WebSocket.
@@ -72,32 +227,36 @@ class WebSocketManager:
             None if successful,
             or an error message string if send failed.
         """
+        try:
+            json_msg = codec.dumps(message)  # ensure it's JSON-serializable
+        except TypeError as e:
+            error_msg = f"[WebSocket] JSON serialization error: {e}"
+            logger.error("JSON serialization error: %s", e, extra=self._log_fields)
+            return error_msg
+
         with self.lock:
             conn_error = self.connect()
             if conn_error:
                 return conn_error  # failed to connect
+            if not self.ws:
+                return "[WebSocket] Not connected, send aborted."
+            try:
+                self.ws.send(json_msg)
+                self._last_activity = time.monotonic()
+                self.metrics.sent(message.get("op"), len(json_msg))
+                return None  # no error
+            except Exception as e:
+                error_msg = f"[WebSocket] Send error: {e}"
+                logger.warning("Send error: %s", e, extra=self._log_fields)
 
-            if self.ws:
-                try:
-                    json_msg = json.dumps(message)  # ensure it's JSON-serializable
-                    self.ws.send(json_msg)
-                    return None  # no error
-                except TypeError as e:
-                    error_msg = f"[WebSocket] JSON serialization error: {e}"
-                    print(error_msg)
-                    self.close()
-                    return error_msg
-                except Exception as e:
-                    error_msg = f"[WebSocket] Send error: {e}"
-                    print(error_msg)
-                    self.close()
-                    return error_msg
-
-            return "[WebSocket] Not connected, send aborted."
+        # Torn down outside the lock and without waiting for the reader, which needs the
+        # lock to finish (and starts the reconnect if ops are kept)
+        self._disconnect(deliberate=False, wait=False)
+        return error_msg
 
     def receive(self, timeout: Optional[float] = None) -> Optional[Union[str, bytes]]:
         """
-        Receive a single message from rosbridge within the given timeout.
+        Receive the next frame that was not routed to a request or topic handler.
 
         Args:
             timeout (Optional[float]): Seconds to wait before timing out.
@@ -106,25 +265,67 @@ class WebSocketManager:
         Returns:
             Optional[str]: JSON string received from rosbridge, or None if timeout/error.
         """
-        with self.lock:
-            self.connect()
-            if self.ws:
-                try:
-                    # Use default timeout if none specified
-                    actual_timeout = timeout if timeout is not None else self.default_timeout
-                    # Temporarily set the receive timeout
-                    self.ws.settimeout(actual_timeout)
-                    raw = self.ws.recv()  # rosbridge sends JSON as a string
-                    return raw
-                except Exception as e:
-                    print(f"[WebSocket] Receive error or timeout: {e}")
-                    self.close()
-                    return None
+        if self.connect() and not self.reconnecting:
             return None
 
+        actual_timeout = timeout if timeout is not None else self.default_timeout
+        with self._inbox_ready:
+            if not self._inbox_ready.wait_for(lambda: len(self._inbox) > 0, actual_timeout):
+                self.metrics.timeout("receive")
+                return None
+            return self._inbox.popleft()
+
+    def register_request(self, request_id: str, handler: Callable[[dict], None]):
+        """
+        Route the frame answering ``request_id`` to ``handler``.
+
+        The handler runs on the reader thread, so it must not block. If the connection
+        drops first it receives ``{"error": "<reason>"}`` instead.
+        """
+        with self._routes_lock:
+            self._pending[request_id] = handler
+
+    def unregister_request(self, request_id: str):
+        with self._routes_lock:
+            self._pending.pop(request_id, None)
+
+    def add_replay(self, message: dict):
+        """
+        Keep a subscribe or advertise op to send again whenever the connection is reopened.
+
+        The op's ``id`` must be registered with ``register_request()``: its handler is told
+        about connection gaps instead of failing when the connection drops.
+        """
+        with self._routes_lock:
+            self._replay[message["id"]] = message
+
+    def remove_replay(self, op_id: str):
+        with self._routes_lock:
+            self._replay.pop(op_id, None)
+
+    def add_topic_handler(self, topic: str, handler: Callable[[dict], None]):
+        """
+        Route every ``publish`` frame for ``topic`` to ``handler``.
+
+        The handler runs on the reader thread, so it must not block.
+        """
+        with self._routes_lock:
+            self._topic_handlers.setdefault(topic, []).append(handler)
+
+    def remove_topic_handler(self, topic: str, handler: Callable[[dict], None]):
+        with self._routes_lock:
+            handlers = self._topic_handlers.get(topic, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers:
+                self._topic_handlers.pop(topic, None)
+
     def request(self, message: dict, timeout: Optional[float] = None) -> dict:
         """
-        Send a request to Rosbridge and return the response.
+        Send a request to Rosbridge and return the response matching its id.
+
+        A unique id is assigned to the outgoing message (derived from its own ``id`` if it
+        has one), so concurrent callers never receive each other's replies.
 
         Args:
             message (dict): The Rosbridge message dictionary to send.
@@ -135,35 +336,234 @@ class WebSocketManager:
             dict:
                 - Parsed JSON response if successful.
                 - {"error": "<error message>"} if connection/send/receive fails.
-                - {"error": "invalid_json", "raw": <response>} if decoding fails.
         """
-        # Attempt to send the message (connect() is called internally in send())
-        send_error = self.send(message)
-        if send_error:
-            return {"error": send_error}
+        request_id = self.next_id(message.get("id") or message.get("op", "req"))
+        message = {**message, "id": request_id}
+
+        done = threading.Event()
+        reply: dict = {}
 
-        # Attempt to receive a response (connect() is called internally in receive())
-        response = self.receive(timeout=timeout)
-        if response is None:
-            return {"error": "no response or timeout from rosbridge"}
+        def on_reply(msg: dict):
+            reply.update(msg)
+            done.set()
 
-        # Attempt to parse JSON
-        parsed_response = parse_json(response)
-        if parsed_response is None:
-            print(f"[WebSocket] JSON decode error for response: {response}")
-            return {"error": "invalid_json", "raw": response}
-        return parsed_response
+        self.register_request(request_id, on_reply)
+        try:
+            # Attempt to send the message (connect() is called internally in send())
+            send_error = self.send(message)
+            if send_error:
+                return {"error": send_error}
+
+            actual_timeout = timeout if timeout is not None else self.default_timeout
+            if not done.wait(actual_timeout):
+                self.metrics.timeout(message.get("op", "request"))
+                return {"error": "no response or timeout from rosbridge"}
+            return reply
+        finally:
+            self.unregister_request(request_id)
 
     def close(self):
+        """Close the connection. No reconnect is attempted, and one under way is abandoned."""
+        with self.lock:
+            self._stop_reconnect.set()
+        self._disconnect(deliberate=True)
+
+    def _disconnect(self, deliberate: bool, wait: bool = True):
+        with self.lock:
+            ws, self.ws = self.ws, None
+            reader, self._reader = self._reader, None
+            if deliberate:
+                self._closed_ws = ws
+        if ws is None:
+            return
+        try:
+            if ws.connected:
+                ws.send_close()
+            if ws.sock is not None:
+                ws.sock.shutdown(socket.SHUT_RDWR)  # wakes the reader thread
+            logger.info("Closed", extra=self._log_fields)
+        except Exception as e:
+            logger.warning("Close error: %s", e, extra=self._log_fields)
+        finally:
+            if wait and reader is not None and reader is not threading.current_thread():
+                reader.join(timeout=self.default_timeout)
+            ws.shutdown()
+
+    def _is_idle(self) -> bool:
+        if self.idle_timeout is None:
+            return False
+        with self._routes_lock:
+            busy = bool(self._pending or self._topic_handlers)
+        return not busy and time.monotonic() - self._last_activity > self.idle_timeout
+
+    def _read_loop(self, ws):
+        """Receive frames on ``ws`` until it is closed, routing each one as it arrives."""
+        import websocket
+
+        reason = "connection closed"
+        while True:
+            try:
+                # recv_data() leaves text frames as bytes: the codec parses them without
+                # decoding them to str first
+                opcode, data = ws.recv_data()
+            except websocket.WebSocketTimeoutException:
+                if self.ws is ws and self._is_idle():
+                    logger.info("Idle for %ss, closing", self.idle_timeout, extra=self._log_fields)
+                    self.close()
+                    break
+                continue
+            except Exception as e:
+                if self.ws is ws:
+                    reason = f"[WebSocket] Receive error: {e}"
+                    logger.warning("Receive error: %s", e, extra=self._log_fields)
+                break
+            if self.ws is not ws:
+                break
+            if opcode == websocket.ABNF.OPCODE_CLOSE:
+                reason = "[WebSocket] Closed by rosbridge"
+                logger.warning("Closed by rosbridge", extra=self._log_fields)
+                break
+            self._last_activity = time.monotonic()
+            try:
+                self._dispatch(data, binary=opcode == websocket.ABNF.OPCODE_BINARY)
+            except Exception as e:
+                # One bad frame must not stop the reader: everything after it would time out
+                logger.exception("Dropped a frame: %s", e, extra=self._log_fields)
+
         with self.lock:
-            if self.ws and self.ws.connected:
+            if self.ws is ws:
+                self.ws = None
+                self._reader = None
                 try:
-                    self.ws.close()
-                    print("[WebSocket] Closed")
-                except Exception as e:
-                    print(f"[WebSocket] Close error: {e}")
-                finally:
-                    self.ws = None
+                    ws.shutdown()
+                except Exception:
+                    pass
+            if self._outage is not None:
+                return  # a connection opened while reconnecting; the supervisor carries on
+            with self._routes_lock:
+                kept = list(self._replay)
+            supervise = bool(kept) and bool(self.reconnect_timeout) and ws is not self._closed_ws
+            if supervise:
+                self._stop_reconnect.clear()
+                since = time.time()
+                self._outage = {"since": since, "reason": reason}
+        if supervise:
+            self._supervise(since, reason, kept)
+        else:
+            self._fail_pending(reason)
+
+    def _supervise(self, since: float, reason: str, kept: List[str]):
+        """Reopen a dropped connection with jittered exponential backoff (on the old reader)."""
+        logger.warning("Connection lost, reconnecting", extra=self._log_fields)
+        self._fail_pending(reason, spare=kept)
+        self._notify(kept, {"op": "gap", "since": since, "until": None, "reason": reason})
+
+        deadline = time.monotonic() + self.reconnect_timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            delay = backoff_delay(attempt, self.reconnect_initial_delay, self.reconnect_max_delay)
+            if remaining <= 0 or self._stop_reconnect.wait(min(delay, remaining)):
+                break
+            if self._reconnect() is None:
+                return
+            attempt += 1
+
+        with self.lock:
+            self._outage = None
+        with self._routes_lock:
+            self._replay.clear()
+        if self._stop_reconnect.is_set():
+            reason = "connection closed"
+        else:
+            logger.error(
+                "Gave up reconnecting after %d attempt(s)", attempt, extra=self._log_fields
+            )
+            reason = f"{reason}; gave up reconnecting after {attempt} attempt(s)"
+        self._fail_pending(reason)
+
+    def _reconnect(self) -> Optional[str]:
+        """Open a new connection and send the kept ops again. Returns an error or None."""
+        with self.lock:
+            if self._stop_reconnect.is_set():
+                return "connection closed"
+            error = self._connect()
+            if error:
+                return error
+            with self._routes_lock:
+                ops = list(self._replay.values())
+            try:
+                for op in ops:
+                    frame = codec.dumps(op)
+                    self.ws.send(frame)
+                    self.metrics.sent(op["op"], len(frame))
+            except Exception as e:
+                error = f"[WebSocket] Replay error: {e}"
+            else:
+                outage, self._outage = self._outage, None
+                gap = {"since": outage["since"], "until": time.time(), "reason": outage["reason"]}
+                self.gaps.append(gap)
+                self.reconnects += 1
+        if error:
+            logger.warning("Reconnect failed: %s", error, extra=self._log_fields)
+            self._disconnect(deliberate=True)  # its reader must not start another supervisor
+            return error
+
+        logger.info(
+            "Reconnected after %.2fs, replayed %d op(s)",
+            gap["until"] - gap["since"],
+            len(ops),
+            extra=self._log_fields,
+        )
+        self._notify([op["id"] for op in ops], {"op": "gap", **gap})
+        return None
+
+    def _notify(self, ids: List[str], frame: dict):
+        """Send ``frame`` to the handlers registered for ``ids``."""
+        with self._routes_lock:
+            handlers = [self._pending[i] for i in ids if i in self._pending]
+        for handler in handlers:
+            try:
+                handler(dict(frame))
+            except Exception as e:
+                logger.exception("Handler error: %s", e, extra=self._log_fields)
+
+    def _dispatch(self, data: Union[str, bytes], binary: bool):
+        msg = decode_frame(data) if binary else decode_text(data)
+        op = msg.get("op") if msg is not None else None
+        self.metrics.received(op, len(data), msg.get("topic") if op == "publish" else None)
+        if msg is not None:
+            handlers: List[Callable[[dict], None]] = []
+            with self._routes_lock:
+                msg_id = msg.get("id")
+                if msg_id is not None and msg_id in self._pending:
+                    handlers = [self._pending[msg_id]]
+                elif msg.get("op") == "publish":
+                    handlers = list(self._topic_handlers.get(msg.get("topic"), ()))
+            if handlers:
+                for handler in handlers:
+                    try:
+                        handler(msg)
+                    except Exception as e:
+                        logger.exception("Handler error: %s", e, extra=self._log_fields)
+                return
+        if binary:
+            return  # receive() callers expect JSON text; nobody is waiting on binary frames
+
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+        with self._inbox_ready:
+            self._inbox.append(data)
+            self._inbox_ready.notify()
+
+    def _fail_pending(self, reason: str, spare: Sequence[str] = ()):
+        with self._routes_lock:
+            pending = [handler for i, handler in self._pending.items() if i not in spare]
+        for handler in pending:
+            try:
+                handler({"error": reason})
+            except Exception as e:
+                logger.exception("Handler error: %s", e, extra=self._log_fields)
 
     def __enter__(self):
         """Context manager entry - automatically connects."""